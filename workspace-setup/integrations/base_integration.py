@@ -7,6 +7,9 @@ import os
 from pathlib import Path
 
 class BaseIntegration(ABC):
+    # ContactRegistry fed with the participants of each sync; None to skip
+    contacts = None
+    
     def __init__(self, config_path: str):
         self.config = self._load_config(config_path)
         self.logger = self._setup_logger()
@@ -43,6 +46,15 @@ class BaseIntegration(ABC):
     def process_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         pass
     
+    def extract_participants(self, raw_data: Dict[str, Any]) -> List[Any]:
+        """People seen in fetched data, as dicts with email/name/title, addresses or names"""
+        return []
+    
+    def observe_participants(self, customer_id: str, raw_data: Dict[str, Any]):
+        """Record the people in fetched data in the attached contact registry"""
+        if self.contacts is not None:
+            self.contacts.observe_participants(customer_id, self.extract_participants(raw_data))
+    
     def cache_data(self, customer_id: str, data: Dict[str, Any]):
         # Save to both cache and artifacts
         timestamp = datetime.now()
@@ -83,6 +95,7 @@ class BaseIntegration(ABC):
             raise Exception("Authentication failed")
         
         raw_data = self.fetch_data(customer_id, **kwargs)
+        self.observe_participants(customer_id, raw_data)
         processed_data = self.process_data(raw_data)
         self.cache_data(customer_id, processed_data)
         
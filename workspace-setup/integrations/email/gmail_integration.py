@@ -136,6 +136,15 @@ class GmailIntegration(BaseIntegration):
         
         return processed
     
+    def extract_participants(self, raw_data: Dict[str, Any]) -> List[Any]:
+        """Addresses seen on the customer's threads"""
+        return [
+            participant
+            for thread in raw_data.get('threads', [])
+            for participant in thread.get('participants', [])
+            if participant
+        ]
+    
     def _fetch_thread_details(self, thread_id: str) -> Dict[str, Any]:
         """Fetch details of a single email thread"""
         try:
@@ -177,8 +177,13 @@ class GongIntegration(BaseIntegration):
         print(f"MCP Request: {mcp_request}")
         return []
     
-    def fetch_customer_calls(self, customer_name: str, days_back: int = 30) -> Dict[str, Any]:
-        """Fetch all calls related to a specific customer"""
+    def fetch_customer_calls(self, customer_name: str, days_back: int = 30, customer_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetch all calls related to a specific customer
+        
+        Call participants are recorded in the attached contact registry only
+        when customer_id is given, since the registry is keyed by customer id.
+        """
         try:
             from_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
             
@@ -197,6 +202,8 @@ class GongIntegration(BaseIntegration):
             
             if response.status_code == 200:
                 calls = response.json().get('calls', [])
+                if customer_id:
+                    self.observe_participants(customer_id, {'calls': calls})
                 return self._analyze_customer_calls(customer_name, calls)
             else:
                 return {"error": f"Failed to search calls: {response.status_code}"}
@@ -204,6 +211,15 @@ class GongIntegration(BaseIntegration):
         except Exception as e:
             return {"error": f"Error searching calls: {str(e)}"}
     
+    def extract_participants(self, raw_data: Dict[str, Any]) -> List[Any]:
+        """External parties on the customer's calls"""
+        participants = []
+        for call in raw_data.get('calls', []):
+            for party in call.get('parties') or call.get('participants') or []:
+                if (party.get('affiliation') or '').lower() != 'internal':
+                    participants.append(party)
+        return participants
+    
     def _analyze_customer_calls(self, customer_name: str, calls: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze patterns across customer calls"""
         analysis = {
@@ -359,7 +375,7 @@ if __name__ == "__main__":
     result = gong.analyze_call_url(gong_url)
     
     # Pattern 2: Get all calls for a customer
-    customer_analysis = gong.fetch_customer_calls("ACME Corp", days_back=90)
+    customer_analysis = gong.fetch_customer_calls("ACME Corp", days_back=90, customer_id="acme-corp")
     
     # Pattern 3: Search for competitive mentions
     vercel_calls = gong.search_calls_by_keyword("Vercel", days_back=30)
@@ -175,6 +175,15 @@ class GranolaIntegration(BaseIntegration):
         
         return results
     
+    def extract_participants(self, raw_data: Dict[str, Any]) -> List[Any]:
+        """Attendees of the customer's meetings"""
+        return [
+            participant
+            for meeting in raw_data.get('meetings', [])
+            for participant in meeting.get('participants', [])
+            if participant
+        ]
+    
     def _fetch_via_mcp(self, customer_id: str, customer_name: str, days_back: int) -> Dict[str, Any]:
         """Fetch data via MCP protocol"""
         mcp_request = {
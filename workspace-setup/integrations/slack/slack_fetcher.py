@@ -5,6 +5,7 @@ Fetches and organizes Slack conversations by customer for sales insights
 """
 
 import os
+import sys
 import json
 import asyncio
 from datetime import datetime, timedelta
@@ -15,6 +16,17 @@ import re
 import logging
 from pathlib import Path
 
+try:
+    from ..trigger_cooldowns import RecentIdCache
+    from ..triggers.normalized_event import NormalizedEvent, normalize
+    from ..triggers.window_counter import WindowStore
+except ImportError:
+    # Run as a script, e.g. by deploy.sh and scripts/setup.sh
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+    from trigger_cooldowns import RecentIdCache
+    from triggers.normalized_event import NormalizedEvent, normalize
+    from triggers.window_counter import WindowStore
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,6 +52,7 @@ class CustomerMention:
     sentiment: str
     category: str
     importance: str
+    message_ts: Optional[str] = None
 
 class SlackCustomerFetcher:
     """Fetches and organizes Slack data by customer"""
@@ -49,6 +62,12 @@ class SlackCustomerFetcher:
         self.customers = self._load_customer_list()
         self.channels = self.config.get('channels', [])
         self.fetch_interval = self.config.get('fetch_interval_hours', 1)
+        # Negative mentions per customer over a sliding window, across fetch cycles
+        self.negative_mentions = WindowStore(max_entries=max(1000, len(self.customers)))
+        # Messages already counted, since each cycle refetches recent history
+        self.counted_mentions = RecentIdCache(max_entries=100000)
+        # Customers currently over the threshold, alerted once per crossing
+        self.negative_alerting = set()
         
     def _load_config(self, config_path: Optional[str]) -> Dict[str, Any]:
         """Load configuration from file"""
@@ -78,6 +97,10 @@ class SlackCustomerFetcher:
                 'high': ['urgent', 'critical', 'blocker', 'churn', 'cancel'],
                 'medium': ['issue', 'problem', 'concern', 'question'],
                 'low': ['fyi', 'update', 'info']
+            },
+            'negative_sentiment_alert': {
+                'min_mentions': 3,
+                'window_hours': 24
             }
         }
     
@@ -139,31 +162,43 @@ class SlackCustomerFetcher:
         mentions = []
         
         for message in messages:
+            # Lowercase once per message, not once per customer and helper
+            event = normalize({"text": message.text, "channel": message.channel})
+            classification = None
+            
             for customer in self.customers:
                 # Check customer name and aliases
                 patterns = [customer['name']] + customer.get('aliases', [])
                 
                 for pattern in patterns:
-                    if self._is_mentioned(pattern, message.text):
+                    if self._is_mentioned(pattern, event):
+                        if classification is None:
+                            classification = (
+                                self._analyze_sentiment(event),
+                                self._categorize_mention(event),
+                                self._assess_importance(event)
+                            )
+                        sentiment, category, importance = classification
                         mention = CustomerMention(
                             customer_name=customer['name'],
                             channel=message.channel,
                             timestamp=self._parse_timestamp(message.timestamp),
                             context=self._extract_context(message.text, pattern),
-                            sentiment=self._analyze_sentiment(message.text),
-                            category=self._categorize_mention(message.text),
-                            importance=self._assess_importance(message.text)
+                            sentiment=sentiment,
+                            category=category,
+                            importance=importance,
+                            message_ts=message.timestamp
                         )
                         mentions.append(mention)
                         break
         
         return mentions
     
-    def _is_mentioned(self, pattern: str, text: str) -> bool:
-        """Check if pattern is mentioned in text"""
+    def _is_mentioned(self, pattern: str, event: NormalizedEvent) -> bool:
+        """Check if pattern is mentioned in the message"""
         # Case-insensitive word boundary search
         regex = r'\b' + re.escape(pattern.lower()) + r'\b'
-        return bool(re.search(regex, text.lower()))
+        return bool(re.search(regex, event.lower_text))
     
     def _extract_context(self, text: str, pattern: str, context_words: int = 50) -> str:
         """Extract context around mention"""
@@ -183,12 +218,12 @@ class SlackCustomerFetcher:
             return context
         return text[:100] + "..."
     
-    def _analyze_sentiment(self, text: str) -> str:
+    def _analyze_sentiment(self, event: NormalizedEvent) -> str:
         """Simple sentiment analysis"""
         positive_words = ['great', 'excellent', 'happy', 'pleased', 'excited', 'love']
         negative_words = ['issue', 'problem', 'unhappy', 'frustrated', 'concern', 'disappointed']
         
-        text_lower = text.lower()
+        text_lower = event.lower_text
         positive_count = sum(1 for word in positive_words if word in text_lower)
         negative_count = sum(1 for word in negative_words if word in text_lower)
         
@@ -199,7 +234,7 @@ class SlackCustomerFetcher:
         else:
             return 'neutral'
     
-    def _categorize_mention(self, text: str) -> str:
+    def _categorize_mention(self, event: NormalizedEvent) -> str:
         """Categorize the type of mention"""
         categories = {
             'sales': ['deal', 'opportunity', 'demo', 'proposal', 'contract'],
@@ -209,18 +244,18 @@ class SlackCustomerFetcher:
             'general': []
         }
         
-        text_lower = text.lower()
+        text_lower = event.lower_text
         for category, keywords in categories.items():
             if any(keyword in text_lower for keyword in keywords):
                 return category
         
         return 'general'
     
-    def _assess_importance(self, text: str) -> str:
+    def _assess_importance(self, event: NormalizedEvent) -> str:
         """Assess importance of mention"""
         importance_keywords = self.config.get('importance_keywords', {})
         
-        text_lower = text.lower()
+        text_lower = event.lower_text
         for level, keywords in importance_keywords.items():
             if any(keyword in text_lower for keyword in keywords):
                 return level
@@ -362,6 +397,10 @@ class SlackCustomerFetcher:
     def _generate_alerts(self, mentions: Dict[str, List[CustomerMention]]):
         """Generate alerts for high-importance mentions"""
         alerts = []
+        negative_alert = self.config.get('negative_sentiment_alert', {})
+        min_negative = negative_alert.get('min_mentions', 3)
+        window_hours = negative_alert.get('window_hours', 24)
+        now_bucket = int(datetime.now().timestamp() // 3600)
         
         for customer_name, customer_mentions in mentions.items():
             high_importance = [m for m in customer_mentions if m.importance == 'high']
@@ -375,14 +414,32 @@ class SlackCustomerFetcher:
                     'examples': [m.context for m in high_importance[:2]]
                 })
             
-            if len(negative_sentiment) >= 3:
+            # Count negative mentions into hourly buckets so a spike spread
+            # over several fetch cycles is still caught
+            window = self.negative_mentions.counter(customer_name, window_hours)
+            for mention in negative_sentiment:
+                if not self.counted_mentions.seen((customer_name, mention.channel, mention.message_ts)):
+                    window.add(int(mention.timestamp.timestamp() // 3600))
+            negative_count = window.total(now_bucket)
+            
+            if negative_count < min_negative:
+                self.negative_alerting.discard(customer_name)
+            elif customer_name not in self.negative_alerting:
+                self.negative_alerting.add(customer_name)
                 alerts.append({
                     'type': 'negative_sentiment_spike',
                     'customer': customer_name,
-                    'count': len(negative_sentiment),
+                    'count': int(negative_count),
+                    'window_hours': window_hours,
                     'examples': [m.context for m in negative_sentiment[:2]]
                 })
         
+        # Customers with no mentions this cycle re-arm once their window drains
+        for customer_name in self.negative_alerting - mentions.keys():
+            window = self.negative_mentions.counter(customer_name, window_hours)
+            if window.total(now_bucket) < min_negative:
+                self.negative_alerting.discard(customer_name)
+        
         # Save alerts
         if alerts:
             alerts_file = Path('reporting/pulse/slack_alerts.json')
@@ -135,6 +135,19 @@ class SlackIntegration(BaseIntegration):
         
         return processed
     
+    def extract_participants(self, raw_data: Dict[str, Any]) -> List[Any]:
+        """Names of people posting in the customer channel; the internal channel is our own team"""
+        participants = []
+        for channel_name, history in raw_data.get('channel_history', {}).items():
+            if '-internal' in channel_name:
+                continue
+            for message in history:
+                profile = message.get('user_profile') or {}
+                name = profile.get('real_name') or profile.get('display_name') or message.get('username')
+                if name:
+                    participants.append({'name': name, 'email': profile.get('email'), 'title': profile.get('title')})
+        return participants
+    
     def _search_messages(self, query: str) -> Dict[str, Any]:
         try:
             response = requests.get(
@@ -0,0 +1,225 @@
+"""
+Vectorized batch evaluation of metric rules
+
+For nightly sweeps over every account: metrics for N customers are held as
+one float column per metric (NaN where a customer has no value), and every
+rule watching a metric is checked against the whole column in a single
+NumPy comparison. Rules with the same metric and operator are stacked so
+they share one broadcast comparison.
+
+Only threshold checks are vectorized. MetricTrigger's trend analysis keeps
+per-customer state and is left to MetricTrigger.evaluate, and conditions
+NumPy can't express (contains, in_list, regex, non-numeric thresholds) fall
+back to a per-customer loop. Rules with all/any condition groups, and engine
+rules that can't be stacked, run their compiled predicate per customer.
+
+numpy is optional: without it columns are plain lists and the stacked
+comparisons run as a scalar loop, with the same results.
+"""
+
+import math
+from dataclasses import dataclass
+from operator import eq, ge, gt, le, lt, ne
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .trigger_engine import TriggerRule, TriggerType
+from .triggers.base_trigger import TriggerCondition
+from .triggers.conditions import condition_metrics, parse_operator
+from .triggers.metric_triggers import MetricTrigger
+
+# Conditions with a broadcasting form; TriggerRule operator names resolve
+# to these through parse_operator
+TRIGGER_OPERATORS = {
+    TriggerCondition.GREATER_THAN: gt,
+    TriggerCondition.LESS_THAN: lt,
+    TriggerCondition.GREATER_THAN_OR_EQUAL: ge,
+    TriggerCondition.LESS_THAN_OR_EQUAL: le,
+    TriggerCondition.EQUALS: eq,
+    TriggerCondition.NOT_EQUALS: ne
+}
+
+# Broadcasting form of each operator
+UFUNCS = {
+    gt: np.greater,
+    lt: np.less,
+    eq: np.equal,
+    ge: np.greater_equal,
+    le: np.less_equal,
+    ne: np.not_equal
+} if np is not None else {}
+
+
+@dataclass
+class MetricSnapshot:
+    """Columnar metrics for many customers; NaN marks a missing value"""
+    customer_ids: Sequence[str]  # object array of customer ids (a list without numpy)
+    columns: Dict[str, Sequence[float]]  # metric name -> float64 array aligned with customer_ids
+    raw: Optional[Dict[str, Dict[str, Any]]] = None  # Source records, for fallback conditions
+
+    def __len__(self) -> int:
+        return len(self.customer_ids)
+
+    @classmethod
+    def from_records(cls,
+                     metrics_by_customer: Dict[str, Dict[str, Any]],
+                     metric_names: Optional[Iterable[str]] = None) -> "MetricSnapshot":
+        """
+        Build a snapshot from per-customer metrics dicts
+
+        Args:
+            metrics_by_customer: customer_id -> the event's "metrics" dict
+            metric_names: Columns to build; defaults to every numeric metric seen
+        """
+        customer_ids = list(metrics_by_customer)
+        records = [metrics_by_customer[customer_id] for customer_id in customer_ids]
+        if metric_names is None:
+            metric_names = {
+                name
+                for record in records
+                for name, value in record.items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+            }
+
+        columns = {}
+        for name in metric_names:
+            values = (_as_float(record.get(name)) for record in records)
+            if np is None:
+                columns[name] = list(values)
+            else:
+                columns[name] = np.fromiter(values, dtype=np.float64, count=len(records))
+        if np is None:
+            return cls(customer_ids, columns, metrics_by_customer)
+        return cls(np.array(customer_ids, dtype=object), columns, metrics_by_customer)
+
+
+def _as_float(value: Any) -> float:
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class BatchMetricEvaluator:
+    """Metric rules compiled into stacked threshold comparisons"""
+
+    def __init__(self,
+                 rules: Iterable[TriggerRule] = (),
+                 triggers: Iterable[MetricTrigger] = ()):
+        """
+        Args:
+            rules: Engine rules; only enabled METRIC rules are used
+            triggers: MetricTrigger instances; only enabled ones are used
+        """
+        # (metric, operator) -> rule ids and thresholds compared in one broadcast
+        self._groups: Dict[Tuple[str, Callable], Tuple[List[str], List[float]]] = {}
+        # (rule_id, metric, per-value check) for conditions NumPy can't express
+        self._fallback: List[Tuple[str, str, Callable[[Any], bool]]] = []
+        # (rule_id, metrics read, compiled event check) for all/any groups and
+        # engine rules that can't be stacked
+        self._grouped: List[Tuple[str, List[str], Callable[[Dict[str, Any]], bool]]] = []
+
+        for rule in rules:
+            if rule.type == TriggerType.METRIC and rule.enabled:
+                self._add_rule(rule)
+        for trigger in triggers:
+            if trigger.enabled:
+                self._add_trigger(trigger)
+
+    def _add_rule(self, rule: TriggerRule):
+        conditions = rule.conditions
+        if "all" not in conditions and "any" not in conditions:
+            metric = conditions.get("metric")
+            operator = TRIGGER_OPERATORS.get(parse_operator(conditions.get("operator", "gt")))
+            if metric is not None and self._add_check(rule.id, metric, operator, conditions.get("threshold")):
+                return
+        # Groups combine metrics per customer, and the rest need the rule's own
+        # predicate, so they run row by row
+        self._grouped.append((rule.id, condition_metrics(conditions), rule._check_metric_conditions))
+
+    def _add_trigger(self, trigger: MetricTrigger):
+        operator = TRIGGER_OPERATORS.get(trigger.condition)
+        if not self._add_check(trigger.trigger_id, trigger.metric_name, operator, trigger.threshold):
+            self._fallback.append((
+                trigger.trigger_id,
+                trigger.metric_name,
+                trigger.threshold_met
+            ))
+
+    def _add_check(self, rule_id: str, metric: str, operator: Optional[Callable], threshold: Any) -> bool:
+        """Stack a threshold check if it broadcasts with the same result; False if it doesn't"""
+        if operator is None or threshold is None or isinstance(threshold, bool):
+            return False
+        if operator in (eq, ne) and not isinstance(threshold, (int, float)):
+            # Equality compares the raw value, so "5" does not equal 5
+            return False
+        try:
+            threshold = float(threshold)
+        except (TypeError, ValueError):
+            return False
+        rule_ids, thresholds = self._groups.setdefault((metric, operator), ([], []))
+        rule_ids.append(rule_id)
+        thresholds.append(threshold)
+        return True
+
+    @property
+    def metrics(self) -> Set[str]:
+        """Metric names the compiled rules read"""
+        return (
+            {metric for metric, _ in self._groups}
+            | {metric for _, metric, _ in self._fallback}
+            | {metric for _, metrics, _ in self._grouped for metric in metrics}
+        )
+
+    def evaluate(self, snapshot: MetricSnapshot) -> Set[Tuple[str, str]]:
+        """
+        Evaluate every compiled rule against every customer in the snapshot
+
+        Returns:
+            (rule_id, customer_id) for each firing pair
+        """
+        firing: Set[Tuple[str, str]] = set()
+        customer_ids = snapshot.customer_ids
+
+        for (metric, operator), (rule_ids, thresholds) in self._groups.items():
+            column = snapshot.columns.get(metric)
+            if column is None:
+                continue
+            if np is None:
+                # Missing values are NaN and never fire
+                checks = list(zip(rule_ids, thresholds))
+                for customer_id, value in zip(customer_ids, column):
+                    if value == value:
+                        firing.update(
+                            (rule_id, customer_id) for rule_id, threshold in checks
+                            if operator(value, threshold)
+                        )
+                continue
+            # rules x customers; missing values are NaN and never fire
+            with np.errstate(invalid="ignore"):
+                mask = UFUNCS[operator](column[np.newaxis, :], np.asarray(thresholds)[:, np.newaxis])
+            mask &= ~np.isnan(column)[np.newaxis, :]
+            rule_indexes, customer_indexes = np.nonzero(mask)
+            rule_ids_array = np.array(rule_ids, dtype=object)
+            firing.update(zip(rule_ids_array[rule_indexes], customer_ids[customer_indexes]))
+
+        if self._fallback and snapshot.raw is not None:
+            for rule_id, metric, check in self._fallback:
+                for customer_id, metrics in snapshot.raw.items():
+                    value = metrics.get(metric)
+                    if value is not None and check(value):
+                        firing.add((rule_id, customer_id))
+
+        if self._grouped and snapshot.raw is not None:
+            for rule_id, _, check in self._grouped:
+                for customer_id, metrics in snapshot.raw.items():
+                    if check({"metrics": metrics}):
+                        firing.add((rule_id, customer_id))
+
+        return firing
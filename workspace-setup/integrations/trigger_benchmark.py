@@ -0,0 +1,503 @@
+"""
+Throughput and latency benchmarks for the trigger path
+
+Generates synthetic Slack messages, emails and metric snapshots, then sweeps
+rule count, message length and match rate across five scenarios:
+
+    engine        TriggerEngine.process_events through to an action handler
+    rule_scan     TriggerRule.should_trigger on every rule, as without indexes
+    keyword_class KeywordTrigger.evaluate for every keyword rule
+    keyword_set   KeywordTriggerSet.evaluate over the same triggers in one scan
+    metric_class  MetricTrigger.evaluate for every metric rule
+
+Each case reports events/sec, p50/p99 latency (for the engine, from ingestion
+to the action handler; otherwise per event) and peak RSS. By default every
+case runs in a fresh process so peak RSS belongs to that case alone. Results
+are written to JSON; pass --compare to diff against an earlier run.
+
+Usage:
+    python -m integrations.trigger_benchmark --output bench.json
+    python -m integrations.trigger_benchmark --rules 10 1000 --lengths 50 --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import product
+from typing import Any, Dict, List
+
+from .trigger_engine import TriggerEngine, TriggerPriority, TriggerRule, TriggerType
+from .triggers.base_trigger import TriggerCondition
+from .triggers.keyword_triggers import KeywordTrigger, KeywordTriggerSet
+from .triggers.metric_triggers import MetricTrigger
+
+SCENARIOS = ("engine", "rule_scan", "keyword_class", "keyword_set", "metric_class")
+
+DEFAULT_RULE_COUNTS = [10, 100, 1000, 10000]
+DEFAULT_MESSAGE_LENGTHS = [20, 200, 2000]  # words
+DEFAULT_MATCH_RATES = [0.0, 0.1, 0.5]
+
+# Values held fixed while another dimension is swept
+BASELINE = {"rules": 100, "length": 200, "match_rate": 0.1}
+
+# Share of each kind of event in the generated stream
+EVENT_MIX = {"slack": 0.6, "email": 0.25, "metrics": 0.15}
+
+FILLER_WORDS = (
+    "the team is looking at our current setup and wants to review the next steps "
+    "for deployment please send over the notes from yesterday call we should sync "
+    "again on thursday about timelines budget owners onboarding docs and the "
+    "rollout plan for other regions thanks for the quick turnaround on this update"
+).split()
+
+NUM_CUSTOMERS = 500
+NUM_METRICS = 50
+
+
+def synthetic_rules(count: int, seed: int = 7) -> List[TriggerRule]:
+    """
+    Build a ruleset of the given size
+
+    70% keyword rules (two unique phrases each, every tenth with a regex
+    pattern too), 15% customer rules and 15% metric rules. Rulesets too
+    small for that mix still get one metric rule (from 2 rules) and one
+    customer rule (from 3). Every rule runs the single "bench_action" action.
+    """
+    rng = random.Random(seed)
+    kinds = [index % 20 for index in range(count)]
+    if count < 20:
+        if count >= 2:
+            kinds[-1] = 19
+        if count >= 3:
+            kinds[-2] = 16
+    rules = []
+    for index, kind in enumerate(kinds):
+        if kind < 14:
+            conditions = {"keywords": [f"kw{index:05d} alpha", f"kw{index:05d} beta"]}
+            if kind == 0:
+                conditions["patterns"] = [rf"rx{index:05d}\s+\d+"]
+            rule_type = TriggerType.KEYWORD
+        elif kind < 17:
+            conditions = {"customer_ids": [f"cust{rng.randrange(NUM_CUSTOMERS)}" for _ in range(5)]}
+            rule_type = TriggerType.CUSTOMER_SPECIFIC
+        else:
+            conditions = {
+                "metric": f"metric_{index % NUM_METRICS}",
+                "threshold": -20,
+                "operator": "lt"
+            }
+            rule_type = TriggerType.METRIC
+        rules.append(TriggerRule(
+            id=f"rule_{index:05d}",
+            name=f"Rule {index}",
+            description="Synthetic benchmark rule",
+            type=rule_type,
+            priority=list(TriggerPriority)[index % len(TriggerPriority)],
+            conditions=conditions,
+            actions=["bench_action"]
+        ))
+    return rules
+
+
+class SyntheticEventGenerator:
+    """Deterministic stream of Slack messages, emails and metric snapshots"""
+
+    def __init__(self, rules: List[TriggerRule], seed: int = 11):
+        self.rng = random.Random(seed)
+        self.phrases = [
+            keyword for rule in rules if rule.type == TriggerType.KEYWORD
+            for keyword in rule.conditions["keywords"]
+        ]
+        self.metrics = sorted({
+            rule.conditions["metric"] for rule in rules if rule.type == TriggerType.METRIC
+        }) or [f"metric_{i}" for i in range(NUM_METRICS)]
+        self._next_id = 0
+
+    def _text(self, length: int, match_rate: float) -> str:
+        words = self.rng.choices(FILLER_WORDS, k=length)
+        if self.phrases and self.rng.random() < match_rate:
+            words.insert(self.rng.randrange(len(words) + 1), self.rng.choice(self.phrases))
+        return " ".join(words)
+
+    def _base(self) -> Dict[str, Any]:
+        self._next_id += 1
+        return {
+            "id": f"bench-{self._next_id}",
+            "customer_id": f"cust{self.rng.randrange(NUM_CUSTOMERS)}"
+        }
+
+    def slack_message(self, length: int, match_rate: float) -> Dict[str, Any]:
+        event = self._base()
+        event.update({
+            "channel": f"C{self.rng.randrange(100):04d}",
+            "user": f"U{self.rng.randrange(1000):05d}",
+            "text": self._text(length, match_rate)
+        })
+        return event
+
+    def email(self, length: int, match_rate: float) -> Dict[str, Any]:
+        event = self._base()
+        event.update({
+            "from": f"contact{self.rng.randrange(1000)}@example.com",
+            "subject": self._text(8, match_rate / 2),
+            "text": self._text(length, match_rate / 2)
+        })
+        return event
+
+    def metric_snapshot(self, match_rate: float) -> Dict[str, Any]:
+        event = self._base()
+        metrics = {}
+        for name in self.rng.sample(self.metrics, min(3, len(self.metrics))):
+            value = self.rng.uniform(-60, -21) if self.rng.random() < match_rate else self.rng.uniform(-19, 40)
+            metrics[name] = round(value, 2)
+        event["metrics"] = metrics
+        return event
+
+    def generate(self, count: int, length: int, match_rate: float) -> List[Dict[str, Any]]:
+        """A mixed stream of count events"""
+        kinds = self.rng.choices(list(EVENT_MIX), weights=list(EVENT_MIX.values()), k=count)
+        return [
+            self.slack_message(length, match_rate) if kind == "slack"
+            else self.email(length, match_rate) if kind == "email"
+            else self.metric_snapshot(match_rate)
+            for kind in kinds
+        ]
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _summarize(processed: int, elapsed: float, latencies: List[float], **extra) -> Dict[str, Any]:
+    latencies.sort()
+    summary = {
+        "events": processed,
+        "elapsed_seconds": round(elapsed, 4),
+        "events_per_second": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+        "latency_p50_ms": round(_percentile(latencies, 0.50) * 1000, 4),
+        "latency_p99_ms": round(_percentile(latencies, 0.99) * 1000, 4),
+        "peak_rss_mb": round(_peak_rss_mb(), 1)
+    }
+    summary.update(extra)
+    return summary
+
+
+async def _bench_engine(rules: List[TriggerRule],
+                        events: List[Dict[str, Any]],
+                        time_budget: float,
+                        batch_size: int = 100,
+                        num_workers: int = 4,
+                        num_shards: int = 0) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = TriggerEngine(
+            rules_path=os.path.join(scratch, "no_rules.md"),
+            num_workers=num_workers,
+            max_queue_size=0,
+            digest_intervals={},
+            num_shards=num_shards
+        )
+    engine.rules = rules
+    engine.compile_rules()
+
+    latencies: List[float] = []
+    actions_run = 0
+
+    async def bench_action(trigger_event):
+        nonlocal actions_run
+        actions_run += 1
+        latencies.append(time.perf_counter() - trigger_event.data["_ingested_at"])
+
+    engine.register_action_handler("bench_action", bench_action)
+    engine.running = True
+    workers = [asyncio.create_task(engine._process_trigger_queue(i)) for i in range(engine.num_workers)]
+
+    processed = 0
+    fired = 0
+    ingest_seconds = 0.0
+    started = time.perf_counter()
+    for offset in range(0, len(events), batch_size):
+        batch = events[offset:offset + batch_size]
+        ingested_at = time.perf_counter()
+        for event in batch:
+            event["_ingested_at"] = ingested_at
+        batch_stats = await engine.process_events("bench", batch)
+        ingest_seconds += time.perf_counter() - ingested_at
+        processed += batch_stats["events_processed"]
+        fired += batch_stats["triggers_fired"]
+        if time.perf_counter() - started > time_budget:
+            break
+    await engine.event_queue.join()
+    elapsed = time.perf_counter() - started
+
+    engine.stop()
+    await asyncio.gather(*workers)
+    return _summarize(
+        processed, elapsed, latencies,
+        triggers_fired=fired,
+        actions_run=actions_run,
+        ingest_events_per_second=round(processed / ingest_seconds, 1) if ingest_seconds > 0 else 0.0
+    )
+
+
+def _bench_calls(evaluate, events: List[Dict[str, Any]], time_budget: float) -> Dict[str, Any]:
+    """Time evaluate(event) per event until the events or the time budget run out"""
+    latencies = []
+    fired = 0
+    started = time.perf_counter()
+    for event in events:
+        call_started = time.perf_counter()
+        fired += evaluate(event)
+        latencies.append(time.perf_counter() - call_started)
+        if call_started - started > time_budget:
+            break
+    elapsed = time.perf_counter() - started
+    return _summarize(len(latencies), elapsed, latencies, triggers_fired=fired)
+
+
+def _keyword_triggers(rules: List[TriggerRule]) -> List[KeywordTrigger]:
+    return [
+        KeywordTrigger(
+            trigger_id=rule.id,
+            name=rule.name,
+            description=rule.description,
+            priority=rule.priority.value,
+            keywords=rule.conditions.get("keywords", []),
+            patterns=rule.conditions.get("patterns", [])
+        )
+        for rule in rules if rule.type == TriggerType.KEYWORD
+    ]
+
+
+def _metric_triggers(rules: List[TriggerRule]) -> List[MetricTrigger]:
+    return [
+        MetricTrigger(
+            trigger_id=rule.id,
+            name=rule.name,
+            description=rule.description,
+            priority=rule.priority.value,
+            metric_name=rule.conditions["metric"],
+            threshold=rule.conditions["threshold"],
+            condition=TriggerCondition.LESS_THAN
+        )
+        for rule in rules if rule.type == TriggerType.METRIC
+    ]
+
+
+def run_case(scenario: str,
+             rule_count: int,
+             length: int,
+             match_rate: float,
+             num_events: int = 2000,
+             time_budget: float = 10.0,
+             num_shards: int = 0) -> Dict[str, Any]:
+    """
+    Run one benchmark case
+
+    Args:
+        scenario: One of SCENARIOS
+        rule_count: Number of synthetic rules
+        length: Words per message
+        match_rate: Fraction of events built to match some rule
+        num_events: Events to generate
+        time_budget: Stop feeding events after this many seconds
+        num_shards: Shard processes for the engine scenario (0 in-process)
+
+    Returns:
+        Case parameters and measurements
+    """
+    rules = synthetic_rules(rule_count)
+    events = SyntheticEventGenerator(rules).generate(num_events, length, match_rate)
+
+    if scenario == "engine":
+        measured = asyncio.run(_bench_engine(rules, events, time_budget, num_shards=num_shards))
+    elif scenario == "rule_scan":
+        measured = _bench_calls(
+            lambda event: sum(rule.should_trigger(event) for rule in rules),
+            events, time_budget
+        )
+    elif scenario == "keyword_class":
+        triggers = _keyword_triggers(rules)
+        measured = _bench_calls(
+            lambda event: sum(trigger.evaluate(event).triggered for trigger in triggers),
+            [event for event in events if "text" in event], time_budget
+        )
+    elif scenario == "keyword_set":
+        trigger_set = KeywordTriggerSet(_keyword_triggers(rules))
+        trigger_set.compile()
+        measured = _bench_calls(
+            lambda event: sum(result.triggered for result in trigger_set.evaluate(event).values()),
+            [event for event in events if "text" in event], time_budget
+        )
+    elif scenario == "metric_class":
+        triggers = _metric_triggers(rules)
+        if triggers:
+            measured = _bench_calls(
+                lambda event: sum(trigger.evaluate(event).triggered for trigger in triggers),
+                [event for event in events if "metrics" in event], time_budget
+            )
+        else:
+            # Timing no work would report a meaningless rate
+            measured = _summarize(0, 0.0, [], skipped="no metric rules in the ruleset")
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    return {
+        "scenario": scenario,
+        "rules": rule_count,
+        "length": length,
+        "match_rate": match_rate,
+        "num_shards": num_shards,
+        **measured
+    }
+
+
+def sweep_cases(rule_counts: List[int],
+                lengths: List[int],
+                match_rates: List[float],
+                full: bool = False) -> List[Dict[str, Any]]:
+    """
+    Parameter sets to run
+
+    By default each dimension is swept with the others held at BASELINE;
+    full runs the whole cross product.
+    """
+    if full:
+        return [
+            {"rules": rules, "length": length, "match_rate": rate}
+            for rules, length, rate in product(rule_counts, lengths, match_rates)
+        ]
+
+    cases = [dict(BASELINE, rules=rules) for rules in rule_counts]
+    cases += [dict(BASELINE, length=length) for length in lengths]
+    cases += [dict(BASELINE, match_rate=rate) for rate in match_rates]
+    unique = []
+    for case in cases:
+        if case not in unique:
+            unique.append(case)
+    return unique
+
+
+def _case_key(result: Dict[str, Any]) -> str:
+    return (f"{result['scenario']} rules={result['rules']} length={result['length']} "
+            f"match={result['match_rate']} shards={result.get('num_shards', 0)}")
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per case present in both runs, the events/sec and p99 latency ratios (current / baseline)"""
+    previous = {_case_key(result): result for result in baseline.get("results", [])}
+    rows = []
+    for result in current.get("results", []):
+        before = previous.get(_case_key(result))
+        if not before or result.get("skipped") or before.get("skipped"):
+            continue
+        rows.append({
+            "case": _case_key(result),
+            "events_per_second": result["events_per_second"],
+            "throughput_ratio": round(result["events_per_second"] / before["events_per_second"], 3)
+            if before["events_per_second"] else None,
+            "latency_p99_ms": result["latency_p99_ms"],
+            "p99_ratio": round(result["latency_p99_ms"] / before["latency_p99_ms"], 3)
+            if before["latency_p99_ms"] else None
+        })
+    return rows
+
+
+def run_benchmarks(scenarios: List[str],
+                   cases: List[Dict[str, Any]],
+                   num_events: int = 2000,
+                   time_budget: float = 10.0,
+                   num_shards: int = 0,
+                   isolate: bool = True) -> Dict[str, Any]:
+    """
+    Run every scenario for every case
+
+    Args:
+        isolate: Run each case in a fresh process so its peak RSS is its own
+    """
+    results = []
+    for scenario, case in product(scenarios, cases):
+        arguments = (scenario, case["rules"], case["length"], case["match_rate"],
+                     num_events, time_budget, num_shards if scenario == "engine" else 0)
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(run_case, *arguments).result()
+        else:
+            result = run_case(*arguments)
+        results.append(result)
+        if result.get("skipped"):
+            print(f"{_case_key(result)}: skipped, {result['skipped']}", file=sys.stderr)
+            continue
+        print(f"{_case_key(result)}: {result['events_per_second']} events/s, "
+              f"p50 {result['latency_p50_ms']}ms, p99 {result['latency_p99_ms']}ms, "
+              f"peak RSS {result['peak_rss_mb']}MB", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "num_events": num_events,
+            "time_budget_seconds": time_budget,
+            "isolated": isolate
+        },
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the trigger evaluation path")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to run (repeatable, default all)")
+    parser.add_argument("--rules", type=int, nargs="+", default=DEFAULT_RULE_COUNTS, help="Rule counts to sweep")
+    parser.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_MESSAGE_LENGTHS, help="Message lengths in words")
+    parser.add_argument("--match-rates", type=float, nargs="+", default=DEFAULT_MATCH_RATES, help="Match rates to sweep")
+    parser.add_argument("--full", action="store_true", help="Run the full cross product instead of one dimension at a time")
+    parser.add_argument("--events", type=int, default=2000, help="Events generated per case")
+    parser.add_argument("--time-budget", type=float, default=10.0, help="Seconds of feeding per case")
+    parser.add_argument("--shards", type=int, default=0, help="Shard processes for the engine scenario")
+    parser.add_argument("--no-isolate", action="store_true", help="Run cases in this process (peak RSS accumulates)")
+    parser.add_argument("--output", help="Results file (default trigger_benchmark_<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        args.scenario or list(SCENARIOS),
+        sweep_cases(args.rules, args.lengths, args.match_rates, args.full),
+        num_events=args.events,
+        time_budget=args.time_budget,
+        num_shards=args.shards,
+        isolate=not args.no_isolate
+    )
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            report["comparison"] = {"baseline": args.compare, "cases": compare_results(json.load(f), report)}
+        for row in report["comparison"]["cases"]:
+            print(f"{row['case']}: throughput x{row['throughput_ratio']}, p99 x{row['p99_ratio']}", file=sys.stderr)
+
+    output = args.output or f"trigger_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
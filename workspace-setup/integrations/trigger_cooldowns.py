@@ -0,0 +1,101 @@
+"""
+Cooldown and duplicate tracking for the trigger engine
+
+Cooldowns are kept per (rule, customer) on a monotonic clock and expire on
+their own; recently seen source message ids are kept in a bounded LRU so a
+message delivered twice only fires once. Both structures are
+memory-bounded regardless of how many accounts the engine watches.
+"""
+
+import heapq
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class CooldownStore:
+    """Cooldown expiries keyed by (rule_id, customer_id) with TTL eviction"""
+
+    def __init__(self,
+                 max_entries: int = 100000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._expiries: Dict[Tuple[str, str], float] = {}
+        self._heap: List[Tuple[float, Tuple[str, str]]] = []
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def is_cooling_down(self, rule_id: str, customer_id: str, now: Optional[float] = None) -> bool:
+        """Check whether a rule is still cooling down for a customer"""
+        expiry = self._expiries.get((rule_id, customer_id))
+        if expiry is None:
+            return False
+        return (self.clock() if now is None else now) < expiry
+
+    def start(self, rule_id: str, customer_id: str, seconds: float, now: Optional[float] = None):
+        """Start (or restart) a cooldown"""
+        if seconds <= 0:
+            return
+        now = self.clock() if now is None else now
+        key = (rule_id, customer_id)
+        expiry = now + seconds
+        self._expiries[key] = expiry
+        heapq.heappush(self._heap, (expiry, key))
+        self._evict(now)
+
+    def remaining(self, rule_id: str, customer_id: str, now: Optional[float] = None) -> float:
+        """Seconds left on a cooldown, 0 if none"""
+        expiry = self._expiries.get((rule_id, customer_id))
+        if expiry is None:
+            return 0.0
+        return max(0.0, expiry - (self.clock() if now is None else now))
+
+    def entries(self, now: Optional[float] = None) -> List[Tuple[str, str, float]]:
+        """Active cooldowns as (rule_id, customer_id, seconds remaining)"""
+        now = self.clock() if now is None else now
+        return [
+            (rule_id, customer_id, expiry - now)
+            for (rule_id, customer_id), expiry in self._expiries.items()
+            if expiry > now
+        ]
+
+    def _evict(self, now: float):
+        """Drop expired cooldowns, then the soonest-expiring ones past max_entries"""
+        heap = self._heap
+        while heap and (heap[0][0] <= now or len(self._expiries) > self.max_entries):
+            expiry, key = heapq.heappop(heap)
+            # Skip heap entries superseded by a later start()
+            if self._expiries.get(key) == expiry:
+                del self._expiries[key]
+
+        # Restarted cooldowns leave stale heap entries behind; rebuild when they pile up
+        if len(heap) > 2 * len(self._expiries) + 1024:
+            self._heap = [(expiry, key) for key, expiry in self._expiries.items()]
+            heapq.heapify(self._heap)
+
+
+class RecentIdCache:
+    """Bounded LRU set of recently seen ids"""
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[Hashable, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def seen(self, item_id: Hashable) -> bool:
+        """Record an id; returns True if it was already present"""
+        if item_id in self._ids:
+            self._ids.move_to_end(item_id)
+            return True
+        self._ids[item_id] = None
+        if len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+        return False
+
+    def discard(self, item_id: Hashable):
+        """Forget an id, e.g. one whose processing failed and will be retried"""
+        self._ids.pop(item_id, None)
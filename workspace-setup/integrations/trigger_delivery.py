@@ -0,0 +1,276 @@
+"""
+Reliable delivery of trigger actions
+
+Failed action calls are retried with exponential backoff and full jitter.
+Each downstream target (CRM, SMTP, a Slack webhook, ...) has a circuit
+breaker: after repeated failures it opens and calls to that target fail
+fast instead of queueing up behind it, then a single probe call is let
+through once the reset timeout has passed. Actions that exhaust their
+retries, or hit an open circuit, go to a dead-letter queue that is
+persisted to disk and can be replayed once the target has recovered.
+
+The dead-letter file is append-only: additions and removals are buffered,
+then written and fsynced in a worker thread, and the file is only
+rewritten once dropped or removed entries make up most of it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self,
+                 max_attempts: int = 4,
+                 base_delay_seconds: float = 0.5,
+                 max_delay_seconds: float = 30.0,
+                 rng: Optional[random.Random] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after the given failed attempt (0-based)"""
+        ceiling = min(self.max_delay_seconds, self.base_delay_seconds * (2 ** attempt))
+        return self.rng.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one downstream target"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 reset_timeout_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            # One probe at a time decides whether the target has recovered
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_cancelled(self):
+        """A call ended without an outcome; let the next call probe instead"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit opened after {self.consecutive_failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+        self._probe_in_flight = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+
+class DeadLetterQueue:
+    """Failed actions with the event that triggered them, persisted as JSON lines"""
+
+    # Lines in the file beyond the live entries before it is rewritten
+    COMPACT_SLACK_LINES = 1000
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 max_entries: int = 10000,
+                 flush_interval_seconds: float = 1.0,
+                 max_buffered_lines: int = 100):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_buffered_lines = max_buffered_lines
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Lines not yet written; appended on the event loop, drained under _write_lock
+        self._pending: Deque[str] = deque()
+        self._write_lock = threading.Lock()
+        self._file_lines = 0
+        self._flush_requested: Optional[asyncio.Event] = None
+        if self.path and self.path.exists():
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    self._file_lines += 1
+                    entry = json.loads(line)
+                    if entry.get("removed"):
+                        self._entries.pop(entry["id"], None)
+                    else:
+                        self._entries[entry["id"]] = entry
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load dead letters from {self.path}: {e}")
+        # Entries dropped at capacity are only trimmed from the file on compaction
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self,
+            action_name: str,
+            target: str,
+            event: Dict[str, Any],
+            error: str,
+            attempts: int) -> str:
+        """Record a failed action and return its entry id"""
+        entry_id = uuid.uuid4().hex
+        entry = {
+            "id": entry_id,
+            "action": action_name,
+            "target": target,
+            "error": error,
+            "attempts": attempts,
+            "failed_at": datetime.now().isoformat(),
+            "event": event
+        }
+        self._entries[entry_id] = entry
+        while len(self._entries) > self.max_entries:
+            _, dropped = self._entries.popitem(last=False)
+            logger.error(f"Dead-letter queue full, dropping {dropped['action']} for {dropped['event'].get('trigger_id')}")
+        self._buffer(entry)
+        return entry_id
+
+    def entries(self, action_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entries, oldest first, optionally for one action"""
+        return [
+            entry for entry in self._entries.values()
+            if action_name is None or entry["action"] == action_name
+        ]
+
+    def remove(self, entry_ids: Iterable[str]):
+        """Drop entries, e.g. after a successful replay"""
+        for entry_id in entry_ids:
+            if self._entries.pop(entry_id, None) is not None:
+                self._buffer({"id": entry_id, "removed": True})
+
+    def _buffer(self, record: Dict[str, Any]):
+        if not self.path:
+            return
+        self._pending.append(json.dumps(record, default=str))
+        if len(self._pending) >= self.max_buffered_lines:
+            if self._flush_requested is not None:
+                # The flush loop is running; wake it instead of writing here
+                self._flush_requested.set()
+            else:
+                self.flush()
+
+    def _prepare_write(self) -> Tuple[Optional[List[Dict[str, Any]]], int]:
+        """
+        On the appending thread: the entries to rewrite the file with, if
+        it is due for compaction, and how many pending lines they cover
+        """
+        if self._file_lines + len(self._pending) <= 2 * len(self._entries) + self.COMPACT_SLACK_LINES:
+            return None, 0
+        return list(self._entries.values()), len(self._pending)
+
+    def _write(self, snapshot: Optional[List[Dict[str, Any]]], covered: int):
+        """Rewrite the file from a snapshot and/or append pending lines; safe in a worker thread"""
+        with self._write_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if snapshot is not None:
+                for _ in range(covered):
+                    self._pending.popleft()
+                temp_path = self.path.with_suffix(".tmp")
+                with open(temp_path, "w") as f:
+                    for entry in snapshot:
+                        f.write(json.dumps(entry, default=str) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+                self._file_lines = len(snapshot)
+
+            lines = []
+            while self._pending:
+                lines.append(self._pending.popleft())
+            if lines:
+                with open(self.path, "a") as f:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._file_lines += len(lines)
+
+    def flush(self):
+        """Write pending changes now, compacting the file if it is due"""
+        if self.path:
+            self._write(*self._prepare_write())
+
+    def save(self):
+        """Rewrite the file with only the live entries"""
+        if self.path:
+            self._write(list(self._entries.values()), len(self._pending))
+
+    async def run(self, is_running: Callable[[], bool]):
+        """
+        Write pending changes on an interval, in a worker thread
+
+        Args:
+            is_running: Callable returning False once the engine stops
+        """
+        self._flush_requested = asyncio.Event()
+        try:
+            while is_running():
+                try:
+                    await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_requested.clear()
+                if not self._pending:
+                    continue
+                try:
+                    await asyncio.to_thread(self._write, *self._prepare_write())
+                except Exception as e:
+                    logger.error(f"Error writing dead letters: {e}")
+        finally:
+            self._flush_requested = None
+        self.flush()
@@ -6,10 +6,18 @@ appropriate actions when conditions are met.
 """
 
 import asyncio
+import hashlib
+import inspect
 import json
 import logging
+import os
+import pickle
+import sys
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Callable
+from itertools import islice
+from typing import Deque, Dict, Hashable, List, Any, Optional, Callable, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import re
@@ -20,6 +28,20 @@ from .slack.slack_integration import SlackIntegration
 from .email.gmail_integration import GmailIntegration
 from .gong.gong_integration import GongIntegration
 from .granola.granola_integration import GranolaIntegration
+from .trigger_cooldowns import CooldownStore, RecentIdCache
+from .trigger_delivery import CircuitBreaker, DeadLetterQueue, RetryPolicy
+from .trigger_log import TriggerEventLog
+from .trigger_payloads import PayloadStore
+from .trigger_polling import AdaptivePollInterval, PollCursorStore
+from .trigger_queue import PriorityTriggerQueue
+from .trigger_rule_parser import parse_trigger_markdown
+from .trigger_shards import ShardedEvaluator
+from .trigger_stats import TriggerStats
+from .triggers.conditions import compile_conditions, required_metric
+from .triggers.keyword_matcher import KeywordMatch, KeywordMatcher
+from .triggers.normalized_event import NormalizedEvent, event_dict, normalize
+from .triggers.rule_profiler import RuleProfiler
+from .triggers.window_counter import WindowStore
 
 logger = logging.getLogger(__name__)
 
@@ -42,22 +64,99 @@ class TriggerType(Enum):
     THRESHOLD = "threshold"
 
 
-@dataclass
+# Queue level of each priority, 0 being served first
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(TriggerPriority)}
+
+# How long a queued event may wait before it is served ahead of more urgent ones
+DEFAULT_AGING_SECONDS = {
+    TriggerPriority.CRITICAL: None,
+    TriggerPriority.HIGH: 30,
+    TriggerPriority.MEDIUM: 120,
+    TriggerPriority.LOW: 600,
+}
+
+# Priorities that may be dropped when the queue hits its hard limit, least urgent first
+DEFAULT_SHEDDABLE_PRIORITIES = (TriggerPriority.LOW, TriggerPriority.MEDIUM)
+
+# Priorities whose actions are coalesced into digests, and how long a digest stays open
+DEFAULT_DIGEST_INTERVALS = {
+    TriggerPriority.MEDIUM: 900,
+    TriggerPriority.LOW: 3600,
+}
+
+# Bumped whenever the pickled CompiledRuleset layout changes, invalidating cached rulesets
+RULESET_CACHE_VERSION = 2
+
+# Rule types evaluated over a per-customer sliding window of past events
+WINDOWED_TYPES = (TriggerType.THRESHOLD, TriggerType.PATTERN)
+DEFAULT_WINDOW_BUCKETS = 24
+
+
 class TriggerEvent:
-    """Represents a detected trigger event"""
-    trigger_id: str
-    trigger_type: TriggerType
-    priority: TriggerPriority
-    source: str  # Which integration detected it
-    timestamp: datetime
-    data: Dict[str, Any]
-    customer_id: Optional[str] = None
-    person_id: Optional[str] = None
-    matched_pattern: Optional[str] = None
+    """
+    Represents a detected trigger event
+    
+    Kept compact because thousands are retained: slots instead of a
+    __dict__, interned id/source strings, and once processed only a
+    reference to the payload, resolved through the engine's PayloadStore.
+    """
+    
+    __slots__ = (
+        "trigger_id", "trigger_type", "priority", "source", "timestamp",
+        "customer_id", "person_id", "matched_pattern", "matches", "log_sequence",
+        "payload_ref", "_data", "_payloads"
+    )
+    
+    def __init__(self,
+                 trigger_id: str,
+                 trigger_type: TriggerType,
+                 priority: TriggerPriority,
+                 source: str,  # Which integration detected it
+                 timestamp: datetime,
+                 data: Dict[str, Any],
+                 customer_id: Optional[str] = None,
+                 person_id: Optional[str] = None,
+                 matched_pattern: Optional[str] = None,
+                 matches: Tuple[KeywordMatch, ...] = (),
+                 log_sequence: Optional[int] = None):  # Position in the write-ahead log, if enabled
+        self.trigger_id = _intern(trigger_id)
+        self.trigger_type = trigger_type
+        self.priority = priority
+        self.source = _intern(source)
+        self.timestamp = timestamp
+        self.customer_id = _intern(customer_id)
+        self.person_id = _intern(person_id)
+        self.matched_pattern = _intern(matched_pattern)
+        self.matches = tuple(matches)
+        self.log_sequence = log_sequence
+        self.payload_ref: Optional[Hashable] = None
+        self._data: Optional[Dict[str, Any]] = data
+        self._payloads: Optional[PayloadStore] = None
+    
+    @property
+    def data(self) -> Dict[str, Any]:
+        """The event payload; empty once a released payload is evicted from its store"""
+        if self._data is not None:
+            return self._data
+        payload = self._payloads.get(self.payload_ref) if self._payloads else None
+        return payload if payload is not None else {}
+    
+    def release_payload(self, payloads: PayloadStore, ref: Optional[Hashable] = None):
+        """Hand the payload to a store and keep only its reference"""
+        if self._data is None:
+            return
+        self.payload_ref = payloads.put(self._data, ref)
+        self._payloads = payloads
+        self._data = None
+    
+    def __repr__(self) -> str:
+        return (f"TriggerEvent(trigger_id={self.trigger_id!r}, priority={self.priority.value}, "
+                f"source={self.source!r}, customer_id={self.customer_id!r}, "
+                f"timestamp={self.timestamp.isoformat()})")
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for storage/transmission"""
-        return {
+        result = {
             "trigger_id": self.trigger_id,
             "trigger_type": self.trigger_type.value,
             "priority": self.priority.value,
@@ -66,8 +165,60 @@ class TriggerEvent:
             "data": self.data,
             "customer_id": self.customer_id,
             "person_id": self.person_id,
-            "matched_pattern": self.matched_pattern
+            "matched_pattern": self.matched_pattern,
+            "matches": [
+                {"matched": m.matched, "start": m.start, "end": m.end}
+                for m in self.matches
+            ]
         }
+        if self.payload_ref is not None:
+            result["payload_ref"] = self.payload_ref
+        return result
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TriggerEvent":
+        """Rebuild an event from to_dict output"""
+        return cls(
+            trigger_id=data["trigger_id"],
+            trigger_type=TriggerType(data["trigger_type"]),
+            priority=TriggerPriority(data["priority"]),
+            source=data["source"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            data=data.get("data", {}),
+            customer_id=data.get("customer_id"),
+            person_id=data.get("person_id"),
+            matched_pattern=data.get("matched_pattern"),
+            matches=[
+                KeywordMatch(data["trigger_id"], m["matched"], m["start"], m["end"])
+                for m in data.get("matches", [])
+            ]
+        )
+
+
+def _accepts_keyword(func: Callable, name: str) -> bool:
+    """Whether a callable takes a keyword argument, by name or through **kwargs"""
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(
+        parameter.name == name or parameter.kind == inspect.Parameter.VAR_KEYWORD
+        for parameter in parameters
+    )
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Share one copy of repeated ids and names across retained events"""
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass
+class DigestBatch:
+    """Lower-priority trigger events collected for one recipient"""
+    recipient: str
+    priority: TriggerPriority
+    opened_at: float  # Engine clock (monotonic) when the first event arrived
+    events: List[TriggerEvent] = field(default_factory=list)
 
 
 @dataclass
@@ -83,25 +234,61 @@ class TriggerRule:
     enabled: bool = True
     cooldown_minutes: int = 0  # Prevent duplicate triggers
     last_triggered: Optional[datetime] = None
-    
-    def should_trigger(self, event_data: Dict[str, Any]) -> bool:
-        """Check if this rule should trigger based on event data"""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TriggerRule":
+        """Build a rule from a parsed definition"""
+        return cls(
+            id=data["id"],
+            name=data.get("name", data["id"]),
+            description=data.get("description", ""),
+            type=TriggerType(data["type"]),
+            priority=TriggerPriority(data.get("priority", TriggerPriority.MEDIUM.value)),
+            conditions=dict(data.get("conditions", {})),
+            actions=list(data.get("actions", [])),
+            enabled=data.get("enabled", True),
+            cooldown_minutes=data.get("cooldown_minutes", 0)
+        )
+
+    def should_trigger(self,
+                       event_data: Dict[str, Any],
+                       keyword_matches: Optional[List[KeywordMatch]] = None,
+                       check_cooldown: bool = True,
+                       windows: Optional[WindowStore] = None,
+                       now: Optional[float] = None) -> bool:
+        """
+        Check if this rule should trigger based on event data
+        
+        Args:
+            event_data: The incoming event
+            keyword_matches: This rule's hits from the engine's shared keyword
+                scan. When given, keyword rules use it instead of rescanning.
+            check_cooldown: Apply the rule-wide last_triggered cooldown. The
+                engine turns this off and tracks cooldowns per customer.
+            windows: Window counters for THRESHOLD and PATTERN rules, which
+                never trigger without them; the event is counted into them
+            now: Monotonic time for the windows
+        """
         if not self.enabled:
             return False
             
         # Check cooldown
-        if self.last_triggered and self.cooldown_minutes > 0:
+        if check_cooldown and self.last_triggered and self.cooldown_minutes > 0:
             cooldown_end = self.last_triggered + timedelta(minutes=self.cooldown_minutes)
             if datetime.now() < cooldown_end:
                 return False
         
         # Check conditions based on trigger type
         if self.type == TriggerType.KEYWORD:
+            if keyword_matches is not None:
+                return len(keyword_matches) > 0
             return self._check_keyword_conditions(event_data)
         elif self.type == TriggerType.CUSTOMER_SPECIFIC:
             return self._check_customer_conditions(event_data)
         elif self.type == TriggerType.METRIC:
             return self._check_metric_conditions(event_data)
+        elif self.type in WINDOWED_TYPES:
+            return self._check_window_conditions(event_data, keyword_matches, windows, now)
         # Add more condition checks as needed
         
         return False
@@ -109,7 +296,7 @@ class TriggerRule:
     def _check_keyword_conditions(self, event_data: Dict[str, Any]) -> bool:
         """Check keyword-based conditions"""
         keywords = self.conditions.get("keywords", [])
-        text = event_data.get("text", "").lower()
+        text = normalize(event_data).lower_text
         
         for keyword in keywords:
             if keyword.lower() in text:
@@ -130,41 +317,387 @@ class TriggerRule:
         
         return event_customer in target_customers
     
-    def _check_metric_conditions(self, event_data: Dict[str, Any]) -> bool:
-        """Check metric-based conditions"""
+    def _window_amount(self,
+                       event_data: Dict[str, Any],
+                       keyword_matches: Optional[List[KeywordMatch]]) -> float:
+        """What an event adds to the window: its metric value, or 1 if it matches the keywords"""
         metric_name = self.conditions.get("metric")
-        threshold = self.conditions.get("threshold")
-        operator = self.conditions.get("operator", "gt")  # gt, lt, eq, gte, lte
+        if metric_name:
+            try:
+                return float(event_data.get("metrics", {}).get(metric_name) or 0)
+            except (TypeError, ValueError):
+                return 0.0
+        if keyword_matches is not None:
+            return 1.0 if keyword_matches else 0.0
+        return 1.0 if self._check_keyword_conditions(event_data) else 0.0
+    
+    def _check_window_conditions(self,
+                                 event_data: Dict[str, Any],
+                                 keyword_matches: Optional[List[KeywordMatch]],
+                                 windows: Optional[WindowStore],
+                                 now: Optional[float]) -> bool:
+        """
+        Count the event into its customer's window and check the aggregate
         
-        metric_value = event_data.get("metrics", {}).get(metric_name)
-        if metric_value is None:
+        THRESHOLD fires when the window total reaches min_count, e.g. 3 churn
+        keywords within 24h. PATTERN compares the window with the one before
+        it and fires when it grew by growth_factor, e.g. support tickets
+        doubling week over week. Both fire on the event that makes the
+        condition true, not again while it stays true.
+        
+        Conditions: keywords/patterns or metric, window_hours (24), buckets
+        (24), min_count (1); PATTERN also growth_factor (2.0) and
+        min_previous (1).
+        """
+        amount = self._window_amount(event_data, keyword_matches)
+        if windows is None or amount <= 0:
             return False
         
-        if operator == "gt":
-            return metric_value > threshold
-        elif operator == "lt":
-            return metric_value < threshold
-        elif operator == "eq":
-            return metric_value == threshold
-        elif operator == "gte":
-            return metric_value >= threshold
-        elif operator == "lte":
-            return metric_value <= threshold
+        num_buckets = max(1, int(self.conditions.get("buckets", DEFAULT_WINDOW_BUCKETS)))
+        bucket_seconds = self.conditions.get("window_hours", 24) * 3600 / num_buckets
+        bucket = int((time.monotonic() if now is None else now) // bucket_seconds)
+        key = (self.id, event_data.get("customer_id") or "")
+        min_count = self.conditions.get("min_count", 1)
         
-        return False
+        if self.type == TriggerType.THRESHOLD:
+            counter = windows.counter(key, num_buckets)
+            counter.add(bucket, amount)
+            total = counter.total(bucket, 0, num_buckets)
+            return total >= min_count > total - amount
+        
+        counter = windows.counter(key, 2 * num_buckets)
+        counter.add(bucket, amount)
+        current = counter.total(bucket, 0, num_buckets)
+        previous = counter.total(bucket, num_buckets, num_buckets)
+        if previous < self.conditions.get("min_previous", 1):
+            return False
+        target = max(min_count, self.conditions.get("growth_factor", 2.0) * previous)
+        return current >= target > current - amount
+    
+    def _check_metric_conditions(self, event_data: Dict[str, Any]) -> bool:
+        """Check metric-based conditions, compiled on first use"""
+        predicate = self.__dict__.get("_metric_predicate")
+        if predicate is None:
+            predicate = self._metric_predicate = self._compile_metric_conditions()
+        return predicate(event_data)
+    
+    def invalidate_compiled(self):
+        """Drop compiled conditions so the next check recompiles them, e.g. after editing conditions"""
+        self.__dict__.pop("_metric_predicate", None)
+    
+    def _compile_metric_conditions(self) -> Callable[[Dict[str, Any]], bool]:
+        """Compile metric/threshold/operator, or nested all/any groups of them"""
+        try:
+            return compile_conditions(self.conditions)
+        except (TypeError, ValueError, re.error) as e:
+            logger.warning(f"Rule {self.id} has invalid metric conditions, it will not fire: {e}")
+            return lambda event_data: False
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # Compiled predicates are closures; rules are pickled for the cache and shards
+        state = self.__dict__.copy()
+        state.pop("_metric_predicate", None)
+        return state
+
+
+@dataclass
+class CompiledRuleset:
+    """Rules with their keyword matcher and indexes, built together and swapped in as one"""
+    rules: List[TriggerRule]
+    keyword_matcher: KeywordMatcher
+    rules_by_id: Dict[str, TriggerRule]
+    rules_by_customer: Dict[str, List[TriggerRule]]
+    rules_by_metric: Dict[str, List[TriggerRule]]
+    unindexed_rules: List[TriggerRule]
+    rule_order: Dict[str, int]
+    content_hash: Optional[str] = None  # sha256 of the rules file it was built from
+    
+    def match_keywords(self, text: str, lowered: bool = False) -> Dict[str, List[KeywordMatch]]:
+        """Scan text once and group keyword/pattern hits by rule id"""
+        matches_by_rule: Dict[str, List[KeywordMatch]] = {}
+        for match in self.keyword_matcher.scan(text, lowered):
+            matches_by_rule.setdefault(match.owner, []).append(match)
+        return matches_by_rule
+    
+    def candidate_rules(self,
+                        event_data: Dict[str, Any],
+                        keyword_hits: Dict[str, List[KeywordMatch]]) -> List[TriggerRule]:
+        """
+        Get the rules that could match an event, in ruleset order
+        
+        Args:
+            event_data: The incoming event
+            keyword_hits: Result of match_keywords for the event text
+        """
+        candidates = [self.rules_by_id[rule_id] for rule_id in keyword_hits]
+        
+        customer_id = event_data.get("customer_id")
+        if customer_id:
+            candidates.extend(self.rules_by_customer.get(customer_id, ()))
+        
+        metrics = event_data.get("metrics")
+        if metrics:
+            for metric_name in metrics:
+                candidates.extend(self.rules_by_metric.get(metric_name, ()))
+        
+        candidates.extend(self.unindexed_rules)
+        
+        if len(candidates) > 1:
+            candidates.sort(key=lambda rule: self.rule_order[rule.id])
+        return candidates
+    
+    def evaluate(self,
+                 event_data: Dict[str, Any],
+                 cooldowns: CooldownStore,
+                 now: float,
+                 profiler: Optional[RuleProfiler] = None,
+                 windows: Optional[WindowStore] = None) -> List[Tuple[TriggerRule, Optional[List[KeywordMatch]]]]:
+        """
+        Find the rules an event fires and start their cooldowns
+        
+        Holds no engine state, so shard processes run the same evaluation.
+        
+        Args:
+            event_data: Normalized event
+            cooldowns: Cooldown store checked and updated for the event's customer
+            now: Monotonic time for cooldown checks
+            profiler: Times the evaluation per rule when it samples this event
+            windows: Window counters for THRESHOLD and PATTERN rules
+        
+        Returns:
+            (rule, keyword matches or None for non-keyword rules) per fired rule
+        """
+        if profiler is not None and profiler.sample():
+            return self._evaluate_profiled(normalize(event_data), cooldowns, now, profiler, windows)
+        
+        event_data = normalize(event_data)
+        fired = []
+        customer_key = event_data.customer_key
+        
+        # One scan of the text covers every keyword rule
+        keyword_hits = self.match_keywords(event_data.lower_text, lowered=True)
+        
+        # Only evaluate rules the indexes say could match this event
+        for rule in self.candidate_rules(event_data, keyword_hits):
+            self._check_rule(rule, event_data, keyword_hits, cooldowns, customer_key, now, fired, windows)
+        
+        return fired
+    
+    def _check_rule(self,
+                    rule: TriggerRule,
+                    event_data: Dict[str, Any],
+                    keyword_hits: Dict[str, List[KeywordMatch]],
+                    cooldowns: CooldownStore,
+                    customer_key: str,
+                    now: float,
+                    fired: List[Tuple[TriggerRule, Optional[List[KeywordMatch]]]],
+                    windows: Optional[WindowStore] = None) -> bool:
+        """Evaluate one candidate rule, appending it to fired if it fires"""
+        cooling = rule.cooldown_minutes > 0 and cooldowns.is_cooling_down(rule.id, customer_key, now)
+        # Windowed rules still count events while cooling down
+        if cooling and rule.type not in WINDOWED_TYPES:
+            return False
+        
+        rule_matches = None
+        if rule.type == TriggerType.KEYWORD or rule.id in keyword_hits:
+            rule_matches = keyword_hits.get(rule.id, [])
+        
+        triggered = rule.should_trigger(event_data, rule_matches, check_cooldown=False, windows=windows, now=now)
+        if not triggered or cooling:
+            return False
+        fired.append((rule, rule_matches))
+        # The cooldown applies to this customer only
+        if rule.cooldown_minutes > 0:
+            cooldowns.start(rule.id, customer_key, rule.cooldown_minutes * 60, now)
+        return True
+    
+    def _evaluate_profiled(self,
+                           event_data: NormalizedEvent,
+                           cooldowns: CooldownStore,
+                           now: float,
+                           profiler: RuleProfiler,
+                           windows: Optional[WindowStore]) -> List[Tuple[TriggerRule, Optional[List[KeywordMatch]]]]:
+        """evaluate() with per-rule timings recorded, for sampled events"""
+        clock = profiler.clock
+        fired = []
+        customer_key = event_data.customer_key
+        text = event_data.lower_text
+        
+        started = clock()
+        keyword_hits = self.match_keywords(text, lowered=True)
+        profiler.record_scan(clock() - started)
+        
+        # The shared scan hides which regex is slow, so time each rule's patterns alone
+        keyword_seconds = self.keyword_matcher.patterns.time_patterns(text, clock) if text else {}
+        keyword_hit = {rule_id: rule_id in keyword_hits for rule_id in keyword_seconds}
+        for rule_id in keyword_hits:
+            keyword_seconds.setdefault(rule_id, 0.0)
+            keyword_hit[rule_id] = True
+        
+        for rule in self.candidate_rules(event_data, keyword_hits):
+            started = clock()
+            hit = self._check_rule(rule, event_data, keyword_hits, cooldowns, customer_key, now, fired, windows)
+            elapsed = clock() - started
+            if rule.id in keyword_seconds:
+                # Rules reached through the scan (keyword and windowed keyword
+                # rules) are recorded once below, with their share of the scan
+                keyword_seconds[rule.id] += elapsed
+                keyword_hit[rule.id] = hit
+            else:
+                profiler.record(rule.id, elapsed, hit)
+        
+        for rule_id, seconds in keyword_seconds.items():
+            profiler.record_keyword(rule_id, seconds, keyword_hit[rule_id])
+        
+        return fired
 
 
 class TriggerEngine:
     """Main trigger engine that coordinates monitoring and actions"""
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self,
+                 config_path: Optional[str] = None,
+                 num_workers: int = 4,
+                 action_timeout_seconds: float = 30.0,
+                 preserve_customer_order: bool = True,
+                 max_retained_events: int = 10000,
+                 max_retained_payloads: int = 1000,
+                 state_dir: Optional[str] = None,
+                 aging_seconds: Optional[Dict[TriggerPriority, Optional[float]]] = None,
+                 digest_intervals: Optional[Dict[TriggerPriority, float]] = None,
+                 digest_max_events: int = 50,
+                 digest_recipient: Optional[Callable[[TriggerEvent], str]] = None,
+                 max_queue_size: int = 10000,
+                 queue_high_watermark: float = 0.8,
+                 queue_low_watermark: float = 0.5,
+                 sheddable_priorities: Tuple[TriggerPriority, ...] = DEFAULT_SHEDDABLE_PRIORITIES,
+                 max_cooldown_entries: int = 100000,
+                 dedupe_cache_size: int = 100000,
+                 rules_path: Optional[str] = None,
+                 rules_cache_dir: Optional[str] = None,
+                 num_shards: int = 0,
+                 profile_sample_rate: float = 0.01,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_failure_threshold: int = 5,
+                 circuit_reset_seconds: float = 30.0,
+                 max_dead_letters: int = 10000,
+                 max_window_entries: int = 100000,
+                 slow_rule_budget_ms: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], datetime] = datetime.now):
+        # Time sources for cooldowns, digests, stats and trigger timestamps;
+        # replay injects a simulated clock so history behaves as it did live
+        self.clock = clock
+        self.wall_clock = wall_clock
+        
         self.rules: List[TriggerRule] = []
+        self.ruleset: Optional[CompiledRuleset] = None  # Active compiled form of self.rules
+        self.keyword_matcher = KeywordMatcher()
+        
+        # Secondary indexes so each event only sees rules that could match it
+        self.rules_by_id: Dict[str, TriggerRule] = {}
+        self.rules_by_customer: Dict[str, List[TriggerRule]] = {}
+        self.rules_by_metric: Dict[str, List[TriggerRule]] = {}
+        self.unindexed_rules: List[TriggerRule] = []
+        self._rule_order: Dict[str, int] = {}
+        
+        # Rules file, its compiled-ruleset cache and what's needed to hot reload it;
+        # compiled rulesets are only cached when a cache or state directory is given
+        project_root = Path(__file__).parent.parent
+        self.rules_path = Path(rules_path) if rules_path else project_root / "personal" / "triggers.md"
+        self.rules_cache_dir: Optional[Path] = None
+        if rules_cache_dir:
+            self.rules_cache_dir = Path(rules_cache_dir)
+        elif state_dir:
+            self.rules_cache_dir = Path(state_dir) / "rules_cache"
+        self._rules_content_hash: Optional[str] = None
+        self._rules_file_signature: Optional[Tuple[int, int]] = None
+        self._runtime_rules: Dict[str, TriggerRule] = {}  # add_rule() rules, kept across reloads
+        self._retired_rules: Dict[str, TriggerRule] = {}  # dropped by a reload, events still pending
+        self._pending_by_rule: Dict[str, int] = {}  # Events queued or in flight per rule id
         self.integrations: Dict[str, BaseIntegration] = {}
         self.action_handlers: Dict[str, Callable] = {}
-        self.event_queue: asyncio.Queue = asyncio.Queue()
-        self.processed_events: List[TriggerEvent] = []
+        
+        # Priority scheduling: CRITICAL first, lower priorities aged so they never starve
+        aging = {**DEFAULT_AGING_SECONDS, **(aging_seconds or {})}
+        self.event_queue: asyncio.Queue = PriorityTriggerQueue(
+            rank_of=lambda event: PRIORITY_RANK[event.priority],
+            aging_seconds=[aging[priority] for priority in TriggerPriority],
+            maxsize=max_queue_size,
+            clock=clock
+        )
+        
+        # Backpressure: monitors pause above the high watermark until the queue
+        # drains below the low one; at the hard limit sheddable events are dropped
+        self.max_queue_size = max_queue_size
+        self.queue_high_watermark = int(max_queue_size * queue_high_watermark)
+        self.queue_low_watermark = int(max_queue_size * queue_low_watermark)
+        self.shed_min_rank = min(
+            (PRIORITY_RANK[priority] for priority in sheddable_priorities),
+            default=len(TriggerPriority)
+        )
+        
+        # Digest batching of lower priorities, keyed by (recipient, priority)
+        self.digest_intervals = DEFAULT_DIGEST_INTERVALS if digest_intervals is None else digest_intervals
+        self.digest_max_events = digest_max_events
+        self.digest_recipient = digest_recipient or self._default_digest_recipient
+        self._digests: Dict[Tuple[str, TriggerPriority], DigestBatch] = {}
+        
+        self.processed_events: Deque[TriggerEvent] = deque(maxlen=max_retained_events)
+        # Retained events keep a reference; only the most recent payloads are held
+        self.payloads = PayloadStore(max_entries=max_retained_payloads)
+        self.stats = TriggerStats(clock=clock)
+        self.stats.record_queue_depth(0)
+        
+        # Write-ahead log of queue and cooldown changes, replayed on startup
+        self.event_log: Optional[TriggerEventLog] = TriggerEventLog(state_dir, clock=wall_clock) if state_dir else None
+        self._recovered_events: List[TriggerEvent] = []
         self.running = False
         
+        # Cooldowns per (rule, customer) and recently seen source message ids
+        self.cooldowns = CooldownStore(max_entries=max_cooldown_entries, clock=clock)
+        self.seen_message_ids = RecentIdCache(max_entries=dedupe_cache_size)
+        # Sliding-window counts per (rule, customer) for THRESHOLD and PATTERN rules
+        self.windows = WindowStore(max_entries=max_window_entries)
+        
+        # Rule evaluation in worker processes partitioned by customer, or in-process when 0
+        self.shards: Optional[ShardedEvaluator] = (
+            ShardedEvaluator(num_shards, max_cooldown_entries, max_window_entries) if num_shards > 0 else None
+        )
+        
+        # Sampled per-rule timings of in-process evaluation; 0 turns profiling off
+        self.profiler = RuleProfiler(sample_rate=profile_sample_rate, slow_rule_budget_ms=slow_rule_budget_ms)
+        
+        # High-water marks so monitors only process items newer than the last poll
+        self.poll_cursors = PollCursorStore(
+            str(Path(state_dir) / "poll_cursors.json") if state_dir else None
+        )
+        
+        # Action dispatch: N queue consumers, per-action timeouts and concurrency caps
+        self.num_workers = max(1, num_workers)
+        self.action_timeout_seconds = action_timeout_seconds
+        self.preserve_customer_order = preserve_customer_order
+        self.action_timeouts: Dict[str, float] = {}
+        self.action_limits: Dict[str, asyncio.Semaphore] = {}
+        self._customer_locks: Dict[str, asyncio.Lock] = {}
+        self._customer_inflight: Dict[str, int] = {}
+        
+        # Delivery: retries with backoff, a circuit breaker per downstream target,
+        # and a dead-letter queue for actions that still fail
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.action_retry_policies: Dict[str, RetryPolicy] = {}
+        self.action_targets: Dict[str, str] = {}
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_reset_seconds = circuit_reset_seconds
+        self.circuits: Dict[str, CircuitBreaker] = {}
+        self.dead_letters = DeadLetterQueue(
+            str(Path(state_dir) / "dead_letters.jsonl") if state_dir else None,
+            max_entries=max_dead_letters
+        )
+        self._retry_tasks: Set[asyncio.Task] = set()
+        self.action_retries = 0
+        self.action_failures = 0
+        
         # Load configuration
         if config_path:
             self.load_config(config_path)
@@ -174,6 +707,49 @@ class TriggerEngine:
         
         # Load trigger rules from markdown file
         self._load_trigger_rules()
+        
+        if self.event_log:
+            self._recover_from_log()
+    
+    def _recover_from_log(self):
+        """Restore cooldowns and unfinished events recorded in the event log"""
+        pending, cooldowns = self.event_log.recover()
+        
+        now = self.wall_clock()
+        for rule_id, by_customer in cooldowns.items():
+            rule = self.rules_by_id.get(rule_id)
+            if not rule:
+                continue
+            for customer_key, last_triggered in by_customer.items():
+                if not last_triggered:
+                    continue
+                fired_at = datetime.fromisoformat(last_triggered)
+                if not rule.last_triggered or fired_at > rule.last_triggered:
+                    rule.last_triggered = fired_at
+                # Wall-clock time survives restarts; convert what's left to the monotonic store
+                remaining = rule.cooldown_minutes * 60 - (now - fired_at).total_seconds()
+                self.cooldowns.start(rule_id, customer_key, remaining)
+        
+        for sequence, event_dict in pending:
+            trigger_event = TriggerEvent.from_dict(event_dict)
+            trigger_event.log_sequence = sequence
+            self._recovered_events.append(trigger_event)
+        
+        if pending:
+            logger.info(f"Recovered {len(pending)} unfinished trigger events from the event log")
+    
+    async def _requeue_recovered_events(self):
+        """Replay events that were still queued when the engine last stopped"""
+        recovered, self._recovered_events = self._recovered_events, []
+        for trigger_event in recovered:
+            # Already in the log under their original sequence numbers
+            await self._enqueue(trigger_event, log=False)
+    
+    def checkpoint(self):
+        """Flush the event log and fold closed segments into a snapshot"""
+        if self.event_log:
+            self.event_log.flush()
+            self.event_log.compact()
     
     def _init_integrations(self):
         """Initialize available integrations"""
@@ -186,12 +762,24 @@ class TriggerEngine:
         }
     
     def _load_trigger_rules(self):
-        """Load trigger rules from the triggers.md file"""
-        triggers_path = Path(__file__).parent.parent / "personal" / "triggers.md"
+        """Load trigger rules from the triggers.md file, falling back to the built-in rules"""
+        self._rules_file_signature = self._stat_rules_file()
+        try:
+            ruleset = self._build_ruleset()
+        except (OSError, ValueError, KeyError, re.error) as e:
+            logger.error(f"Could not load trigger rules from {self.rules_path}: {e}")
+            ruleset = None
         
-        # For now, we'll define some example rules
-        # In production, these would be parsed from the markdown file
-        self.rules = [
+        if ruleset is None:
+            self.rules = self._default_rules()
+            self.compile_rules()
+        else:
+            self._install_ruleset(ruleset)
+    
+    @staticmethod
+    def _default_rules() -> List[TriggerRule]:
+        """Built-in rules, used when the rules file is missing or invalid"""
+        return [
             TriggerRule(
                 id="high_value_account_mention",
                 name="High Value Account Mention",
@@ -243,37 +831,811 @@ class TriggerEngine:
             )
         ]
     
-    def register_action_handler(self, action_name: str, handler: Callable):
-        """Register an action handler"""
+    def _stat_rules_file(self) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, size) of the rules file, None if it doesn't exist"""
+        try:
+            stat = self.rules_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _build_ruleset(self, current_hash: Optional[str] = None) -> Optional[CompiledRuleset]:
+        """
+        Parse and compile the rules file, or load its compiled form from the cache
+        
+        Only builds new objects, so it is safe to run off the event loop.
+        
+        Args:
+            current_hash: Content hash of the installed ruleset; if the file
+                still hashes to it, nothing is built
+        
+        Returns:
+            The compiled ruleset, or None if the file is missing or unchanged
+        """
+        if not self.rules_path.exists():
+            return None
+        content = self.rules_path.read_bytes()
+        content_hash = hashlib.sha256(content).hexdigest()
+        if content_hash == current_hash:
+            return None
+        
+        cache_path = None
+        if self.rules_cache_dir is not None:
+            cache_path = self.rules_cache_dir / f"trigger_rules_v{RULESET_CACHE_VERSION}_{content_hash[:32]}.pickle"
+            ruleset = self._load_cached_ruleset(cache_path, content_hash)
+            if ruleset is not None:
+                return ruleset
+        
+        definitions = parse_trigger_markdown(content.decode("utf-8"))
+        ruleset = self._compile_ruleset([TriggerRule.from_dict(d) for d in definitions])
+        ruleset.content_hash = content_hash
+        if cache_path is not None:
+            self._save_cached_ruleset(cache_path, ruleset)
+        return ruleset
+    
+    @staticmethod
+    def _load_cached_ruleset(cache_path: Path, content_hash: str) -> Optional[CompiledRuleset]:
+        """Load a compiled ruleset from the cache, None on a miss"""
+        if not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, "rb") as f:
+                ruleset = pickle.load(f)
+        except Exception as e:
+            # Truncated, or written by an incompatible version; it gets rebuilt
+            logger.warning(f"Ignoring unreadable ruleset cache {cache_path.name}: {e}")
+            return None
+        if not isinstance(ruleset, CompiledRuleset) or ruleset.content_hash != content_hash:
+            return None
+        return ruleset
+    
+    def _save_cached_ruleset(self, cache_path: Path, ruleset: CompiledRuleset, keep: int = 8):
+        """Write a compiled ruleset to the cache atomically, keeping the newest few"""
+        try:
+            self.rules_cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            with open(temp_path, "wb") as f:
+                pickle.dump(ruleset, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+            
+            # Older versions stay cached so reverting an edit is still a hit
+            cached = sorted(
+                self.rules_cache_dir.glob("trigger_rules_v*.pickle"),
+                key=lambda path: path.stat().st_mtime,
+                reverse=True
+            )
+            for stale in cached[keep:]:
+                stale.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not cache compiled trigger rules: {e}")
+    
+    def _compile_ruleset(self, rules: List[TriggerRule]) -> CompiledRuleset:
+        """
+        Compile the enabled rules into a keyword matcher and rule indexes
+        
+        Keyword rules are reached through the matcher, customer rules through
+        customer_id and metric rules through a metric they require; windowed rules
+        through whichever of keywords or metric they count. Rule types without
+        an index are checked against every event.
+        """
+        matcher = KeywordMatcher()
+        rules_by_customer: Dict[str, List[TriggerRule]] = {}
+        rules_by_metric: Dict[str, List[TriggerRule]] = {}
+        unindexed_rules: List[TriggerRule] = []
+        
+        for rule in rules:
+            # Conditions may have been edited since they were last compiled
+            rule.invalidate_compiled()
+            if not rule.enabled:
+                continue
+            windowed = rule.type in WINDOWED_TYPES
+            if rule.type == TriggerType.KEYWORD or (windowed and not rule.conditions.get("metric")):
+                matcher.add_keywords(rule.conditions.get("keywords", []), rule.id)
+                matcher.add_patterns(rule.conditions.get("patterns", []), rule.id)
+            elif rule.type == TriggerType.CUSTOMER_SPECIFIC:
+                for customer_id in dict.fromkeys(rule.conditions.get("customer_ids", [])):
+                    rules_by_customer.setdefault(customer_id, []).append(rule)
+            elif windowed and rule.conditions.get("metric"):
+                rules_by_metric.setdefault(rule.conditions["metric"], []).append(rule)
+            elif rule.type == TriggerType.METRIC and required_metric(rule.conditions):
+                # Grouped conditions are reached through a metric every match needs
+                rules_by_metric.setdefault(required_metric(rule.conditions), []).append(rule)
+            else:
+                unindexed_rules.append(rule)
+        matcher.compile()
+        
+        return CompiledRuleset(
+            rules=list(rules),
+            keyword_matcher=matcher,
+            rules_by_id={rule.id: rule for rule in rules},
+            rules_by_customer=rules_by_customer,
+            rules_by_metric=rules_by_metric,
+            unindexed_rules=unindexed_rules,
+            rule_order={rule.id: position for position, rule in enumerate(rules)}
+        )
+    
+    def _apply_ruleset(self, ruleset: CompiledRuleset):
+        """Make a compiled ruleset the active one"""
+        # Plain attribute swaps with no await in between, so an event never
+        # sees a mix of old and new structures
+        self.ruleset = ruleset
+        self.rules = ruleset.rules
+        self.keyword_matcher = ruleset.keyword_matcher
+        self.rules_by_id = ruleset.rules_by_id
+        self.rules_by_customer = ruleset.rules_by_customer
+        self.rules_by_metric = ruleset.rules_by_metric
+        self.unindexed_rules = ruleset.unindexed_rules
+        self._rule_order = ruleset.rule_order
+    
+    def _install_ruleset(self, ruleset: CompiledRuleset):
+        """Activate a ruleset built from the rules file, keeping per-rule state"""
+        previous = self.rules_by_id
+        for rule in ruleset.rules:
+            if rule.id in previous:
+                rule.last_triggered = previous[rule.id].last_triggered
+        
+        if self._runtime_rules:
+            # Rules added through add_rule() survive reloads and win on id clashes
+            rules = [rule for rule in ruleset.rules if rule.id not in self._runtime_rules]
+            content_hash = ruleset.content_hash
+            ruleset = self._compile_ruleset(rules + list(self._runtime_rules.values()))
+            ruleset.content_hash = content_hash
+        
+        # Events still pending for a dropped rule run its actions; a rule
+        # stays retired across later reloads until its events drain
+        retired = {**self._retired_rules, **previous}
+        self._retired_rules = {
+            rule_id: rule for rule_id, rule in retired.items()
+            if rule_id not in ruleset.rules_by_id and self._pending_by_rule.get(rule_id)
+        }
+        self._rules_content_hash = ruleset.content_hash
+        self._apply_ruleset(ruleset)
+    
+    async def reload_rules(self) -> bool:
+        """
+        Re-read the rules file and swap in its ruleset if the content changed
+        
+        Parsing and compiling run in a worker thread; the swap happens on the
+        event loop, so queued events are kept and every event is evaluated
+        against either the old or the new ruleset as a whole. An invalid file
+        leaves the current rules in place.
+        
+        Returns:
+            True if a new ruleset was installed
+        """
+        try:
+            ruleset = await asyncio.to_thread(self._build_ruleset, self._rules_content_hash)
+        except (OSError, ValueError, KeyError, re.error) as e:
+            logger.error(f"Keeping current trigger rules, could not reload {self.rules_path}: {e}")
+            return False
+        if ruleset is None:
+            return False
+        
+        self._install_ruleset(ruleset)
+        logger.info(f"Reloaded {len(self.rules)} trigger rules from {self.rules_path}")
+        return True
+    
+    async def watch_rules_file(self, interval_seconds: float = 2.0):
+        """Hot reload the rules file whenever its mtime or size changes"""
+        while self.running:
+            await asyncio.sleep(interval_seconds)
+            signature = self._stat_rules_file()
+            if signature is None or signature == self._rules_file_signature:
+                continue
+            self._rules_file_signature = signature
+            await self.reload_rules()
+    
+    def compile_rules(self):
+        """
+        Recompile self.rules into the keyword matcher and rule indexes
+        
+        Must be called whenever the ruleset changes, including after editing a
+        rule's conditions in place; add_rule, remove_rule and set_rule_enabled
+        do this automatically.
+        """
+        self._apply_ruleset(self._compile_ruleset(self.rules))
+    
+    def add_rule(self, rule: TriggerRule):
+        """Add a rule, replacing any existing rule with the same id; kept across reloads"""
+        self._runtime_rules[rule.id] = rule
+        self.rules = [r for r in self.rules if r.id != rule.id] + [rule]
+        self.compile_rules()
+    
+    def remove_rule(self, rule_id: str) -> bool:
+        """Remove a rule by id; rules from the rules file come back when the file next changes"""
+        self._runtime_rules.pop(rule_id, None)
+        remaining = [r for r in self.rules if r.id != rule_id]
+        if len(remaining) == len(self.rules):
+            return False
+        self.rules = remaining
+        self.compile_rules()
+        return True
+    
+    def set_rule_enabled(self, rule_id: str, enabled: bool) -> bool:
+        """Enable or disable a rule by id"""
+        rule = self.rules_by_id.get(rule_id)
+        if not rule:
+            return False
+        rule.enabled = enabled
+        self.compile_rules()
+        return True
+    
+    def match_keywords(self, text: str) -> Dict[str, List[KeywordMatch]]:
+        """Scan text once and group keyword/pattern hits by rule id"""
+        return self.ruleset.match_keywords(text)
+    
+    def candidate_rules(self,
+                        event_data: Dict[str, Any],
+                        keyword_hits: Dict[str, List[KeywordMatch]]) -> List[TriggerRule]:
+        """Get the rules that could match an event, in ruleset order"""
+        return self.ruleset.candidate_rules(event_data, keyword_hits)
+
+    def evaluate_metric_snapshot(self, metrics_by_customer: Dict[str, Dict[str, Any]]) -> set:
+        """
+        Evaluate every metric rule against every customer at once (vectorized with numpy)
+    
+        For nightly sweeps; no cooldowns are applied and nothing is queued.
+    
+        Args:
+            metrics_by_customer: customer_id -> metrics dict
+    
+        Returns:
+            Set of (rule_id, customer_id) pairs that fire
+        """
+        from .trigger_batch import BatchMetricEvaluator, MetricSnapshot
+        evaluator = BatchMetricEvaluator(self.rules)
+        snapshot = MetricSnapshot.from_records(metrics_by_customer, evaluator.metrics)
+        return evaluator.evaluate(snapshot)
+    
+    def register_action_handler(self,
+                                action_name: str,
+                                handler: Callable,
+                                timeout_seconds: Optional[float] = None,
+                                max_concurrency: Optional[int] = None,
+                                target: Optional[str] = None,
+                                retry_policy: Optional[RetryPolicy] = None):
+        """
+        Register an action handler
+        
+        Args:
+            action_name: Name referenced by rule actions
+            handler: Async callable receiving the TriggerEvent
+            timeout_seconds: Hard timeout per call, defaults to action_timeout_seconds
+            max_concurrency: Maximum in-flight calls of this action across all workers
+            target: Downstream it calls (e.g. "crm", "smtp"); actions sharing a
+                target share a circuit breaker. Defaults to the action name.
+            retry_policy: Overrides the engine's retry policy for this action
+        """
         self.action_handlers[action_name] = handler
+        if timeout_seconds is not None:
+            self.action_timeouts[action_name] = timeout_seconds
+        if max_concurrency is not None:
+            self.action_limits[action_name] = asyncio.Semaphore(max_concurrency)
+        if target is not None:
+            self.action_targets[action_name] = target
+        if retry_policy is not None:
+            self.action_retry_policies[action_name] = retry_policy
+    
+    def _normalize_event(self, event_data: Any) -> Optional[NormalizedEvent]:
+        """Normalize a raw integration payload once; every rule reuses the result"""
+        if not isinstance(event_data, (dict, NormalizedEvent)):
+            return None
+        return normalize(event_data)
+    
+    @staticmethod
+    def _message_id(source: str, event_data: Dict[str, Any]) -> Optional[str]:
+        """Stable id of the source message behind an event, if it has one"""
+        for field_name in ("message_id", "client_msg_id", "id"):
+            if event_data.get(field_name):
+                return f"{source}:{event_data[field_name]}"
+        if event_data.get("ts"):
+            # Slack messages are identified by channel plus ts
+            return f"{source}:{event_data.get('channel', '')}:{event_data['ts']}"
+        return None
+    
+    def _is_duplicate(self, source: str, event_data: Dict[str, Any]) -> bool:
+        """Check the message id against recently processed ones before evaluating rules"""
+        message_id = self._message_id(source, event_data)
+        if message_id is None:
+            return False
+        if self.seen_message_ids.seen(message_id):
+            self.stats.duplicates_skipped += 1
+            return True
+        return False
+    
+    def _evaluate_event(self,
+                        source: str,
+                        event_data: Dict[str, Any],
+                        timestamp: datetime,
+                        now: Optional[float] = None) -> List[TriggerEvent]:
+        """
+        Evaluate one event against the ruleset and return the fired triggers
+        
+        Args:
+            source: Integration the event came from
+            event_data: Normalized event
+            timestamp: Wall-clock time stamped on fired triggers
+            now: Monotonic time for cooldown checks, shared across a batch
+        """
+        now = self.clock() if now is None else now
+        return [
+            self._fire(rule, rule_matches, source, event_data, timestamp)
+            for rule, rule_matches in self.ruleset.evaluate(
+                event_data, self.cooldowns, now, self.profiler, self.windows
+            )
+        ]
+    
+    def _fire(self,
+              rule: TriggerRule,
+              rule_matches: Optional[List[KeywordMatch]],
+              source: str,
+              event_data: Dict[str, Any],
+              timestamp: datetime) -> TriggerEvent:
+        """Build the trigger event for a fired rule and record the firing"""
+        # Update last triggered time and log the customer's cooldown for recovery
+        rule.last_triggered = timestamp
+        if rule.cooldown_minutes > 0 and self.event_log:
+            customer_key = event_data.get("customer_id") or ""
+            expires_at = timestamp + timedelta(minutes=rule.cooldown_minutes)
+            self.event_log.append_cooldown(rule.id, customer_key, timestamp.isoformat(), expires_at.isoformat())
+        
+        logger.info(f"Trigger fired: {rule.name} from {source}")
+        return TriggerEvent(
+            trigger_id=rule.id,
+            trigger_type=rule.type,
+            priority=rule.priority,
+            source=source,
+            timestamp=timestamp,
+            data=event_dict(event_data),
+            customer_id=event_data.get("customer_id"),
+            person_id=event_data.get("person_id"),
+            matched_pattern=rule.name,
+            matches=rule_matches or []
+        )
+    
+    async def _evaluate_sharded(self,
+                                source: str,
+                                events: List[Dict[str, Any]],
+                                timestamp: datetime,
+                                now: float) -> List[TriggerEvent]:
+        """Evaluate a batch in the shard processes and build its trigger events here"""
+        ruleset = self.ruleset
+        results = await self.shards.evaluate(ruleset, events, now, self.cooldowns)
+        
+        fired = []
+        for event_data, hits in zip(events, results):
+            customer_key = event_data.get("customer_id") or ""
+            for rule_id, rule_matches in hits:
+                rule = ruleset.rules_by_id[rule_id]
+                # The shard owns the cooldown; mirror it so restarted shards are seeded with it
+                if rule.cooldown_minutes > 0:
+                    self.cooldowns.start(rule.id, customer_key, rule.cooldown_minutes * 60, now)
+                fired.append(self._fire(rule, rule_matches, source, event_data, timestamp))
+        return fired
+    
+    def _log_enqueued(self, trigger_event: TriggerEvent):
+        """Record an event in the write-ahead log before it enters the queue"""
+        if self.event_log:
+            trigger_event.log_sequence = self.event_log.append_enqueued(trigger_event.to_dict())
+    
+    def _shed(self, trigger_event: TriggerEvent):
+        """Account for an event dropped by the load-shedding policy"""
+        self.stats.record_shed(trigger_event.priority.value)
+        if self.event_log and trigger_event.log_sequence is not None:
+            self.event_log.append_completed(trigger_event.log_sequence)
+        self._release_rule(trigger_event.trigger_id)
+        logger.warning(f"Queue full, shed {trigger_event.priority.value} trigger {trigger_event.trigger_id}")
+    
+    async def _enqueue(self, trigger_event: TriggerEvent, log: bool = True):
+        """
+        Put an event on the queue, shedding the least urgent work at the hard limit
+        
+        When the queue is full, the oldest queued event that is sheddable and no
+        more urgent than the new one is dropped. If there is none, a sheddable
+        new event is dropped itself; anything else waits for room.
+        """
+        if log:
+            self._log_enqueued(trigger_event)
+        rule_id = trigger_event.trigger_id
+        self._pending_by_rule[rule_id] = self._pending_by_rule.get(rule_id, 0) + 1
+        
+        if self.event_queue.full():
+            rank = PRIORITY_RANK[trigger_event.priority]
+            victim = self.event_queue.shed(max(rank, self.shed_min_rank))
+            if victim is not None:
+                self._shed(victim)
+            elif rank >= self.shed_min_rank:
+                self._shed(trigger_event)
+                return
+        
+        await self.event_queue.put(trigger_event)
+        self.stats.record_queue_depth(self.event_queue.qsize())
+    
+    async def _wait_for_queue_capacity(self, check_interval_seconds: float = 0.5):
+        """Hold a monitor back while the queue is above its high watermark"""
+        if self.event_queue.qsize() < self.queue_high_watermark:
+            return
+        
+        started = self.clock()
+        logger.info(f"Trigger queue at {self.event_queue.qsize()}, pausing polling")
+        while self.running and self.event_queue.qsize() > self.queue_low_watermark:
+            await asyncio.sleep(check_interval_seconds)
+        self.stats.record_delay(self.clock() - started)
     
     async def process_event(self, source: str, event_data: Dict[str, Any]):
         """Process an incoming event from an integration"""
-        # Check all rules against this event
-        for rule in self.rules:
-            if rule.should_trigger(event_data):
-                trigger_event = TriggerEvent(
-                    trigger_id=rule.id,
-                    trigger_type=rule.type,
-                    priority=rule.priority,
-                    source=source,
-                    timestamp=datetime.now(),
-                    data=event_data,
-                    customer_id=event_data.get("customer_id"),
-                    person_id=event_data.get("person_id"),
-                    matched_pattern=rule.name
-                )
-                
-                # Add to queue for processing
-                await self.event_queue.put(trigger_event)
-                
-                # Update last triggered time
-                rule.last_triggered = datetime.now()
-                
-                logger.info(f"Trigger fired: {rule.name} from {source}")
+        if self.shards:
+            await self.process_events(source, [event_data])
+            return
+        
+        event_data = self._normalize_event(event_data)
+        if event_data is None or self._is_duplicate(source, event_data):
+            return
+        
+        for trigger_event in self._evaluate_event(source, event_data, self.wall_clock()):
+            # Add to queue for processing
+            await self._enqueue(trigger_event)
     
-    async def _process_trigger_queue(self):
-        """Process triggers from the queue"""
+    async def process_events(self, source: str, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Process a page of events from an integration in one pass
+        
+        The whole batch shares one timestamp and its triggers are enqueued
+        together, in event order, once evaluation is finished. With shards the
+        batch is split by customer and evaluated in parallel processes.
+        
+        Args:
+            source: Integration the events came from
+            events: Raw event payloads, e.g. one page of Slack messages
+            
+        Returns:
+            Throughput statistics for the batch
+        """
+        started = time.perf_counter()
+        timestamp = self.wall_clock()
+        now = self.clock()
+        
+        normalized = [e for e in map(self._normalize_event, events) if e is not None]
+        unique = [e for e in normalized if not self._is_duplicate(source, e)]
+        
+        fired: List[TriggerEvent] = []
+        try:
+            if self.shards:
+                fired = await self._evaluate_sharded(source, unique, timestamp, now)
+            else:
+                for event_data in unique:
+                    fired.extend(self._evaluate_event(source, event_data, timestamp, now))
+        except Exception:
+            # Nothing was enqueued; let a retry of the batch past the dedupe cache
+            for event_data in unique:
+                message_id = self._message_id(source, event_data)
+                if message_id is not None:
+                    self.seen_message_ids.discard(message_id)
+            raise
+        
+        for trigger_event in fired:
+            await self._enqueue(trigger_event)
+        
+        elapsed = time.perf_counter() - started
+        batch_stats = {
+            "source": source,
+            "events_received": len(events),
+            "events_processed": len(unique),
+            "duplicates_skipped": len(normalized) - len(unique),
+            "triggers_fired": len(fired),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "events_per_second": round(len(unique) / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        
+        logger.info(
+            f"Processed batch of {len(unique)} {source} events in "
+            f"{batch_stats['elapsed_ms']}ms ({batch_stats['events_per_second']} events/s), "
+            f"{len(fired)} triggers fired"
+        )
+        return batch_stats
+    
+    def _circuit(self, target: str) -> CircuitBreaker:
+        """Circuit breaker of a downstream target"""
+        circuit = self.circuits.get(target)
+        if circuit is None:
+            circuit = self.circuits[target] = CircuitBreaker(
+                failure_threshold=self.circuit_failure_threshold,
+                reset_timeout_seconds=self.circuit_reset_seconds,
+                clock=self.clock
+            )
+        return circuit
+    
+    async def _execute_action(self,
+                              action_name: str,
+                              handler: Callable,
+                              trigger_event: TriggerEvent,
+                              dead_letter: bool = True,
+                              retry_inline: bool = True,
+                              attempts_made: int = 0) -> Optional[bool]:
+        """
+        Run one action handler under its concurrency cap and hard timeout
+        
+        Failures are retried with backoff while the target's circuit is
+        closed; an open circuit fails fast. Actions that still fail go to
+        the dead-letter queue.
+        
+        Args:
+            retry_inline: Sleep and retry here; otherwise return None after
+                a failed attempt that is due a retry, for the caller to schedule
+            attempts_made: Attempts already made, when continuing a retry
+        
+        Returns:
+            True if the handler succeeded, None if a retry is due
+        """
+        timeout = self.action_timeouts.get(action_name, self.action_timeout_seconds)
+        limit = self.action_limits.get(action_name)
+        target = self.action_targets.get(action_name, action_name)
+        circuit = self._circuit(target)
+        policy = self.action_retry_policies.get(action_name, self.retry_policy)
+        
+        error = None
+        attempts = attempts_made
+        while attempts < policy.max_attempts:
+            if not circuit.allow():
+                error = error or f"circuit open for {target}"
+                break
+            attempts += 1
+            try:
+                if limit:
+                    async with limit:
+                        await asyncio.wait_for(handler(trigger_event), timeout=timeout)
+                else:
+                    await asyncio.wait_for(handler(trigger_event), timeout=timeout)
+                circuit.record_success()
+                return True
+            except asyncio.CancelledError:
+                circuit.record_cancelled()
+                raise
+            except asyncio.TimeoutError:
+                error = f"timed out after {timeout}s"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            circuit.record_failure()
+            logger.warning(f"Action {action_name} failed for {trigger_event.trigger_id} "
+                           f"(attempt {attempts}/{policy.max_attempts}): {error}")
+            if attempts < policy.max_attempts:
+                self.action_retries += 1
+                if not retry_inline:
+                    return None
+                await asyncio.sleep(policy.delay(attempts - 1))
+        
+        self.action_failures += 1
+        logger.error(f"Action {action_name} failed for {trigger_event.trigger_id} after {attempts} attempts: {error}")
+        if dead_letter:
+            self.dead_letters.add(action_name, target, trigger_event.to_dict(), error, attempts)
+        return False
+    
+    async def replay_dead_letters(self, action_name: Optional[str] = None) -> Dict[str, int]:
+        """
+        Retry dead-lettered actions, e.g. once a downstream has recovered
+        
+        Entries that succeed are removed; the rest stay queued.
+        
+        Args:
+            action_name: Only replay this action
+        
+        Returns:
+            Counts of replayed, succeeded and still failing entries
+        """
+        succeeded = []
+        entries = self.dead_letters.entries(action_name)
+        skipped = 0
+        for entry in entries:
+            handler = self.action_handlers.get(entry["action"])
+            if handler is None:
+                skipped += 1
+                continue
+            trigger_event = TriggerEvent.from_dict(entry["event"])
+            if await self._execute_action(entry["action"], handler, trigger_event, dead_letter=False):
+                succeeded.append(entry["id"])
+        self.dead_letters.remove(succeeded)
+        
+        result = {
+            "replayed": len(entries) - skipped,
+            "succeeded": len(succeeded),
+            "failed": len(entries) - skipped - len(succeeded),
+            "skipped": skipped
+        }
+        logger.info(f"Replayed dead letters: {result}")
+        return result
+    
+    async def _dispatch_actions(self, rule: TriggerRule, trigger_event: TriggerEvent) -> List[str]:
+        """
+        Run all actions of a rule concurrently, one attempt each
+        
+        Returns:
+            Actions that failed and are due a retry
+        """
+        action_names = [name for name in rule.actions if name in self.action_handlers]
+        results = await asyncio.gather(*(
+            self._execute_action(name, self.action_handlers[name], trigger_event, retry_inline=False)
+            for name in action_names
+        ))
+        return [name for name, result in zip(action_names, results) if result is None]
+    
+    async def _retry_actions(self, trigger_event: TriggerEvent, action_names: List[str]):
+        """
+        Retry failed actions of an event after their backoff, then record it
+        
+        Runs as its own task, so backoff holds neither a worker nor the
+        customer's lock; retries may land after later events of the customer.
+        """
+        async def retry(action_name: str):
+            policy = self.action_retry_policies.get(action_name, self.retry_policy)
+            await asyncio.sleep(policy.delay(0))
+            await self._execute_action(
+                action_name, self.action_handlers[action_name], trigger_event, attempts_made=1
+            )
+        
+        await asyncio.gather(*(retry(name) for name in action_names if name in self.action_handlers))
+        self._record_processed(trigger_event)
+    
+    def _schedule_retries(self, trigger_event: TriggerEvent, action_names: List[str]):
+        task = asyncio.create_task(self._retry_actions(trigger_event, action_names))
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+    
+    @staticmethod
+    def _default_digest_recipient(trigger_event: TriggerEvent) -> str:
+        """Who receives a digest: the event's explicit recipient or owner, else the team"""
+        return trigger_event.data.get("recipient") or trigger_event.data.get("owner") or "team"
+    
+    async def _add_to_digest(self, trigger_event: TriggerEvent):
+        """Hold a lower-priority event for its recipient's next digest"""
+        key = (self.digest_recipient(trigger_event), trigger_event.priority)
+        batch = self._digests.get(key)
+        if batch is None:
+            batch = self._digests[key] = DigestBatch(
+                recipient=key[0],
+                priority=trigger_event.priority,
+                opened_at=self.clock()
+            )
+        batch.events.append(trigger_event)
+        
+        if len(batch.events) >= self.digest_max_events:
+            await self._flush_digest(key)
+    
+    async def _flush_digest(self, key: Tuple[str, TriggerPriority]):
+        """Fire each action once for all events in a digest batch"""
+        batch = self._digests.pop(key, None)
+        if not batch:
+            return
+        
+        # Group the batch's events by the actions their rules ask for
+        events_by_action: Dict[str, List[TriggerEvent]] = {}
+        for trigger_event in batch.events:
+            rule = self._rule_for_event(trigger_event)
+            if not rule:
+                continue
+            for action_name in rule.actions:
+                if action_name in self.action_handlers:
+                    events_by_action.setdefault(action_name, []).append(trigger_event)
+        
+        calls = []
+        for action_name, events in events_by_action.items():
+            customer_ids = {e.customer_id for e in events}
+            digest_event = TriggerEvent(
+                trigger_id=f"{batch.priority.value}_digest",
+                trigger_type=events[0].trigger_type,
+                priority=batch.priority,
+                source="digest",
+                timestamp=self.wall_clock(),
+                data={
+                    "recipient": batch.recipient,
+                    "action": action_name,
+                    "count": len(events),
+                    "events": [e.to_dict() for e in events]
+                },
+                customer_id=customer_ids.pop() if len(customer_ids) == 1 else None
+            )
+            calls.append(self._execute_action(action_name, self.action_handlers[action_name], digest_event))
+        if calls:
+            await asyncio.gather(*calls)
+        
+        for trigger_event in batch.events:
+            self._record_processed(trigger_event)
+        
+        logger.info(f"Sent {batch.priority.value} digest to {batch.recipient}: "
+                    f"{len(batch.events)} events, {len(calls)} action calls")
+    
+    async def _flush_due_digests(self, force: bool = False):
+        """Flush digests that have been open longer than their interval"""
+        now = self.clock()
+        due = [
+            key for key, batch in self._digests.items()
+            if force or now - batch.opened_at >= self.digest_intervals.get(batch.priority, 0)
+        ]
+        for key in due:
+            await self._flush_digest(key)
+    
+    async def _run_digest_flusher(self, check_interval_seconds: float = 5.0):
+        """Periodically send due digests; sends everything left when the engine stops"""
+        while self.running:
+            await asyncio.sleep(check_interval_seconds)
+            try:
+                await self._flush_due_digests()
+            except Exception as e:
+                logger.error(f"Error flushing digests: {e}")
+        await self._flush_due_digests(force=True)
+    
+    def _rule_for_event(self, trigger_event: TriggerEvent) -> Optional[TriggerRule]:
+        """The rule that fired an event, including one dropped by a reload since"""
+        return self.rules_by_id.get(trigger_event.trigger_id) or self._retired_rules.get(trigger_event.trigger_id)
+    
+    async def _handle_trigger_event(self, trigger_event: TriggerEvent):
+        """Execute a trigger's actions and record it as processed"""
+        # Find the rule that created this trigger
+        rule = self._rule_for_event(trigger_event)
+        if not rule:
+            # Completed so the event log does not replay it on every restart
+            logger.warning(f"Dropping queued event of unknown rule {trigger_event.trigger_id}")
+            if self.event_log and trigger_event.log_sequence is not None:
+                self.event_log.append_completed(trigger_event.log_sequence)
+            self._release_rule(trigger_event.trigger_id)
+            return
+        
+        if trigger_event.priority in self.digest_intervals:
+            await self._add_to_digest(trigger_event)
+            return
+        
+        customer_id = trigger_event.customer_id
+        if self.preserve_customer_order and customer_id:
+            # Events of one customer run one at a time, in dequeue order
+            lock = self._customer_locks.setdefault(customer_id, asyncio.Lock())
+            self._customer_inflight[customer_id] = self._customer_inflight.get(customer_id, 0) + 1
+            try:
+                async with lock:
+                    retries = await self._dispatch_actions(rule, trigger_event)
+            finally:
+                self._customer_inflight[customer_id] -= 1
+                if not self._customer_inflight[customer_id]:
+                    del self._customer_inflight[customer_id]
+                    del self._customer_locks[customer_id]
+        else:
+            retries = await self._dispatch_actions(rule, trigger_event)
+        
+        if retries:
+            # Recorded as processed once the retries finish; until then the
+            # event log still holds it for recovery
+            self._schedule_retries(trigger_event, retries)
+            return
+        self._record_processed(trigger_event)
+    
+    def _release_rule(self, rule_id: str):
+        """Count down a rule's pending events, forgetting it once retired and drained"""
+        pending = self._pending_by_rule.get(rule_id, 0) - 1
+        if pending > 0:
+            self._pending_by_rule[rule_id] = pending
+            return
+        self._pending_by_rule.pop(rule_id, None)
+        self._retired_rules.pop(rule_id, None)
+    
+    def _record_processed(self, trigger_event: TriggerEvent):
+        """Retain a completed event and update the running counters"""
+        if self.event_log and trigger_event.log_sequence is not None:
+            self.event_log.append_completed(trigger_event.log_sequence)
+        self._release_rule(trigger_event.trigger_id)
+        
+        # Bounded deque: the oldest event drops off without copying. History
+        # keeps a reference to the payload, not the payload itself
+        trigger_event.release_payload(
+            self.payloads, self._message_id(trigger_event.source, trigger_event.data)
+        )
+        self.processed_events.append(trigger_event)
+        self.stats.record(
+            trigger_event.priority.value,
+            trigger_event.trigger_type.value,
+            trigger_event.source,
+            trigger_event.trigger_id
+        )
+    
+    async def _process_trigger_queue(self, worker_id: int = 0):
+        """Process triggers from the queue; start() runs num_workers of these"""
         while self.running:
             try:
                 # Wait for trigger events with timeout
@@ -281,68 +1643,79 @@ class TriggerEngine:
                     self.event_queue.get(), 
                     timeout=1.0
                 )
-                
-                # Find the rule that created this trigger
-                rule = next((r for r in self.rules if r.id == trigger_event.trigger_id), None)
-                if not rule:
-                    continue
-                
-                # Execute actions
-                for action_name in rule.actions:
-                    handler = self.action_handlers.get(action_name)
-                    if handler:
-                        try:
-                            await handler(trigger_event)
-                        except Exception as e:
-                            logger.error(f"Error executing action {action_name}: {e}")
-                
-                # Store processed event
-                self.processed_events.append(trigger_event)
-                
-                # Limit stored events
-                if len(self.processed_events) > 10000:
-                    self.processed_events = self.processed_events[-5000:]
-                    
             except asyncio.TimeoutError:
                 continue
+            
+            try:
+                await self._handle_trigger_event(trigger_event)
             except Exception as e:
-                logger.error(f"Error processing trigger queue: {e}")
+                logger.error(f"Error processing trigger queue (worker {worker_id}): {e}")
+            finally:
+                self.event_queue.task_done()
     
-    async def monitor_slack(self, interval_seconds: int = 60):
-        """Monitor Slack for triggers"""
-        slack = self.integrations.get("slack")
-        if not slack:
-            return
-            
+    async def _poll_source(self,
+                           source: str,
+                           fetch: Callable,
+                           interval: AdaptivePollInterval,
+                           cursor_field: str,
+                           channel_field: Optional[str] = None):
+        """
+        Poll a source incrementally until the engine stops
+        
+        A fetch callable that takes a ``cursors`` argument receives the
+        source's cursors (channel -> last seen position) so it can request
+        only newer items; others are called without arguments. Anything at or
+        below a cursor is filtered out here as well, so overlapping windows
+        never re-fire rules. Cursors only advance once the items have been
+        processed, so a failed batch is picked up by the next poll.
+        """
+        accepts_cursors = _accepts_keyword(fetch, "cursors")
         while self.running:
+            new_items = 0
             try:
-                # Fetch recent messages
-                messages = await slack.fetch_recent_messages()
-                for message in messages:
-                    await self.process_event("slack", message)
+                await self._wait_for_queue_capacity()
+                if accepts_cursors:
+                    items = await fetch(cursors=self.poll_cursors.get(source))
+                else:
+                    items = await fetch()
+                fresh = self.poll_cursors.filter_new(source, items or [], cursor_field, channel_field)
+                new_items = len(fresh)
+                if fresh:
+                    await self.process_events(source, fresh)
+                    self.poll_cursors.advance(source, fresh, cursor_field, channel_field)
+                    self.poll_cursors.save()
                     
             except Exception as e:
-                logger.error(f"Error monitoring Slack: {e}")
+                logger.error(f"Error monitoring {source}: {e}")
             
-            await asyncio.sleep(interval_seconds)
+            await asyncio.sleep(interval.next_interval(new_items))
+    
+    async def monitor_slack(self, interval_seconds: int = 60):
+        """Monitor Slack for triggers, resuming from each channel's last message ts"""
+        slack = self.integrations.get("slack")
+        if not slack:
+            return
+        
+        await self._poll_source(
+            "slack",
+            slack.fetch_recent_messages,
+            AdaptivePollInterval(interval_seconds),
+            cursor_field="ts",
+            channel_field="channel"
+        )
     
     async def monitor_email(self, interval_seconds: int = 300):
-        """Monitor email for triggers"""
+        """Monitor email for triggers, resuming from the last Gmail historyId"""
         email = self.integrations.get("email")
         if not email:
             return
-            
-        while self.running:
-            try:
-                # Fetch recent emails
-                emails = await email.fetch_recent_emails()
-                for email_data in emails:
-                    await self.process_event("email", email_data)
-                    
-            except Exception as e:
-                logger.error(f"Error monitoring email: {e}")
-            
-            await asyncio.sleep(interval_seconds)
+        
+        await self._poll_source(
+            "email",
+            email.fetch_recent_emails,
+            AdaptivePollInterval(interval_seconds),
+            cursor_field="historyId"
+        )
     
     async def start(self):
         """Start the trigger engine"""
@@ -350,11 +1723,22 @@ class TriggerEngine:
         
         # Start monitoring tasks
         tasks = [
-            asyncio.create_task(self._process_trigger_queue()),
+            asyncio.create_task(self._process_trigger_queue(worker_id))
+            for worker_id in range(self.num_workers)
+        ] + [
             asyncio.create_task(self.monitor_slack(60)),  # Every minute
             asyncio.create_task(self.monitor_email(300)),  # Every 5 minutes
+            asyncio.create_task(self.watch_rules_file()),
             # Add more monitoring tasks as needed
         ]
+        if self._recovered_events:
+            tasks.append(asyncio.create_task(self._requeue_recovered_events()))
+        if self.digest_intervals:
+            tasks.append(asyncio.create_task(self._run_digest_flusher()))
+        if self.event_log:
+            tasks.append(asyncio.create_task(self.event_log.run(lambda: self.running)))
+        if self.dead_letters.path:
+            tasks.append(asyncio.create_task(self.dead_letters.run(lambda: self.running)))
         
         logger.info("Trigger engine started")
         
@@ -364,34 +1748,50 @@ class TriggerEngine:
     def stop(self):
         """Stop the trigger engine"""
         self.running = False
+        if self.shards:
+            self.shards.close()
         logger.info("Trigger engine stopped")
     
     def get_trigger_stats(self) -> Dict[str, Any]:
         """Get statistics about triggered events"""
-        stats = {
-            "total_triggers": len(self.processed_events),
-            "triggers_by_priority": {},
-            "triggers_by_type": {},
-            "triggers_by_source": {},
-            "recent_triggers": []
+        stats = self.stats.to_dict()
+        stats["retained_events"] = len(self.processed_events)
+        stats["retained_payloads"] = len(self.payloads)
+        stats["cooldowns_tracked"] = len(self.cooldowns)
+        stats["windows_tracked"] = len(self.windows)
+        stats["dedupe_cache_size"] = len(self.seen_message_ids)
+        if self.shards:
+            stats["shards"] = self.shards.to_dict()
+        stats["ruleset"] = {
+            "rules": len(self.rules),
+            "source": str(self.rules_path),
+            "content_hash": self._rules_content_hash
+        }
+        if self.profiler.enabled:
+            stats["rule_profile"] = self.profiler.to_dict(top=25)
+        stats["delivery"] = {
+            "retries": self.action_retries,
+            "retrying_events": len(self._retry_tasks),
+            "failures": self.action_failures,
+            "dead_letters": len(self.dead_letters),
+            "circuits": {target: circuit.to_dict() for target, circuit in self.circuits.items()}
+        }
+        stats["queue"] = {
+            "depth": self.event_queue.qsize(),
+            "depth_by_priority": dict(zip(
+                (priority.value for priority in TriggerPriority),
+                self.event_queue.depth_by_level()
+            )),
+            "max_size": self.max_queue_size,
+            "high_watermark": self.queue_high_watermark,
+            "low_watermark": self.queue_low_watermark,
+            "oldest_wait_seconds": round(self.event_queue.oldest_wait_seconds(), 3),
+            "digest_pending": sum(len(batch.events) for batch in self._digests.values())
         }
-        
-        for event in self.processed_events:
-            # Count by priority
-            priority = event.priority.value
-            stats["triggers_by_priority"][priority] = stats["triggers_by_priority"].get(priority, 0) + 1
-            
-            # Count by type
-            trigger_type = event.trigger_type.value
-            stats["triggers_by_type"][trigger_type] = stats["triggers_by_type"].get(trigger_type, 0) + 1
-            
-            # Count by source
-            source = event.source
-            stats["triggers_by_source"][source] = stats["triggers_by_source"].get(source, 0) + 1
         
         # Add recent triggers
         stats["recent_triggers"] = [
-            event.to_dict() for event in self.processed_events[-10:]
+            event.to_dict() for event in reversed(list(islice(reversed(self.processed_events), 10)))
         ]
         
         return stats
@@ -406,7 +1806,9 @@ class TriggerEngine:
     def save_state(self, filepath: str):
         """Save engine state for recovery"""
         state = {
-            "processed_events": [e.to_dict() for e in self.processed_events[-1000:]],
+            "processed_events": [
+                e.to_dict() for e in islice(self.processed_events, max(0, len(self.processed_events) - 1000), None)
+            ],
             "rule_states": [
                 {
                     "id": rule.id,
@@ -0,0 +1,344 @@
+"""
+Append-only write-ahead log for trigger engine state
+
+Every enqueued and completed trigger event and every rule cooldown change
+is appended to a segment file as one JSON line. Appends are buffered and
+written with a single fsync per flush (group commit); the group-commit loop
+does the write and fsync in a worker thread, off the event loop. Closed
+segments are folded into a snapshot in the background, dropping cooldowns
+that have expired, so recovery reads one snapshot plus the few segments
+written after it.
+
+Layout of the log directory:
+    segment_00000001.log   JSON lines, one record per state change
+    snapshot_00000004.json pending events and cooldowns up to segment 4
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TriggerEventLog:
+    """Segment-based append-only log with group commit and compaction"""
+
+    SEGMENT_PREFIX = "segment_"
+    SNAPSHOT_PREFIX = "snapshot_"
+
+    def __init__(self,
+                 log_dir: str,
+                 segment_max_bytes: int = 4 * 1024 * 1024,
+                 flush_interval_seconds: float = 0.05,
+                 max_buffered_records: int = 1000,
+                 compact_after_segments: int = 4,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_buffered_records = max_buffered_records
+        self.compact_after_segments = compact_after_segments
+        self.clock = clock  # Wall clock that cooldown expiries are compared against
+
+        self._buffer: List[str] = []
+        # Groups taken from the buffer on the event loop, written in order by whoever holds _write_lock
+        self._unwritten: Deque[List[str]] = deque()
+        self._write_lock = threading.Lock()
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._next_sequence = 1
+        self._segment_number = 0
+        self._segment_file = None
+        self._segment_bytes = 0
+        self._compaction_lock = threading.Lock()
+        self._compaction_task: Optional[asyncio.Future] = None
+
+        # Never reuse a segment from a previous run, even before recover()
+        existing = self._numbered(self.SEGMENT_PREFIX) + self._numbered(self.SNAPSHOT_PREFIX)
+        if existing:
+            self._segment_number = max(number for number, _ in existing)
+
+    # -- paths ---------------------------------------------------------
+
+    def _segment_path(self, number: int) -> Path:
+        return self.log_dir / f"{self.SEGMENT_PREFIX}{number:08d}.log"
+
+    def _snapshot_path(self, number: int) -> Path:
+        return self.log_dir / f"{self.SNAPSHOT_PREFIX}{number:08d}.json"
+
+    def _numbered(self, prefix: str) -> List[Tuple[int, Path]]:
+        found = []
+        for path in self.log_dir.glob(f"{prefix}*"):
+            if path.suffix not in (".log", ".json"):
+                continue
+            try:
+                found.append((int(path.stem[len(prefix):]), path))
+            except ValueError:
+                continue
+        return sorted(found)
+
+    # -- appending -----------------------------------------------------
+
+    def append_enqueued(self, event: Dict[str, Any]) -> int:
+        """Log an enqueued trigger event and return its sequence number"""
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        self._append({"op": "enqueued", "seq": sequence, "event": event})
+        return sequence
+
+    def append_completed(self, sequence: int):
+        """Log that a trigger event's actions have finished"""
+        self._append({"op": "completed", "seq": sequence})
+
+    def append_cooldown(self,
+                        rule_id: str,
+                        customer_id: str,
+                        last_triggered: Optional[str],
+                        expires_at: Optional[str] = None):
+        """
+        Log a rule cooldown change for one customer ("" for events without one)
+
+        Args:
+            expires_at: Wall-clock end of the cooldown; compaction drops it after that
+        """
+        record = {
+            "op": "cooldown",
+            "rule_id": rule_id,
+            "customer_id": customer_id,
+            "last_triggered": last_triggered
+        }
+        if expires_at is not None:
+            record["expires_at"] = expires_at
+        self._append(record)
+
+    def _append(self, record: Dict[str, Any]):
+        self._buffer.append(json.dumps(record, separators=(",", ":"), default=str))
+        if len(self._buffer) >= self.max_buffered_records:
+            if self._flush_requested is not None:
+                # The group-commit loop is running; wake it instead of writing here
+                self._flush_requested.set()
+            else:
+                self.flush()
+
+    def _take_buffer(self):
+        """Queue the buffered records for writing; only called on the appending thread"""
+        if self._buffer:
+            self._unwritten.append(self._buffer)
+            self._buffer = []
+
+    def _write_unwritten(self):
+        """Write every queued group in order and fsync once; safe to run in a worker thread"""
+        with self._write_lock:
+            if not self._unwritten:
+                return
+            if self._segment_file is None or self._segment_bytes >= self.segment_max_bytes:
+                self._rotate()
+
+            chunks = []
+            while self._unwritten:
+                chunks.append("\n".join(self._unwritten.popleft()) + "\n")
+            payload = "".join(chunks).encode("utf-8")
+            self._segment_file.write(payload)
+            self._segment_file.flush()
+            os.fsync(self._segment_file.fileno())
+            self._segment_bytes += len(payload)
+
+    def flush(self):
+        """Write buffered records and fsync once for the whole group"""
+        self._take_buffer()
+        self._write_unwritten()
+
+    def _rotate(self):
+        """Close the active segment and open the next one"""
+        if self._segment_file is not None:
+            self._segment_file.close()
+        self._segment_number += 1
+        self._segment_file = open(self._segment_path(self._segment_number), "ab")
+        self._segment_bytes = 0
+
+    def close(self):
+        """Flush outstanding records and close the active segment"""
+        self.flush()
+        with self._write_lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+
+    async def run(self, is_running):
+        """
+        Group-commit loop: flush on an interval and compact in the background
+
+        Args:
+            is_running: Callable returning False once the engine stops
+        """
+        self._flush_requested = asyncio.Event()
+        try:
+            while is_running():
+                try:
+                    await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_requested.clear()
+                try:
+                    self._take_buffer()
+                    await asyncio.to_thread(self._write_unwritten)
+                    self._maybe_compact()
+                except Exception as e:
+                    logger.error(f"Error flushing trigger event log: {e}")
+        finally:
+            self._flush_requested = None
+        self.close()
+
+    # -- recovery and compaction ---------------------------------------
+
+    @staticmethod
+    def _apply(record: Dict[str, Any],
+               pending: Dict[int, Dict[str, Any]],
+               cooldowns: Dict[str, Dict[str, Optional[str]]],
+               expiries: Dict[str, Dict[str, str]]):
+        op = record.get("op")
+        if op == "enqueued":
+            pending[record["seq"]] = record["event"]
+        elif op == "completed":
+            pending.pop(record["seq"], None)
+        elif op == "cooldown":
+            customer_id = record.get("customer_id", "")
+            cooldowns.setdefault(record["rule_id"], {})[customer_id] = record["last_triggered"]
+            rule_expiries = expiries.setdefault(record["rule_id"], {})
+            if record.get("expires_at"):
+                rule_expiries[customer_id] = record["expires_at"]
+            else:
+                rule_expiries.pop(customer_id, None)
+
+    def _load_state(self, up_to_segment: Optional[int] = None) -> Tuple[int, Dict[int, Dict[str, Any]], Dict[str, Dict[str, Optional[str]]], Dict[str, Dict[str, str]], int]:
+        """Fold the newest snapshot and later segments into (snapshot, pending, cooldowns, expiries, max seq)"""
+        pending: Dict[int, Dict[str, Any]] = {}
+        cooldowns: Dict[str, Dict[str, Optional[str]]] = {}
+        expiries: Dict[str, Dict[str, str]] = {}
+        max_sequence = 0
+        snapshot_number = 0
+
+        snapshots = self._numbered(self.SNAPSHOT_PREFIX)
+        if snapshots:
+            snapshot_number, snapshot_path = snapshots[-1]
+            with open(snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            pending = {int(seq): event for seq, event in snapshot.get("pending", {}).items()}
+            cooldowns = {
+                # Snapshots written before per-customer cooldowns map rule id -> timestamp
+                rule_id: value if isinstance(value, dict) else {"": value}
+                for rule_id, value in snapshot.get("cooldowns", {}).items()
+            }
+            expiries = snapshot.get("cooldown_expiries", {})
+            max_sequence = snapshot.get("max_sequence", 0)
+
+        for number, path in self._numbered(self.SEGMENT_PREFIX):
+            if number <= snapshot_number:
+                continue
+            if up_to_segment is not None and number > up_to_segment:
+                break
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn write at the tail of a segment after a crash
+                        logger.warning(f"Skipping corrupt record in {path.name}")
+                        continue
+                    max_sequence = max(max_sequence, record.get("seq", 0))
+                    self._apply(record, pending, cooldowns, expiries)
+
+        return snapshot_number, pending, cooldowns, expiries, max_sequence
+
+    def recover(self) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, Dict[str, Optional[str]]]]:
+        """
+        Replay the log after a restart
+
+        Returns:
+            (unfinished events as (sequence, event) in enqueue order,
+             last trigger times by rule id and customer id)
+        """
+        _, pending, cooldowns, _, max_sequence = self._load_state()
+
+        self._next_sequence = max(self._next_sequence, max_sequence + 1)
+
+        return sorted(pending.items()), cooldowns
+
+    def _maybe_compact(self):
+        closed = [n for n, _ in self._numbered(self.SEGMENT_PREFIX) if n < self._segment_number]
+        if len(closed) < self.compact_after_segments:
+            return
+        if self._compaction_task is not None and not self._compaction_task.done():
+            return
+        self._compaction_task = asyncio.get_running_loop().run_in_executor(None, self.compact, closed[-1])
+
+    def compact(self, up_to_segment: Optional[int] = None):
+        """
+        Fold closed segments into a snapshot and delete them
+
+        The snapshot is written to a temporary file and renamed into place,
+        so a crash at any point leaves either the old or the new state.
+        """
+        with self._compaction_lock:
+            if up_to_segment is None:
+                up_to_segment = self._segment_number - 1
+            if up_to_segment <= 0:
+                return
+
+            snapshot_number, pending, cooldowns, expiries, max_sequence = self._load_state(up_to_segment)
+            if up_to_segment <= snapshot_number:
+                return
+            self._drop_expired(cooldowns, expiries)
+
+            snapshot_path = self._snapshot_path(up_to_segment)
+            temp_path = snapshot_path.with_suffix(".tmp")
+            with open(temp_path, "w") as f:
+                json.dump({
+                    "max_sequence": max_sequence,
+                    "pending": {str(seq): event for seq, event in pending.items()},
+                    "cooldowns": cooldowns,
+                    "cooldown_expiries": expiries
+                }, f, separators=(",", ":"), default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, snapshot_path)
+
+            for number, path in self._numbered(self.SEGMENT_PREFIX):
+                if number <= up_to_segment:
+                    path.unlink(missing_ok=True)
+            for number, path in self._numbered(self.SNAPSHOT_PREFIX):
+                if number < up_to_segment:
+                    path.unlink(missing_ok=True)
+
+            logger.info(f"Compacted trigger event log through segment {up_to_segment}: "
+                        f"{len(pending)} pending events")
+
+    def _drop_expired(self,
+                      cooldowns: Dict[str, Dict[str, Optional[str]]],
+                      expiries: Dict[str, Dict[str, str]]):
+        """Remove cooldowns whose expiry has passed, so snapshots don't grow without bound"""
+        now = self.clock()
+        for rule_id in list(expiries):
+            rule_expiries = expiries[rule_id]
+            rule_cooldowns = cooldowns.get(rule_id, {})
+            expired = [
+                customer_id for customer_id, expires_at in rule_expiries.items()
+                if datetime.fromisoformat(expires_at) <= now
+            ]
+            for customer_id in expired:
+                del rule_expiries[customer_id]
+                rule_cooldowns.pop(customer_id, None)
+            if not rule_expiries:
+                del expiries[rule_id]
+            if rule_id in cooldowns and not rule_cooldowns:
+                del cooldowns[rule_id]
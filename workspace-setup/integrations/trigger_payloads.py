@@ -0,0 +1,57 @@
+"""
+Payload storage for retained trigger events
+
+Processed trigger events are kept for history and stats, but the Slack and
+email payloads behind them are not: a retained event keeps a reference
+instead, and the store holds only the most recent payloads. Events fired by
+the same payload share one entry. References are source message ids where
+the payload has one, so an evicted payload can still be traced back to its
+source.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class PayloadStore:
+    """Bounded LRU of event payloads keyed by reference"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._payloads: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._ref_by_id: Dict[int, Hashable] = {}  # id(payload) -> ref, for payloads held here
+        self._next_ref = 0
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def put(self, payload: Dict[str, Any], ref: Optional[Hashable] = None) -> Hashable:
+        """
+        Store a payload and return its reference
+
+        Args:
+            payload: Event payload; storing the same object again returns its existing reference
+            ref: Reference to use, e.g. the source message id; generated when omitted
+        """
+        existing = self._ref_by_id.get(id(payload))
+        if existing is not None and self._payloads.get(existing) is payload:
+            self._payloads.move_to_end(existing)
+            return existing
+
+        if ref is None:
+            self._next_ref += 1
+            ref = f"local:{self._next_ref}"
+        previous = self._payloads.pop(ref, None)
+        if previous is not None:
+            self._ref_by_id.pop(id(previous), None)
+        self._payloads[ref] = payload
+        self._ref_by_id[id(payload)] = ref
+
+        while len(self._payloads) > self.max_entries:
+            _, evicted = self._payloads.popitem(last=False)
+            del self._ref_by_id[id(evicted)]
+        return ref
+
+    def get(self, ref: Hashable) -> Optional[Dict[str, Any]]:
+        """Payload for a reference, or None once it has been evicted"""
+        return self._payloads.get(ref)
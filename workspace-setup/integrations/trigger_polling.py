@@ -0,0 +1,155 @@
+"""
+Incremental polling support for trigger engine monitors
+
+Keeps a high-water mark per source and channel (Slack message ``ts``,
+Gmail ``historyId``) so each poll only processes newer items, and adapts
+the poll interval to how busy the source is. Marks only advance once a
+poll's items have been processed, so a failed batch is fetched again.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def cursor_value(cursor: Any) -> Any:
+    """Comparable form of a cursor: numeric when possible (ts, historyId), else the string"""
+    try:
+        return float(cursor)
+    except (TypeError, ValueError):
+        return str(cursor)
+
+
+def _is_newer(value: Any, mark: Any) -> bool:
+    if mark is None:
+        return True
+    try:
+        return value > mark
+    except TypeError:
+        # Mixed numeric/string cursors; fall back to string order
+        return str(value) > str(mark)
+
+
+def _position(item: Dict[str, Any],
+              cursor_field: str,
+              channel_field: Optional[str]) -> Optional[Tuple[str, Any]]:
+    """(channel, comparable cursor) of an item, None if it has no cursor value"""
+    position = item.get(cursor_field)
+    if position is None:
+        return None
+    channel = str(item.get(channel_field, "default")) if channel_field else "default"
+    return channel, cursor_value(position)
+
+
+class PollCursorStore:
+    """Per-source, per-channel high-water marks, persisted as a small JSON file"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self.cursors: Dict[str, Dict[str, str]] = {}
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self.cursors = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Could not load poll cursors from {self.path}: {e}")
+
+    def get(self, source: str) -> Dict[str, str]:
+        """Cursors of a source, keyed by channel"""
+        return dict(self.cursors.get(source, {}))
+
+    def filter_new(self,
+                   source: str,
+                   items: Iterable[Dict[str, Any]],
+                   cursor_field: str,
+                   channel_field: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Keep items newer than their channel's cursor
+
+        Items without a cursor value are kept, since they can't be ordered.
+        The cursors don't move; call advance() once the items are processed.
+
+        Args:
+            source: Source name, e.g. "slack"
+            items: Items returned by the integration
+            cursor_field: Field holding the item's position (e.g. "ts")
+            channel_field: Field naming the item's channel, or None for one channel
+
+        Returns:
+            The items not seen by a previous poll
+        """
+        marks = {channel: cursor_value(cursor) for channel, cursor in self.cursors.get(source, {}).items()}
+        new_items = []
+
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            position = _position(item, cursor_field, channel_field)
+            if position is None or _is_newer(position[1], marks.get(position[0])):
+                new_items.append(item)
+
+        return new_items
+
+    def advance(self,
+                source: str,
+                items: Iterable[Dict[str, Any]],
+                cursor_field: str,
+                channel_field: Optional[str] = None):
+        """Move each channel's cursor up to the newest of the processed items"""
+        source_cursors = self.cursors.setdefault(source, {})
+        highest = {channel: cursor_value(cursor) for channel, cursor in source_cursors.items()}
+        for item in items:
+            position = _position(item, cursor_field, channel_field)
+            if position is None:
+                continue
+            # Pages aren't guaranteed to be sorted
+            channel, value = position
+            if _is_newer(value, highest.get(channel)):
+                highest[channel] = value
+                source_cursors[channel] = str(item[cursor_field])
+
+    def save(self):
+        """Write cursors atomically"""
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(self.cursors, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class AdaptivePollInterval:
+    """Poll interval that tightens while a source is busy and backs off while idle"""
+
+    def __init__(self,
+                 base_seconds: float,
+                 min_seconds: Optional[float] = None,
+                 max_seconds: Optional[float] = None,
+                 busy_threshold: int = 20,
+                 backoff_factor: float = 1.5):
+        self.base_seconds = base_seconds
+        self.min_seconds = min_seconds if min_seconds is not None else base_seconds / 6
+        self.max_seconds = max_seconds if max_seconds is not None else base_seconds * 10
+        self.busy_threshold = busy_threshold
+        self.backoff_factor = backoff_factor
+        self.current = base_seconds
+
+    def next_interval(self, new_items: int) -> float:
+        """
+        Update the interval from the number of new items in the last poll
+
+        Busy polls halve the interval, empty polls back off geometrically and
+        anything in between drifts back toward the base interval.
+        """
+        if new_items >= self.busy_threshold:
+            self.current = max(self.min_seconds, self.current / 2)
+        elif new_items == 0:
+            self.current = min(self.max_seconds, self.current * self.backoff_factor)
+        else:
+            self.current = (self.current + self.base_seconds) / 2
+        return self.current
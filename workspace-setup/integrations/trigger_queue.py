@@ -0,0 +1,126 @@
+"""
+Priority-aware queue for trigger events
+
+A drop-in asyncio.Queue that serves higher priorities first while aging
+lower priorities, so LOW work is delayed but never starved. When bounded,
+the least urgent queued work can be shed to make room for urgent work.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+
+class _PriorityLevels:
+    """One FIFO per priority level; stands in for asyncio.Queue's internal deque"""
+
+    def __init__(self, num_levels: int):
+        self.levels: List[Deque[Tuple[float, Any]]] = [deque() for _ in range(num_levels)]
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        for items in self.levels:
+            for _, item in items:
+                yield item
+
+
+class PriorityTriggerQueue(asyncio.Queue):
+    """
+    asyncio.Queue that orders items by priority level with aging
+
+    Items are served from the most urgent non-empty level, except when the
+    head of a less urgent level has waited longer than that level's aging
+    limit; the oldest such overdue item is then served first.
+    """
+
+    def __init__(self,
+                 rank_of: Callable[[Any], int],
+                 aging_seconds: List[Optional[float]],
+                 maxsize: int = 0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rank_of: Maps an item to its level, 0 being most urgent
+            aging_seconds: Per level, how long an item may wait before it is
+                promoted ahead of more urgent levels (None never promotes)
+            maxsize: Queue bound, 0 for unbounded
+            clock: Monotonic time source
+        """
+        self.rank_of = rank_of
+        self.aging_seconds = aging_seconds
+        self.clock = clock
+        self.promoted_count = 0
+        super().__init__(maxsize)
+
+    # asyncio.Queue storage hooks (the same ones PriorityQueue overrides)
+
+    def _init(self, maxsize):
+        self._queue = _PriorityLevels(len(self.aging_seconds))
+
+    def _put(self, item):
+        self._queue.levels[self.rank_of(item)].append((self.clock(), item))
+        self._queue.size += 1
+
+    def _get(self):
+        levels = self._queue.levels
+        now = self.clock()
+
+        first_level = None
+        overdue_level = None
+        overdue_since = None
+        for level, items in enumerate(levels):
+            if not items:
+                continue
+            if first_level is None:
+                first_level = level
+                continue
+
+            limit = self.aging_seconds[level]
+            enqueued_at = items[0][0]
+            if limit is not None and now - enqueued_at >= limit:
+                if overdue_since is None or enqueued_at < overdue_since:
+                    overdue_level = level
+                    overdue_since = enqueued_at
+
+        if overdue_level is not None:
+            self.promoted_count += 1
+            level = overdue_level
+        else:
+            level = first_level
+
+        self._queue.size -= 1
+        return levels[level].popleft()[1]
+
+    def shed(self, min_level: int) -> Optional[Any]:
+        """
+        Drop the oldest item of the least urgent non-empty level at or below min_level
+
+        Args:
+            min_level: Most urgent level that may be shed
+
+        Returns:
+            The dropped item, or None if no level at or below min_level has items
+        """
+        levels = self._queue.levels
+        for level in range(len(levels) - 1, min_level - 1, -1):
+            if levels[level]:
+                item = levels[level].popleft()[1]
+                self._queue.size -= 1
+                # Balance put()'s unfinished-task count and let a blocked putter in
+                self.task_done()
+                self._wakeup_next(self._putters)
+                return item
+        return None
+
+    def depth_by_level(self) -> List[int]:
+        """Number of queued items per level"""
+        return [len(items) for items in self._queue.levels]
+
+    def oldest_wait_seconds(self) -> float:
+        """How long the oldest queued item has been waiting"""
+        heads = [items[0][0] for items in self._queue.levels if items]
+        return self.clock() - min(heads) if heads else 0.0
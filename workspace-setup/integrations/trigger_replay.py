@@ -0,0 +1,427 @@
+"""
+Replay historical events through the trigger engine
+
+Streams the archives BaseIntegration.cache_data writes under
+artifacts/<customer>/<type>/<type>_data_<YYYYmmdd_HHMMSS>.json, or a JSONL
+file of events, through TriggerEngine.process_event in delivery order. A
+simulated clock is advanced to each event's delivery time, so cooldowns and
+digests behave as they would have live. Actions are not executed; fired
+triggers are counted per rule with their time-to-fire (delivery time minus
+the source timestamp).
+
+Usage:
+    python -m integrations.trigger_replay --artifacts artifacts --output replay_report.json
+    python -m integrations.trigger_replay --jsonl history.jsonl --poll-interval 60
+"""
+
+import argparse
+import asyncio
+import hashlib
+import heapq
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .trigger_engine import TriggerEngine
+
+logger = logging.getLogger(__name__)
+
+# Fields that carry an event's text, an item's own timestamp and its id
+TEXT_FIELDS = ("text", "subject", "snippet", "body", "content", "summary", "transcript")
+TIMESTAMP_FIELDS = ("ts", "timestamp", "date", "created_at", "internalDate", "last_message_date")
+ID_FIELDS = ("message_id", "client_msg_id", "id", "thread_id")
+
+ARCHIVE_TIME_FORMAT = "%Y%m%d_%H%M%S"
+
+
+class SimulatedClock:
+    """Clock that only moves when the replay advances it"""
+
+    def __init__(self, start: Optional[datetime] = None):
+        # Without a start, the clock starts at the first moment it is advanced to
+        self.current = start
+        self._origin = start
+
+    def now(self) -> datetime:
+        """Simulated wall-clock time; stands in for datetime.now"""
+        return self.current if self.current is not None else datetime.now()
+
+    def monotonic(self) -> float:
+        """Simulated seconds since the clock started; stands in for time.monotonic"""
+        if self.current is None:
+            return 0.0
+        return (self.current - self._origin).total_seconds()
+
+    def advance_to(self, moment: datetime):
+        """Move the clock forward to a moment; it never moves backwards"""
+        if self.current is None:
+            self.current = self._origin = moment
+        elif moment > self.current:
+            self.current = moment
+
+
+@dataclass
+class ReplayEvent:
+    """One historical event and when it happened"""
+    timestamp: datetime
+    source: str
+    data: Dict[str, Any]
+    delivered_at: Optional[datetime] = None  # When the engine first saw it, e.g. the archive time
+
+    @property
+    def available_at(self) -> datetime:
+        """Earliest moment the engine could have seen the event"""
+        if self.delivered_at and self.delivered_at > self.timestamp:
+            return self.delivered_at
+        return self.timestamp
+
+    def __lt__(self, other: "ReplayEvent") -> bool:
+        return self.available_at < other.available_at
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """
+    Parse the timestamp formats integrations use into a naive local datetime
+
+    Handles epoch seconds (Slack ts), epoch milliseconds (Gmail internalDate)
+    and ISO 8601 strings.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = None
+        if number is not None:
+            if number > 1e11:
+                number /= 1000.0
+            try:
+                return datetime.fromtimestamp(number)
+            except (OverflowError, OSError, ValueError):
+                return None
+        try:
+            moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def _item_timestamp(item: Dict[str, Any]) -> Optional[datetime]:
+    for field_name in TIMESTAMP_FIELDS:
+        moment = parse_timestamp(item.get(field_name))
+        if moment:
+            return moment
+    return None
+
+
+def _item_text(item: Dict[str, Any]) -> str:
+    return "\n".join(
+        item[field_name] for field_name in TEXT_FIELDS
+        if isinstance(item.get(field_name), str) and item[field_name]
+    )
+
+
+def _archive_events(path: Path, customer_id: str, source: str, archived_at: datetime) -> List[ReplayEvent]:
+    """Events in one archive: every list item with text, or the archive itself"""
+    try:
+        with open(path, "r") as f:
+            archive = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Skipping unreadable archive {path}: {e}")
+        return []
+    if not isinstance(archive, dict):
+        return []
+
+    items = [
+        item
+        for value in archive.values() if isinstance(value, list)
+        for item in value if isinstance(item, dict) and _item_text(item)
+    ]
+    if not items and _item_text(archive):
+        items = [archive]
+
+    events = []
+    seen = set()
+    for item in items:
+        text = _item_text(item)
+        timestamp = _item_timestamp(item) or archived_at
+        message_id = next((str(item[f]) for f in ID_FIELDS if item.get(f)), None)
+        if message_id is None:
+            # The same message shows up in several lists and in overlapping syncs
+            message_id = hashlib.sha1(f"{customer_id}|{timestamp.isoformat()}|{text}".encode("utf-8")).hexdigest()
+        if message_id in seen:
+            continue
+        seen.add(message_id)
+
+        data = dict(item)
+        data["text"] = text
+        data["message_id"] = message_id
+        data.setdefault("customer_id", archive.get("customer_id", customer_id))
+        events.append(ReplayEvent(timestamp, source, data, delivered_at=max(timestamp, archived_at)))
+    return events
+
+
+def iter_artifact_events(artifacts_dir: str,
+                         customers: Optional[Iterable[str]] = None,
+                         sources: Optional[Iterable[str]] = None) -> Iterator[ReplayEvent]:
+    """
+    Stream events from integration archives in delivery order
+
+    An event is delivered when it happened or when the archive holding it
+    was written, whichever is later. Each <customer>/<type> directory is read
+    one archive at a time and the directories are merged, so memory holds
+    about one archive per directory.
+
+    Args:
+        artifacts_dir: The artifacts/ directory
+        customers: Only these customer directories (default all)
+        sources: Only these content types, e.g. "slack", "gmail" (default all)
+    """
+    root = Path(artifacts_dir)
+    customers = set(customers) if customers else None
+    sources = set(sources) if sources else None
+
+    streams = []
+    for type_dir in sorted(root.glob("*/*")):
+        if not type_dir.is_dir():
+            continue
+        customer_id, source = type_dir.parent.name, type_dir.name
+        if (customers and customer_id not in customers) or (sources and source not in sources):
+            continue
+        streams.append(_directory_events(type_dir, customer_id, source))
+    return heapq.merge(*streams)
+
+
+def _directory_events(type_dir: Path, customer_id: str, source: str) -> Iterator[ReplayEvent]:
+    archives = []
+    for path in type_dir.glob("*_data_*.json"):
+        stamp = "_".join(path.stem.rsplit("_", 2)[-2:])
+        try:
+            archives.append((datetime.strptime(stamp, ARCHIVE_TIME_FORMAT), path))
+        except ValueError:
+            continue
+
+    # Nothing in a later archive is delivered before that archive's time, so
+    # pending events up to it can be released in order
+    pending: List[ReplayEvent] = []
+    for archived_at, path in sorted(archives):
+        while pending and pending[0].available_at <= archived_at:
+            yield heapq.heappop(pending)
+        for event in _archive_events(path, customer_id, source, archived_at):
+            heapq.heappush(pending, event)
+    while pending:
+        yield heapq.heappop(pending)
+
+
+def iter_jsonl_events(path: str, default_source: str = "replay") -> Iterator[ReplayEvent]:
+    """
+    Read events from a JSONL file, one event per line
+
+    A line is either {"source": ..., "timestamp": ..., "data": {...}} or a
+    flat event dict with its own timestamp field. Lines are yielded in file
+    order; replay sorts them.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping invalid JSON on line {line_number} of {path}")
+                continue
+            if not isinstance(record, dict):
+                continue
+            data = record["data"] if isinstance(record.get("data"), dict) else record
+            timestamp = parse_timestamp(record.get("timestamp")) or _item_timestamp(data)
+            if timestamp is None:
+                logger.warning(f"Skipping event without a timestamp on line {line_number} of {path}")
+                continue
+            yield ReplayEvent(
+                timestamp=timestamp,
+                source=record.get("source", default_source),
+                data=data,
+                delivered_at=parse_timestamp(record.get("delivered_at"))
+            )
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of a replay"""
+    events_replayed: int = 0
+    duplicates_skipped: int = 0
+    triggers_fired: int = 0
+    first_event_at: Optional[datetime] = None
+    last_event_at: Optional[datetime] = None
+    elapsed_seconds: float = 0.0
+    rule_hits: Dict[str, int] = field(default_factory=dict)
+    hits_by_customer: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    fire_delays: Dict[str, List[float]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        time_to_fire = {}
+        for rule_id, delays in self.fire_delays.items():
+            ordered = sorted(delays)
+            time_to_fire[rule_id] = {
+                "count": len(ordered),
+                "mean_seconds": round(sum(ordered) / len(ordered), 3),
+                "p50_seconds": round(_percentile(ordered, 0.5), 3),
+                "p95_seconds": round(_percentile(ordered, 0.95), 3),
+                "max_seconds": round(ordered[-1], 3)
+            }
+        return {
+            "events_replayed": self.events_replayed,
+            "duplicates_skipped": self.duplicates_skipped,
+            "triggers_fired": self.triggers_fired,
+            "history_start": self.first_event_at.isoformat() if self.first_event_at else None,
+            "history_end": self.last_event_at.isoformat() if self.last_event_at else None,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "events_per_second": round(self.events_replayed / self.elapsed_seconds, 1) if self.elapsed_seconds > 0 else 0.0,
+            "rule_hits": dict(sorted(self.rule_hits.items(), key=lambda item: -item[1])),
+            "hits_by_customer": self.hits_by_customer,
+            "time_to_fire": time_to_fire
+        }
+
+
+class TriggerReplay:
+    """Backtests the trigger rules against historical events"""
+
+    def __init__(self,
+                 rules_path: Optional[str] = None,
+                 poll_interval_seconds: Optional[Dict[str, float]] = None,
+                 default_poll_interval_seconds: Optional[float] = None,
+                 **engine_options):
+        """
+        Args:
+            rules_path: Rules file to test (default the engine's triggers.md)
+            poll_interval_seconds: Per source, the live polling interval; an
+                event is processed at the first poll after it was delivered
+            default_poll_interval_seconds: Interval for sources not listed;
+                None processes them the moment they are delivered
+            **engine_options: Extra TriggerEngine arguments, e.g. num_shards
+        """
+        self.clock = SimulatedClock()
+        self.poll_interval_seconds = poll_interval_seconds or {}
+        self.default_poll_interval_seconds = default_poll_interval_seconds
+        engine_options.setdefault("max_queue_size", 0)
+        engine_options.setdefault("digest_intervals", {})
+        self.engine = TriggerEngine(
+            rules_path=rules_path,
+            clock=self.clock.monotonic,
+            wall_clock=self.clock.now,
+            **engine_options
+        )
+
+    def _delivery_time(self, event: ReplayEvent) -> datetime:
+        delivered_at = event.available_at
+        interval = self.poll_interval_seconds.get(event.source, self.default_poll_interval_seconds)
+        if interval:
+            # Next poll tick at or after the event, ticks aligned to the epoch
+            epoch = delivered_at.timestamp()
+            delivered_at += timedelta(seconds=math.ceil(epoch / interval) * interval - epoch)
+        return delivered_at
+
+    def _drain(self, report: ReplayReport, event: ReplayEvent):
+        """Record the triggers the last event fired without running their actions"""
+        queue = self.engine.event_queue
+        while not queue.empty():
+            trigger_event = queue.get_nowait()
+            queue.task_done()
+            rule_id = trigger_event.trigger_id
+            report.triggers_fired += 1
+            report.rule_hits[rule_id] = report.rule_hits.get(rule_id, 0) + 1
+            customer_hits = report.hits_by_customer.setdefault(trigger_event.customer_id or "", {})
+            customer_hits[rule_id] = customer_hits.get(rule_id, 0) + 1
+            delay = (trigger_event.timestamp - event.timestamp).total_seconds()
+            report.fire_delays.setdefault(rule_id, []).append(delay)
+
+    async def run(self, events: Iterable[ReplayEvent], presorted: bool = False) -> ReplayReport:
+        """
+        Replay events through the engine in delivery order
+
+        Args:
+            events: Historical events, e.g. from iter_artifact_events or iter_jsonl_events
+            presorted: Events already arrive in delivery order (as from
+                iter_artifact_events), so stream them instead of sorting in memory
+        """
+        report = ReplayReport()
+        if not presorted:
+            events = sorted(events, key=self._delivery_time)
+        started = time.perf_counter()
+        duplicates_before = self.engine.stats.duplicates_skipped
+
+        for event in events:
+            delivered_at = self._delivery_time(event)
+            self.clock.advance_to(delivered_at)
+            await self.engine.process_event(event.source, event.data)
+            self._drain(report, event)
+
+            report.events_replayed += 1
+            if report.first_event_at is None or event.timestamp < report.first_event_at:
+                report.first_event_at = event.timestamp
+            if report.last_event_at is None or event.timestamp > report.last_event_at:
+                report.last_event_at = event.timestamp
+
+        report.elapsed_seconds = time.perf_counter() - started
+        report.duplicates_skipped = self.engine.stats.duplicates_skipped - duplicates_before
+        self.engine.stop()
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest trigger rules against historical events")
+    parser.add_argument("--artifacts", help="artifacts/ directory written by the integrations")
+    parser.add_argument("--jsonl", help="JSONL file of historical events")
+    parser.add_argument("--rules", help="Rules file to test (default personal/triggers.md)")
+    parser.add_argument("--customer", action="append", help="Only replay this customer (repeatable)")
+    parser.add_argument("--source", action="append", help="Only replay this content type (repeatable)")
+    parser.add_argument("--poll-interval", type=float, help="Simulated polling interval in seconds for every source")
+    parser.add_argument("--shards", type=int, default=0, help="Evaluate rules in this many processes")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    if not args.artifacts and not args.jsonl:
+        parser.error("one of --artifacts or --jsonl is required")
+
+    events: Iterable[ReplayEvent] = []
+    if args.artifacts:
+        events = iter_artifact_events(args.artifacts, args.customer, args.source)
+    if args.jsonl:
+        events = list(events) + list(iter_jsonl_events(args.jsonl))
+
+    replay = TriggerReplay(
+        rules_path=args.rules,
+        default_poll_interval_seconds=args.poll_interval,
+        num_shards=args.shards
+    )
+    # One interval for every source keeps the archive stream's order, so it needn't be sorted
+    presorted = not args.jsonl
+    report = asyncio.run(replay.run(events, presorted=presorted)).to_dict()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Replay report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Parse personal trigger markdown (personal/triggers.md) into rule definitions
+
+triggers.md is written for people, so only explicit rules are compiled:
+
+- A fenced ``trigger`` block holds one JSON rule definition (keywords,
+  regex patterns, metric thresholds, actions, cooldowns)
+- A block naming a ``section`` also takes that section's ``- **Account**: ...``
+  bullets (when the title mentions accounts) or quoted phrases, with a
+  trailing "..." and [placeholders] dropped from each phrase
+
+Sections no block claims are documentation and never become rules: their
+wording (e.g. subject-line keywords such as "audit" or "trial") is too
+broad to match as substrings of every message.
+
+Definitions are plain dicts in TriggerRule's shape, so this module does not
+depend on the engine.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Longer quoted text is prose (e.g. a response template), not a trigger phrase
+MAX_PHRASE_WORDS = 6
+
+# Actions of a trigger block that doesn't list any
+DEFAULT_ACTIONS = {
+    "critical": ["immediate_alert", "notify_manager"],
+    "high": ["notify_ae", "log_to_crm"],
+    "medium": ["add_to_report"],
+    "low": ["add_to_report"],
+}
+
+_HEADING = re.compile(r"^(#{2,3})\s+(.+?)\s*$")
+_FENCE = re.compile(r"^\s*```\s*(\w*)\s*$")
+_ACCOUNT_BULLET = re.compile(r"^\s*[-*]\s+\*\*(.+?)\*\*\s*:")
+_QUOTED = re.compile(r'"([^"\n]+)"')
+_PLACEHOLDER = re.compile(r"\[[^\]]*\]")
+
+
+def slugify(text: str) -> str:
+    """Lowercase identifier form of a title or account name"""
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def normalize_phrase(phrase: str) -> Optional[str]:
+    """
+    Keyword form of a quoted phrase, or None if it isn't usable as one
+
+    "We need something by [date]" -> "we need something by"
+    "Can ACME handle..." -> "can acme handle"
+    """
+    phrase = _PLACEHOLDER.sub(" ", phrase)
+    phrase = phrase.replace("…", " ").replace("...", " ")
+    phrase = " ".join(phrase.split()).strip(" .,;:!?").lower()
+    if not phrase or len(phrase.split()) > MAX_PHRASE_WORDS:
+        return None
+    return phrase
+
+
+class _Section:
+    """Phrases and accounts collected under one ### heading"""
+
+    def __init__(self, title: str):
+        self.title = title
+        self.phrases: List[str] = []
+        self.accounts: List[str] = []
+
+    def add_line(self, line: str):
+        if not line.lstrip().startswith(("-", "*")):
+            return
+        account = _ACCOUNT_BULLET.match(line)
+        if account and "account" in self.title.lower():
+            self.accounts.append(account.group(1).strip())
+            return
+        for quoted in _QUOTED.findall(line):
+            phrase = normalize_phrase(quoted)
+            if phrase and phrase not in self.phrases:
+                self.phrases.append(phrase)
+
+
+def _merge_section(rule: Dict[str, Any], section: _Section):
+    """Add a section's phrases or accounts to the trigger block claiming it"""
+    conditions = rule.setdefault("conditions", {})
+    if section.accounts:
+        customer_ids = conditions.setdefault("customer_ids", [])
+        customer_ids.extend(
+            customer_id for customer_id in map(slugify, section.accounts)
+            if customer_id not in customer_ids
+        )
+    if section.phrases:
+        keywords = conditions.setdefault("keywords", [])
+        known = {keyword.lower() for keyword in keywords}
+        keywords.extend(phrase for phrase in section.phrases if phrase not in known)
+
+
+def parse_trigger_markdown(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse triggers markdown into rule definitions
+
+    Args:
+        text: Markdown content
+
+    Returns:
+        Rule definitions of the trigger blocks, in file order
+
+    Raises:
+        ValueError: If a trigger block is not a JSON object with an id and
+            type, or has a pattern that isn't a valid regex
+    """
+    blocks: List[Dict[str, Any]] = []
+    sections: List[_Section] = []
+    section: Optional[_Section] = None
+    fence: Optional[str] = None
+    fence_lines: List[str] = []
+
+    for line_number, line in enumerate(text.splitlines(), 1):
+        fence_match = _FENCE.match(line)
+        if fence is not None:
+            if fence_match and not fence_match.group(1):
+                if fence == "trigger":
+                    blocks.append(_parse_block("\n".join(fence_lines), line_number))
+                fence = None
+                fence_lines = []
+            else:
+                fence_lines.append(line)
+            continue
+        if fence_match:
+            fence = fence_match.group(1).lower()
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            if len(heading.group(1)) == 2:
+                section = None
+            else:
+                section = _Section(heading.group(2))
+                sections.append(section)
+            continue
+
+        if section is not None:
+            section.add_line(line)
+
+    claimed = {}
+    for block in blocks:
+        if block.get("section"):
+            claimed[slugify(block["section"])] = block
+
+    for section in sections:
+        block = claimed.get(slugify(section.title))
+        if block is not None:
+            _merge_section(block, section)
+
+    for block in blocks:
+        block.pop("section", None)
+    return blocks
+
+
+def _parse_block(source: str, line_number: int) -> Dict[str, Any]:
+    try:
+        rule = json.loads(source)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid trigger block ending at line {line_number}: {e}") from e
+    if not isinstance(rule, dict) or "id" not in rule or "type" not in rule:
+        raise ValueError(f"Trigger block ending at line {line_number} needs an id and a type")
+    for pattern in rule.get("conditions", {}).get("patterns", []):
+        try:
+            re.compile(pattern)
+        except (re.error, TypeError) as e:
+            raise ValueError(f"Trigger block ending at line {line_number} has an invalid pattern {pattern!r}: {e}") from e
+    rule.setdefault("name", rule["id"].replace("_", " ").title())
+    rule.setdefault("description", rule["name"])
+    rule.setdefault("priority", "medium")
+    rule.setdefault("actions", list(DEFAULT_ACTIONS.get(rule["priority"], [])))
+    return rule
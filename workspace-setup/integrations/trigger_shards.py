@@ -0,0 +1,172 @@
+"""
+Multi-process rule evaluation for the trigger engine
+
+Events are partitioned by a stable hash of customer_id across worker
+processes, each holding a copy of the compiled ruleset and the cooldowns of
+its own customers. Every customer maps to exactly one single-process
+executor that runs batches in submission order, so a customer's events are
+evaluated in order and its cooldowns live in one place. Results go back to
+the engine, which builds the trigger events and dispatches their actions.
+"""
+
+import asyncio
+import logging
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from .trigger_cooldowns import CooldownStore
+from .triggers.window_counter import WindowStore
+
+logger = logging.getLogger(__name__)
+
+# Per-process state of a shard worker
+_shard_ruleset = None
+_shard_cooldowns: Optional[CooldownStore] = None
+_shard_windows: Optional[WindowStore] = None
+
+
+def _init_shard(max_cooldown_entries: int,
+                cooldown_entries: List[Tuple[str, str, float]],
+                now: float,
+                max_window_entries: int = 100000):
+    """
+    Seed a new shard process with the cooldowns of its customers, as of the engine clock's now
+
+    Window counts of THRESHOLD/PATTERN rules live only in the shard and
+    start empty when a shard is (re)started.
+    """
+    global _shard_cooldowns, _shard_windows
+    _shard_windows = WindowStore(max_entries=max_window_entries)
+    _shard_cooldowns = CooldownStore(max_entries=max_cooldown_entries)
+    for rule_id, customer_id, remaining in cooldown_entries:
+        _shard_cooldowns.start(rule_id, customer_id, remaining, now)
+
+
+def _evaluate_batch(ruleset, events: List[Dict[str, Any]], now: float) -> List[List[Tuple[str, Any]]]:
+    """
+    Evaluate a batch of events in a shard process
+
+    Args:
+        ruleset: New CompiledRuleset to install first, or None to keep the current one
+        events: Normalized events, all belonging to this shard
+        now: Monotonic time for cooldown checks
+
+    Returns:
+        Per event, (rule_id, keyword matches) for each rule it fired
+    """
+    global _shard_ruleset
+    if ruleset is not None:
+        _shard_ruleset = ruleset
+    return [
+        [(rule.id, rule_matches) for rule, rule_matches in _shard_ruleset.evaluate(event, _shard_cooldowns, now, windows=_shard_windows)]
+        for event in events
+    ]
+
+
+class ShardedEvaluator:
+    """Pool of single-process shards, each owning the customers that hash to it"""
+
+    def __init__(self, num_shards: int, max_cooldown_entries: int = 100000, max_window_entries: int = 100000):
+        self.num_shards = max(1, num_shards)
+        self.max_cooldown_entries = max_cooldown_entries
+        self.max_window_entries = max_window_entries
+        self.events_by_shard = [0] * self.num_shards
+        self._executors: List[Optional[ProcessPoolExecutor]] = [None] * self.num_shards
+        # Ruleset each shard last received, so it is only pickled across on change
+        self._installed: List[Any] = [None] * self.num_shards
+
+    def shard_of(self, customer_id: Optional[str]) -> int:
+        """Shard owning a customer; stable across processes and restarts"""
+        return zlib.crc32((customer_id or "").encode("utf-8")) % self.num_shards
+
+    def _start_shard(self, shard: int, cooldowns: CooldownStore):
+        # Cooldowns are checked against the engine's clock, which may be simulated
+        now = cooldowns.clock()
+        entries = [entry for entry in cooldowns.entries(now) if self.shard_of(entry[1]) == shard]
+        self._executors[shard] = ProcessPoolExecutor(
+            max_workers=1,
+            initializer=_init_shard,
+            initargs=(self.max_cooldown_entries, entries, now, self.max_window_entries)
+        )
+        self._installed[shard] = None
+
+    async def _run_shard(self,
+                         shard: int,
+                         ruleset,
+                         events: List[Dict[str, Any]],
+                         now: float,
+                         cooldowns: CooldownStore) -> List[List[Tuple[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            if self._executors[shard] is None:
+                self._start_shard(shard, cooldowns)
+            executor = self._executors[shard]
+            send = None if self._installed[shard] is ruleset else ruleset
+            self._installed[shard] = ruleset
+            try:
+                return await loop.run_in_executor(executor, _evaluate_batch, send, events, now)
+            except BrokenProcessPool:
+                # The worker died; restart it from the engine's cooldowns and retry once
+                if self._executors[shard] is executor:
+                    logger.error(f"Trigger shard {shard} worker died, restarting")
+                    executor.shutdown(wait=False)
+                    self._executors[shard] = None
+                if attempt:
+                    raise
+            except BaseException:
+                # Unknown whether the ruleset arrived; resend it next time
+                self._installed[shard] = None
+                raise
+
+    async def evaluate(self,
+                       ruleset,
+                       events: List[Dict[str, Any]],
+                       now: float,
+                       cooldowns: CooldownStore) -> List[List[Tuple[str, Any]]]:
+        """
+        Evaluate events across the shards
+
+        Args:
+            ruleset: CompiledRuleset to evaluate against
+            events: Normalized events
+            now: Monotonic time for cooldown checks
+            cooldowns: The engine's cooldown store, used to seed (re)started shards
+
+        Returns:
+            Per event, in input order, (rule_id, keyword matches) for each rule it fired
+        """
+        indexes_by_shard: Dict[int, List[int]] = {}
+        for index, event_data in enumerate(events):
+            indexes_by_shard.setdefault(self.shard_of(event_data.get("customer_id")), []).append(index)
+
+        shards = list(indexes_by_shard)
+        shard_results = await asyncio.gather(*(
+            self._run_shard(shard, ruleset, [events[i] for i in indexes_by_shard[shard]], now, cooldowns)
+            for shard in shards
+        ))
+
+        results: List[List[Tuple[str, Any]]] = [[] for _ in events]
+        for shard, hits in zip(shards, shard_results):
+            indexes = indexes_by_shard[shard]
+            self.events_by_shard[shard] += len(indexes)
+            for index, event_hits in zip(indexes, hits):
+                results[index] = event_hits
+        return results
+
+    def close(self):
+        """Stop the shard processes"""
+        for shard, executor in enumerate(self._executors):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._executors[shard] = None
+            self._installed[shard] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "num_shards": self.num_shards,
+            "running": sum(executor is not None for executor in self._executors),
+            "events_by_shard": list(self.events_by_shard)
+        }
@@ -0,0 +1,130 @@
+"""
+Constant-time statistics for the trigger engine
+
+Counters are updated as trigger events complete, so reading stats never
+rescans the retained event history.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class RollingCounter:
+    """Event count over a sliding time window, kept in a fixed ring of buckets"""
+
+    def __init__(self,
+                 window_seconds: float,
+                 num_buckets: int = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self.num_buckets = num_buckets
+        self.bucket_seconds = window_seconds / num_buckets
+        self.clock = clock
+        self._counts: List[int] = [0] * num_buckets
+        self._epochs: List[int] = [-1] * num_buckets
+
+    def add(self, amount: int = 1, now: Optional[float] = None):
+        """Count events at the current (or given) time"""
+        epoch = int((self.clock() if now is None else now) / self.bucket_seconds)
+        slot = epoch % self.num_buckets
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+        self._counts[slot] += amount
+
+    def total(self, now: Optional[float] = None) -> int:
+        """Events counted within the window"""
+        oldest = int((self.clock() if now is None else now) / self.bucket_seconds) - self.num_buckets
+        return sum(
+            count for count, epoch in zip(self._counts, self._epochs)
+            if epoch > oldest
+        )
+
+    def rate_per_minute(self, now: Optional[float] = None) -> float:
+        """Average events per minute over the window"""
+        return self.total(now) * 60.0 / self.window_seconds
+
+
+class TriggerStats:
+    """Running counters for processed trigger events"""
+
+    WINDOWS = {
+        "1m": 60,
+        "5m": 300,
+        "1h": 3600,
+    }
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.total = 0
+        self.by_priority: Dict[str, int] = {}
+        self.by_type: Dict[str, int] = {}
+        self.by_source: Dict[str, int] = {}
+        self.by_rule: Dict[str, int] = {}
+        self.duplicates_skipped = 0
+        self.windows = {
+            name: RollingCounter(seconds, clock=clock)
+            for name, seconds in self.WINDOWS.items()
+        }
+
+        # Queue pressure
+        self.shed_by_priority: Dict[str, int] = {}
+        self.backpressure_delays = 0
+        self.backpressure_seconds = 0.0
+        self.peak_queue_depth = 0
+
+    def record(self, priority: str, trigger_type: str, source: str, rule_id: str):
+        """Count one completed trigger event"""
+        self.total += 1
+        self.by_priority[priority] = self.by_priority.get(priority, 0) + 1
+        self.by_type[trigger_type] = self.by_type.get(trigger_type, 0) + 1
+        self.by_source[source] = self.by_source.get(source, 0) + 1
+        self.by_rule[rule_id] = self.by_rule.get(rule_id, 0) + 1
+
+        now = self.clock()
+        for counter in self.windows.values():
+            counter.add(now=now)
+
+    def record_shed(self, priority: str):
+        """Count one event dropped by the load-shedding policy"""
+        self.shed_by_priority[priority] = self.shed_by_priority.get(priority, 0) + 1
+
+    def record_delay(self, seconds: float):
+        """Count one monitor poll held back by backpressure"""
+        self.backpressure_delays += 1
+        self.backpressure_seconds += seconds
+
+    def record_queue_depth(self, depth: int):
+        """Track the deepest the queue has been"""
+        if depth > self.peak_queue_depth:
+            self.peak_queue_depth = depth
+
+    def window_counts(self) -> Dict[str, Dict[str, float]]:
+        """Counts and per-minute rates for each sliding window"""
+        now = self.clock()
+        return {
+            name: {
+                "count": counter.total(now),
+                "per_minute": round(counter.rate_per_minute(now), 3)
+            }
+            for name, counter in self.windows.items()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "total_triggers": self.total,
+            "triggers_by_priority": dict(self.by_priority),
+            "triggers_by_type": dict(self.by_type),
+            "triggers_by_source": dict(self.by_source),
+            "triggers_by_rule": dict(self.by_rule),
+            "duplicates_skipped": self.duplicates_skipped,
+            "trigger_rates": self.window_counts(),
+            "load_shedding": {
+                "shed_total": sum(self.shed_by_priority.values()),
+                "shed_by_priority": dict(self.shed_by_priority),
+                "backpressure_delays": self.backpressure_delays,
+                "backpressure_seconds": round(self.backpressure_seconds, 3),
+                "peak_queue_depth": self.peak_queue_depth
+            }
+        }
@@ -4,7 +4,7 @@ Trigger system for sales workspace automation
 
 from .base_trigger import BaseTrigger, TriggerCondition
 from .customer_triggers import CustomerTrigger, AccountHealthTrigger
-from .keyword_triggers import KeywordTrigger, BuyingSignalTrigger, ChurnRiskTrigger
+from .keyword_triggers import KeywordTrigger, KeywordTriggerSet, BuyingSignalTrigger, ChurnRiskTrigger
 from .metric_triggers import MetricTrigger, UsageDropTrigger
 
 __all__ = [
@@ -13,6 +13,7 @@ __all__ = [
     'CustomerTrigger',
     'AccountHealthTrigger',
     'KeywordTrigger',
+    'KeywordTriggerSet',
     'BuyingSignalTrigger',
     'ChurnRiskTrigger',
     'MetricTrigger',
@@ -2,26 +2,14 @@
 Base trigger class for all trigger types
 """
 
+import functools
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-from enum import Enum
+from typing import Callable, Dict, Any, List, Optional
 
-
-class TriggerCondition(Enum):
-    """Condition operators for triggers"""
-    EQUALS = "equals"
-    NOT_EQUALS = "not_equals"
-    CONTAINS = "contains"
-    NOT_CONTAINS = "not_contains"
-    GREATER_THAN = "greater_than"
-    LESS_THAN = "less_than"
-    GREATER_THAN_OR_EQUAL = "greater_than_or_equal"
-    LESS_THAN_OR_EQUAL = "less_than_or_equal"
-    IN_LIST = "in_list"
-    NOT_IN_LIST = "not_in_list"
-    MATCHES_REGEX = "matches_regex"
+from .conditions import TriggerCondition, cached_condition
+from .rule_profiler import RuleProfiler
 
 
 @dataclass
@@ -44,9 +32,40 @@ class TriggerResult:
         }
 
 
+def _profiled(trigger: "BaseTrigger") -> Callable:
+    """A trigger's evaluate(), bound so sampled calls are timed by its profiler"""
+    evaluate = type(trigger).evaluate
+
+    @functools.wraps(evaluate)
+    def profiled(data, *args, **kwargs):
+        profiler = trigger.profiler
+        if profiler is None or not profiler.sample():
+            return evaluate(trigger, data, *args, **kwargs)
+        started = profiler.clock()
+        result = evaluate(trigger, data, *args, **kwargs)
+        profiler.record(trigger.trigger_id, profiler.clock() - started, result.triggered)
+        return result
+    return profiled
+
+
 class BaseTrigger(ABC):
     """Base class for all triggers"""
     
+    @property
+    def profiler(self) -> Optional[RuleProfiler]:
+        """Profiler timing sampled evaluate() calls, or None"""
+        return self.__dict__.get("_profiler")
+    
+    @profiler.setter
+    def profiler(self, profiler: Optional[RuleProfiler]):
+        # evaluate() is only wrapped while a profiler is attached, and
+        # super().evaluate() calls inside it run unwrapped
+        self._profiler = profiler
+        if profiler is None:
+            self.__dict__.pop("evaluate", None)
+        else:
+            self.evaluate = _profiled(self)
+    
     def __init__(self, 
                  trigger_id: str,
                  name: str,
@@ -99,13 +118,18 @@ class BaseTrigger(ABC):
     
     def get_stats(self) -> Dict[str, Any]:
         """Get trigger statistics"""
-        return {
+        stats = {
             "trigger_id": self.trigger_id,
             "name": self.name,
             "enabled": self.enabled,
             "trigger_count": self.trigger_count,
             "last_triggered": self.last_triggered.isoformat() if self.last_triggered else None
         }
+        if self.profiler is not None:
+            profile = self.profiler.rule_stats(self.trigger_id)
+            if profile:
+                stats["profile"] = profile
+        return stats
     
     def check_condition(self, 
                        value: Any, 
@@ -122,31 +146,8 @@ class BaseTrigger(ABC):
         Returns:
             True if condition is met
         """
-        if condition == TriggerCondition.EQUALS:
-            return value == target
-        elif condition == TriggerCondition.NOT_EQUALS:
-            return value != target
-        elif condition == TriggerCondition.CONTAINS:
-            return str(target).lower() in str(value).lower()
-        elif condition == TriggerCondition.NOT_CONTAINS:
-            return str(target).lower() not in str(value).lower()
-        elif condition == TriggerCondition.GREATER_THAN:
-            return float(value) > float(target)
-        elif condition == TriggerCondition.LESS_THAN:
-            return float(value) < float(target)
-        elif condition == TriggerCondition.GREATER_THAN_OR_EQUAL:
-            return float(value) >= float(target)
-        elif condition == TriggerCondition.LESS_THAN_OR_EQUAL:
-            return float(value) <= float(target)
-        elif condition == TriggerCondition.IN_LIST:
-            return value in target
-        elif condition == TriggerCondition.NOT_IN_LIST:
-            return value not in target
-        elif condition == TriggerCondition.MATCHES_REGEX:
-            import re
-            return bool(re.search(target, str(value), re.IGNORECASE))
-        
-        return False
+        # Compiled once per (condition, target); see conditions.compile_condition
+        return cached_condition(condition, target)(value)
     
     def calculate_confidence(self, 
                            matched_conditions: List[str], 
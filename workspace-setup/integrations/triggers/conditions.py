@@ -0,0 +1,230 @@
+"""
+Condition compilation for triggers and rules
+
+A condition is compiled once into a closure: its target is converted up
+front, regexes are precompiled and AND/OR groups become nested closures, so
+checking it is a single call instead of a walk down the operator chain.
+
+Group specs, as used in rule conditions:
+
+    {"metric": "usage_change_percent", "operator": "lt", "threshold": -20}
+    {"field": "plan", "operator": "in_list", "value": ["pro", "enterprise"]}
+    {"all": [<spec>, ...]}   every spec holds
+    {"any": [<spec>, ...]}   at least one spec holds
+
+Operators are TriggerCondition values or the short rule names (gt, lt, eq,
+gte, lte). A missing value, an unknown operator or a spec with neither
+metric nor field never holds.
+"""
+
+import functools
+import operator
+import re
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class TriggerCondition(Enum):
+    """Condition operators for triggers"""
+    EQUALS = "equals"
+    NOT_EQUALS = "not_equals"
+    CONTAINS = "contains"
+    NOT_CONTAINS = "not_contains"
+    GREATER_THAN = "greater_than"
+    LESS_THAN = "less_than"
+    GREATER_THAN_OR_EQUAL = "greater_than_or_equal"
+    LESS_THAN_OR_EQUAL = "less_than_or_equal"
+    IN_LIST = "in_list"
+    NOT_IN_LIST = "not_in_list"
+    MATCHES_REGEX = "matches_regex"
+
+
+# Short operator names used by engine rules
+OPERATOR_ALIASES = {
+    "gt": TriggerCondition.GREATER_THAN,
+    "lt": TriggerCondition.LESS_THAN,
+    "eq": TriggerCondition.EQUALS,
+    "gte": TriggerCondition.GREATER_THAN_OR_EQUAL,
+    "lte": TriggerCondition.LESS_THAN_OR_EQUAL
+}
+
+_NUMERIC = {
+    TriggerCondition.GREATER_THAN: operator.gt,
+    TriggerCondition.LESS_THAN: operator.lt,
+    TriggerCondition.GREATER_THAN_OR_EQUAL: operator.ge,
+    TriggerCondition.LESS_THAN_OR_EQUAL: operator.le
+}
+
+Predicate = Callable[[Any], bool]
+EventPredicate = Callable[[Dict[str, Any]], bool]
+
+
+def _never(_: Any) -> bool:
+    return False
+
+
+def _numeric(compare: Callable[[Any, Any], bool], target: Any) -> Predicate:
+    target = float(target)
+
+    def predicate(value: Any) -> bool:
+        # Numbers compare as they are; anything else is converted like the target
+        if value.__class__ is float or value.__class__ is int:
+            return compare(value, target)
+        return compare(float(value), target)
+    return predicate
+
+
+def _membership(target: Any, negate: bool) -> Predicate:
+    members = target
+    if isinstance(target, (list, tuple, set, frozenset)):
+        try:
+            members = frozenset(target)
+        except TypeError:
+            pass  # Unhashable items; keep the sequence
+
+    def predicate(value: Any) -> bool:
+        try:
+            found = value in members
+        except TypeError:
+            found = value in target
+        return found is not negate
+    return predicate
+
+
+def compile_condition(condition: TriggerCondition, target: Any) -> Predicate:
+    """
+    Compile one condition into a predicate over a value
+
+    Args:
+        condition: The condition type
+        target: The target value or pattern; converted here, so a
+            non-numeric target for a comparison raises ValueError
+
+    Returns:
+        Callable taking the value to check and returning True if the condition is met
+    """
+    if condition == TriggerCondition.EQUALS:
+        return lambda value: value == target
+    elif condition == TriggerCondition.NOT_EQUALS:
+        return lambda value: value != target
+    elif condition == TriggerCondition.CONTAINS:
+        needle = str(target).lower()
+        return lambda value: needle in str(value).lower()
+    elif condition == TriggerCondition.NOT_CONTAINS:
+        needle = str(target).lower()
+        return lambda value: needle not in str(value).lower()
+    elif condition in _NUMERIC:
+        return _numeric(_NUMERIC[condition], target)
+    elif condition == TriggerCondition.IN_LIST:
+        return _membership(target, negate=False)
+    elif condition == TriggerCondition.NOT_IN_LIST:
+        return _membership(target, negate=True)
+    elif condition == TriggerCondition.MATCHES_REGEX:
+        pattern = re.compile(target, re.IGNORECASE)
+        return lambda value: pattern.search(str(value)) is not None
+
+    return _never
+
+
+@functools.lru_cache(maxsize=1024, typed=True)
+def _cached_condition(condition: TriggerCondition, target: Any) -> Predicate:
+    return compile_condition(condition, target)
+
+
+def cached_condition(condition: TriggerCondition, target: Any) -> Predicate:
+    """compile_condition, reusing the predicate for a hashable target seen before"""
+    try:
+        return _cached_condition(condition, target)
+    except TypeError:
+        return compile_condition(condition, target)
+
+
+def parse_operator(name: Any) -> Optional[TriggerCondition]:
+    """TriggerCondition for an operator name or alias, None if unknown"""
+    if isinstance(name, TriggerCondition):
+        return name
+    if name in OPERATOR_ALIASES:
+        return OPERATOR_ALIASES[name]
+    try:
+        return TriggerCondition(name)
+    except ValueError:
+        return None
+
+
+def compile_conditions(spec: Dict[str, Any], default_operator: str = "gt") -> EventPredicate:
+    """
+    Compile a condition spec, including nested all/any groups, into a predicate over an event
+
+    Args:
+        spec: Leaf condition or group, see the module docstring
+        default_operator: Operator for leaves that don't name one
+
+    Returns:
+        Callable taking the event dict and returning True if the spec holds
+    """
+    if "all" in spec:
+        predicates = [compile_conditions(child, default_operator) for child in spec["all"]]
+
+        def all_of(event: Dict[str, Any]) -> bool:
+            for predicate in predicates:
+                if not predicate(event):
+                    return False
+            return True
+        return all_of
+
+    if "any" in spec:
+        predicates = [compile_conditions(child, default_operator) for child in spec["any"]]
+
+        def any_of(event: Dict[str, Any]) -> bool:
+            for predicate in predicates:
+                if predicate(event):
+                    return True
+            return False
+        return any_of
+
+    condition = parse_operator(spec.get("operator", default_operator))
+    if condition is None:
+        return _never
+    check = compile_condition(condition, spec["threshold"] if "threshold" in spec else spec.get("value"))
+
+    metric_name = spec.get("metric")
+    if metric_name is not None:
+        def metric_holds(event: Dict[str, Any]) -> bool:
+            value = (event.get("metrics") or {}).get(metric_name)
+            return value is not None and check(value)
+        return metric_holds
+
+    field_name = spec.get("field")
+    if field_name is not None:
+        def field_holds(event: Dict[str, Any]) -> bool:
+            value = event.get(field_name)
+            return value is not None and check(value)
+        return field_holds
+
+    return _never
+
+
+def required_metric(spec: Dict[str, Any]) -> Optional[str]:
+    """A metric the event must carry for the spec to hold, if there is one"""
+    if "all" in spec:
+        for child in spec["all"]:
+            metric_name = required_metric(child)
+            if metric_name is not None:
+                return metric_name
+        return None
+    if "any" in spec:
+        return None
+    return spec.get("metric")
+
+
+def condition_metrics(spec: Dict[str, Any]) -> List[str]:
+    """Every metric a spec reads, in order of appearance"""
+    if "all" in spec or "any" in spec:
+        names: List[str] = []
+        for child in spec.get("all", spec.get("any", [])):
+            for metric_name in condition_metrics(child):
+                if metric_name not in names:
+                    names.append(metric_name)
+        return names
+    metric_name = spec.get("metric")
+    return [metric_name] if metric_name is not None else []
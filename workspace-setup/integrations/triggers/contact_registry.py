@@ -0,0 +1,253 @@
+"""
+Known contacts per customer for stakeholder detection
+
+Integrations with a registry attached (see BaseIntegration.contacts) feed
+the participants of every email thread, Gong call, Granola meeting and
+customer Slack channel they sync into it. Each customer keeps a hash set of
+normalized emails and names with the time a contact was first seen and the
+seniority of their title, so whether someone is new is one lookup at event
+time instead of a scan of the customer's history.
+
+Contacts are stored as 64-bit hashes, not addresses or names. On disk each
+one packs into 13 bytes (hash, first seen, seniority); customers are only
+unpacked when first touched after loading.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTACT_REGISTRY_VERSION = 1
+
+_RECORD = struct.Struct("<QIB")  # key hash, first seen (unix seconds), seniority
+
+# Title seniority, highest first; a title takes the first level it matches
+SENIORITY_LEVELS: List[Tuple[int, re.Pattern]] = [
+    (4, re.compile(r"\b(ceo|cto|cio|cfo|coo|cmo|cro|ciso|chief|founder|co-founder|(?<!vice )president)\b")),
+    (3, re.compile(r"\b(vp|svp|evp|vice president)\b")),
+    (2, re.compile(r"\b(director|head of|head)\b")),
+    (1, re.compile(r"\b(manager|lead|principal)\b"))
+]
+EXECUTIVE_SENIORITY = 3  # VP and above
+
+_ADDRESS = re.compile(r"<([^>]+)>")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def title_seniority(title: Optional[str]) -> int:
+    """Seniority level of a job title, 0 when unknown or individual contributor"""
+    if not title:
+        return 0
+    title = title.lower()
+    for level, pattern in SENIORITY_LEVELS:
+        if pattern.search(title):
+            return level
+    return 0
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Lowercased address, taken from "Name <address>" forms"""
+    if not email:
+        return None
+    match = _ADDRESS.search(email)
+    if match:
+        email = match.group(1)
+    email = email.strip().lower()
+    return email if "@" in email else None
+
+
+def normalize_name(name: Optional[str]) -> Optional[str]:
+    """Casefolded name with whitespace collapsed"""
+    if not name:
+        return None
+    name = _WHITESPACE.sub(" ", name).strip().casefold()
+    return name or None
+
+
+def _hash_key(kind: str, value: str) -> int:
+    digest = hashlib.blake2b(f"{kind}:{value}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def contact_keys(email: Optional[str] = None, name: Optional[str] = None) -> List[int]:
+    """Hashed lookup keys of a contact: its email and its name, where known"""
+    keys = []
+    email = normalize_email(email)
+    if email:
+        keys.append(_hash_key("email", email))
+    name = normalize_name(name)
+    if name:
+        keys.append(_hash_key("name", name))
+    return keys
+
+
+def parse_participant(participant: Any) -> Dict[str, Optional[str]]:
+    """Email, name and title of a participant given as a dict, an address or a plain name"""
+    if isinstance(participant, dict):
+        return {
+            "email": participant.get("email") or participant.get("emailAddress"),
+            "name": participant.get("name") or participant.get("displayName"),
+            "title": participant.get("title")
+        }
+    text = str(participant).strip()
+    if "<" in text:
+        name = text.split("<", 1)[0].strip().strip('"')
+        return {"email": text, "name": name or None, "title": None}
+    if "@" in text:
+        return {"email": text, "name": None, "title": None}
+    return {"email": None, "name": text or None, "title": None}
+
+
+class ContactRegistry:
+    """Known contacts per customer, keyed by hashed email and name"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        # customer_id -> key hash -> (first seen, seniority)
+        self._contacts: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        self._packed: Dict[str, str] = {}  # Loaded customers not yet unpacked
+        self._dirty = False
+        if self.path and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        """Number of customers with known contacts"""
+        return len(self._contacts) + len(self._packed)
+
+    def _customer(self, customer_id: str, create: bool = True) -> Optional[Dict[int, Tuple[int, int]]]:
+        contacts = self._contacts.get(customer_id)
+        if contacts is None:
+            packed = self._packed.pop(customer_id, None)
+            if packed is None and not create:
+                return None
+            contacts = self._contacts[customer_id] = {}
+            if packed:
+                for key, first_seen, seniority in _RECORD.iter_unpack(base64.b64decode(packed)):
+                    contacts[key] = (first_seen, seniority)
+        return contacts
+
+    def has_contacts(self, customer_id: str) -> bool:
+        """Whether anyone has been recorded for a customer yet"""
+        return bool(self._packed.get(customer_id) or self._contacts.get(customer_id))
+
+    def lookup(self,
+               customer_id: str,
+               email: Optional[str] = None,
+               name: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """
+        (first seen, seniority) of a known contact, None if the contact is new
+
+        The email is looked up when given, otherwise the name.
+        """
+        keys = contact_keys(email, name)
+        contacts = self._customer(customer_id, create=False)
+        if not keys or not contacts:
+            return None
+        return contacts.get(keys[0])
+
+    def observe(self,
+                customer_id: str,
+                email: Optional[str] = None,
+                name: Optional[str] = None,
+                title: Optional[str] = None,
+                seen_at: Optional[float] = None) -> bool:
+        """
+        Record a contact seen for a customer
+
+        Args:
+            customer_id: Customer the contact belongs to
+            email: Address, plain or "Name <address>"
+            name: Display name, used when no email is available
+            title: Job title; the highest seniority seen is kept
+            seen_at: Unix time of the sighting, defaults to now
+
+        Returns:
+            True if the contact was not known before
+        """
+        keys = contact_keys(email, name)
+        if not keys:
+            return False
+        contacts = self._customer(customer_id)
+        seniority = title_seniority(title)
+        seen_at = int(time.time() if seen_at is None else seen_at)
+
+        # The email decides who someone is; their name is only an alias for
+        # mentions that carry no address, so a namesake with a new address is new
+        primary, aliases = keys[0], keys[1:]
+        previous = contacts.get(primary)
+        if previous is None:
+            record = (seen_at, seniority)
+        else:
+            record = (min(previous[0], seen_at), max(previous[1], seniority))
+        if record != previous:
+            contacts[primary] = record
+            self._dirty = True
+        for alias in aliases:
+            if alias not in contacts:
+                contacts[alias] = record
+                self._dirty = True
+        return previous is None
+
+    def observe_participants(self,
+                             customer_id: str,
+                             participants: Iterable[Any],
+                             seen_at: Optional[float] = None) -> List[Dict[str, Optional[str]]]:
+        """
+        Record the participants of a synced thread, call or meeting
+
+        Args:
+            customer_id: Customer the participants belong to
+            participants: Dicts with email/name/title, or address strings
+            seen_at: Unix time of the sync item, defaults to now
+
+        Returns:
+            The participants that were not known before
+        """
+        new_contacts = []
+        for participant in participants:
+            contact = parse_participant(participant)
+            if self.observe(customer_id, seen_at=seen_at, **contact):
+                new_contacts.append(contact)
+        return new_contacts
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != CONTACT_REGISTRY_VERSION:
+                logger.info(f"Ignoring contact registry in {self.path}: version {data.get('version')}")
+                return
+            self._packed = dict(data.get("customers", {}))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Could not load contact registry from {self.path}: {e}")
+
+    def save(self):
+        """Write the registry atomically if it changed since the last save"""
+        if not self.path or not self._dirty:
+            return
+        customers = dict(self._packed)
+        for customer_id, contacts in self._contacts.items():
+            if contacts:
+                packed = b"".join(
+                    _RECORD.pack(key, first_seen, seniority)
+                    for key, (first_seen, seniority) in contacts.items()
+                )
+                customers[customer_id] = base64.b64encode(packed).decode("ascii")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"version": CONTACT_REGISTRY_VERSION, "customers": customers}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._dirty = False
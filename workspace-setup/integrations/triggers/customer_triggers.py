@@ -2,8 +2,10 @@
 Customer-specific triggers for sales automation
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from .base_trigger import BaseTrigger, TriggerResult, TriggerCondition
+from .contact_registry import EXECUTIVE_SENIORITY, ContactRegistry, parse_participant, title_seniority
+from .health_snapshots import HealthSnapshotStore, event_time
 
 
 class CustomerTrigger(BaseTrigger):
@@ -76,10 +78,15 @@ class AccountHealthTrigger(BaseTrigger):
                  priority: str,
                  health_threshold: float = 0.7,
                  usage_drop_threshold: float = -20.0,
-                 enabled: bool = True):
+                 enabled: bool = True,
+                 health_drop_threshold: float = 0.1,
+                 snapshots: Optional[HealthSnapshotStore] = None):
         super().__init__(trigger_id, name, description, priority, enabled)
         self.health_threshold = health_threshold
         self.usage_drop_threshold = usage_drop_threshold
+        self.health_drop_threshold = health_drop_threshold
+        # Pass a store with a path to compare against snapshots from earlier runs
+        self.snapshots = snapshots if snapshots is not None else HealthSnapshotStore()
     
     def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
         """Evaluate account health trigger conditions"""
@@ -87,6 +94,14 @@ class AccountHealthTrigger(BaseTrigger):
         suggested_actions = []
         context = {}
         
+        # Compare with the customer's previous snapshot
+        customer_id = data.get("customer_id")
+        if customer_id:
+            health_drop = self._compare_snapshot(customer_id, data, context)
+            if health_drop:
+                matched_conditions.append("health_score_dropped")
+                suggested_actions.append("review_health_drop")
+        
         # Check health score
         health_score = data.get("health_score", 1.0)
         if health_score < self.health_threshold:
@@ -137,17 +152,47 @@ class AccountHealthTrigger(BaseTrigger):
             context=context
         )
     
+    def _compare_snapshot(self, customer_id: str, data: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        """
+        Record the event's health values and add deltas against the previous snapshot
+        
+        Returns:
+            True if the health score dropped by at least health_drop_threshold
+        """
+        # The event's own time, so an event evaluated again is not a new snapshot
+        now = event_time(data.get("timestamp"))
+        if now is None:
+            now = self.snapshots.clock()
+        previous = self.snapshots.record(customer_id, data, now)
+        if previous is None:
+            return False
+        current = self.snapshots.get(customer_id)
+        
+        deltas = {}
+        for field, before, after in zip(("health_score", "usage_change_percent", "support_tickets_30d"),
+                                        previous.values(), current.values()):
+            if before is not None and after is not None:
+                deltas[field] = after - before
+        context["health_deltas"] = deltas
+        context["previous_snapshot_at"] = previous.recorded_at
+        context["seconds_since_previous"] = now - previous.recorded_at
+        context["seconds_since_change"] = now - current.changed_at
+        
+        return deltas.get("health_score", 0.0) <= -self.health_drop_threshold
+    
     def get_conditions(self) -> Dict[str, Any]:
         """Get trigger conditions"""
         return {
             "health_threshold": self.health_threshold,
             "usage_drop_threshold": self.usage_drop_threshold,
+            "health_drop_threshold": self.health_drop_threshold,
             "checks": [
                 "health_score",
                 "usage_change_percent", 
                 "support_tickets_30d",
                 "payment_failed",
-                "days_to_renewal"
+                "days_to_renewal",
+                "health_score_delta"
             ]
         }
 
@@ -160,8 +205,11 @@ class NewStakeholderTrigger(BaseTrigger):
                  name: str,
                  description: str,
                  priority: str,
-                 enabled: bool = True):
+                 enabled: bool = True,
+                 contacts: Optional[ContactRegistry] = None):
         super().__init__(trigger_id, name, description, priority, enabled)
+        # Without a registry the caller has to set new_contact_detected itself
+        self.contacts = contacts
     
     def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
         """Evaluate new stakeholder trigger conditions"""
@@ -169,18 +217,22 @@ class NewStakeholderTrigger(BaseTrigger):
         suggested_actions = []
         context = {}
         
+        new_contacts, executive_seen = self._check_registry(data)
+        
         # Check for new contact introduction
-        new_contact = data.get("new_contact_detected", False)
+        new_contact = data.get("new_contact_detected", False) or bool(new_contacts)
         if new_contact:
             matched_conditions.append("new_contact_identified")
-            context["contact_info"] = data.get("contact_info", {})
+            context["contact_info"] = data.get("contact_info") or (new_contacts[0] if new_contacts else {})
+            if new_contacts:
+                context["new_contacts"] = new_contacts
             suggested_actions.append("research_new_contact")
         
         # Check for executive level involvement
         contact_level = data.get("contact_level", "").lower()
-        if contact_level in ["ceo", "cto", "cio", "cfo", "vp"]:
+        if contact_level in ["ceo", "cto", "cio", "cfo", "vp"] or executive_seen:
             matched_conditions.append("executive_level_contact")
-            context["executive_level"] = contact_level
+            context["executive_level"] = contact_level or executive_seen
             suggested_actions.extend(["notify_ae_manager", "prepare_executive_materials"])
         
         # Check for decision maker signals
@@ -201,11 +253,47 @@ class NewStakeholderTrigger(BaseTrigger):
             context=context
         )
     
+    def _check_registry(self, data: Dict[str, Any]) -> Tuple[List[Dict[str, Optional[str]]], Optional[str]]:
+        """
+        Look up the event's people in the contact registry and record them
+        
+        People come from contact_info, participants and from. A customer's
+        first sighting only seeds the registry: with nothing known yet, every
+        participant would otherwise look new.
+        
+        Returns:
+            (contacts that are new, title of the first new executive among them or None)
+        """
+        customer_id = data.get("customer_id")
+        if self.contacts is None or not customer_id:
+            return [], None
+        
+        people = []
+        if data.get("contact_info"):
+            people.append(data["contact_info"])
+        people.extend(data.get("participants") or ())
+        if data.get("from"):
+            people.append(data["from"])
+        if not people:
+            return [], None
+        
+        seeded = self.contacts.has_contacts(customer_id)
+        new_contacts = []
+        executive_seen = None
+        for person in people:
+            contact = parse_participant(person)
+            if self.contacts.observe(customer_id, **contact) and seeded:
+                new_contacts.append(contact)
+                if executive_seen is None and title_seniority(contact["title"]) >= EXECUTIVE_SENIORITY:
+                    executive_seen = contact["title"].lower()
+        return new_contacts, executive_seen
+    
     def get_conditions(self) -> Dict[str, Any]:
         """Get trigger conditions"""
         return {
             "monitors": [
                 "new_contact_detected",
+                "contact_registry",
                 "contact_level",
                 "decision_maker_signals"
             ]
@@ -0,0 +1,201 @@
+"""
+Previous health snapshots per customer
+
+AccountHealthTrigger compares each event with the customer's previous
+health snapshot to report deltas and how long health has been unchanged.
+Snapshots live in a bounded LRU in memory; with a path they are written
+through to a SQLite table with one row per customer, so a miss reads a
+single row and a sweep over every account never reloads the whole history.
+Writes are committed in batches, and on flush() or close().
+"""
+
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+# Event fields a snapshot keeps, in column order
+HEALTH_FIELDS = (
+    "health_score",
+    "usage_change_percent",
+    "support_tickets_30d",
+    "payment_failed",
+    "days_to_renewal"
+)
+
+
+class HealthSnapshot(NamedTuple):
+    """A customer's health values and when they were recorded and last changed"""
+    recorded_at: float
+    changed_at: float
+    health_score: Optional[float]
+    usage_change_percent: Optional[float]
+    support_tickets_30d: Optional[float]
+    payment_failed: Optional[bool]
+    days_to_renewal: Optional[float]
+
+    def values(self) -> tuple:
+        """The health values, in HEALTH_FIELDS order"""
+        return self[2:]
+
+
+def _value(data: Dict[str, Any], field: str) -> Any:
+    value = data.get(field)
+    if value is None:
+        return None
+    if field == "payment_failed":
+        return bool(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def event_time(timestamp: Any) -> Optional[float]:
+    """Unix time of an event timestamp (datetime, number or ISO string), None if unusable"""
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+        return float(timestamp)
+    if isinstance(timestamp, str):
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class HealthSnapshotStore:
+    """LRU of the latest snapshot per customer, written through to SQLite"""
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 max_cached: int = 10000,
+                 clock: Callable[[], float] = time.time,
+                 commit_every: int = 100,
+                 commit_interval_seconds: float = 1.0):
+        self.path = Path(path) if path else None
+        self.max_cached = max_cached
+        self.clock = clock
+        self.commit_every = commit_every
+        self.commit_interval_seconds = commit_interval_seconds
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        self._cache: "OrderedDict[str, HealthSnapshot]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path))
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS health_snapshots ("
+                "customer_id TEXT PRIMARY KEY, recorded_at REAL, changed_at REAL, "
+                + ", ".join(f"{field} REAL" for field in HEALTH_FIELDS)
+                + ") WITHOUT ROWID"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, customer_id: str) -> Optional[HealthSnapshot]:
+        """Previous snapshot of a customer, from memory or one row on disk"""
+        snapshot = self._cache.get(customer_id)
+        if snapshot is not None:
+            self._cache.move_to_end(customer_id)
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            f"SELECT recorded_at, changed_at, {', '.join(HEALTH_FIELDS)} "
+            "FROM health_snapshots WHERE customer_id = ?",
+            (customer_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        row = list(row)
+        payment_failed = 2 + HEALTH_FIELDS.index("payment_failed")
+        if row[payment_failed] is not None:
+            row[payment_failed] = bool(row[payment_failed])
+        snapshot = HealthSnapshot(*row)
+        self._remember(customer_id, snapshot)
+        return snapshot
+
+    def record(self,
+               customer_id: str,
+               data: Dict[str, Any],
+               now: Optional[float] = None) -> Optional[HealthSnapshot]:
+        """
+        Store an event's health values as the customer's latest snapshot
+
+        An event no newer than the latest snapshot, e.g. one evaluated
+        again, is not recorded and has nothing to compare against.
+
+        Args:
+            customer_id: Customer the event is about
+            data: Event carrying the HEALTH_FIELDS it knows
+            now: Unix time of the event, defaults to the store's clock
+
+        Returns:
+            The previous snapshot, or None for a customer seen for the first
+            time or an event that was not recorded
+        """
+        now = self.clock() if now is None else now
+        previous = self.get(customer_id)
+        if previous is not None and now <= previous.recorded_at:
+            return None
+        values = tuple(_value(data, field) for field in HEALTH_FIELDS)
+        if previous is not None and previous.values() == values:
+            changed_at = previous.changed_at
+        else:
+            changed_at = now
+        snapshot = HealthSnapshot(now, changed_at, *values)
+
+        self._remember(customer_id, snapshot)
+        if self._db is not None:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO health_snapshots VALUES ({', '.join('?' * (3 + len(HEALTH_FIELDS)))})",
+                (customer_id, *snapshot)
+            )
+            self._uncommitted += 1
+            if (self._uncommitted >= self.commit_every
+                    or time.monotonic() - self._last_commit >= self.commit_interval_seconds):
+                self.flush()
+        return previous
+
+    def flush(self):
+        """Commit snapshots recorded since the last commit"""
+        if self._db is not None and self._uncommitted:
+            self._db.commit()
+            self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def _remember(self, customer_id: str, snapshot: HealthSnapshot):
+        self._cache[customer_id] = snapshot
+        self._cache.move_to_end(customer_id)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    def close(self):
+        """Close the database; the cache stays readable"""
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "path": str(self.path) if self.path else None
+        }
@@ -0,0 +1,244 @@
+"""
+Multi-pattern keyword matching for trigger evaluation
+
+Compiles many keyword vocabularies into a single automaton so a piece of
+text is scanned once regardless of how many rules or triggers are watching
+it. Regex patterns are compiled once and each searched a single time
+against the lowercased text.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Escapes such as \S or \W are not literals and don't stop a pattern being lowercase
+_ESCAPE = re.compile(r"\\.")
+
+
+def _is_lowercase(pattern: str) -> bool:
+    """Whether a pattern has no uppercase literals, so it needs no IGNORECASE on lowered text"""
+    literals = _ESCAPE.sub("", pattern)
+    return literals == literals.lower()
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    """A single keyword or pattern hit inside scanned text"""
+    owner: Any  # Whatever was registered with the keyword/pattern (rule id, trigger, ...)
+    matched: str  # The keyword or regex source that matched
+    start: int
+    end: int
+    is_pattern: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "owner": self.owner,
+            "matched": self.matched,
+            "start": self.start,
+            "end": self.end,
+            "is_pattern": self.is_pattern
+        }
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over lowercased keywords"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, str, Any]]] = [[]]
+        self._keyword_count = 0
+        self._built = False
+
+    def __len__(self) -> int:
+        return self._keyword_count
+
+    def add(self, keyword: str, owner: Any):
+        """Register a keyword; matching is case-insensitive"""
+        keyword = keyword.lower()
+        if not keyword:
+            return
+
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+
+        self._output[node].append((len(keyword), keyword, owner))
+        self._keyword_count += 1
+        self._built = False
+
+    def build(self):
+        """Compute failure links; must be called after the last add()"""
+        queue = deque()
+
+        for node in self._goto[0].values():
+            self._fail[node] = 0
+            queue.append(node)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+
+                # Inherit outputs of the longest proper suffix
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[Any, str, int, int]]:
+        """
+        Yield (owner, keyword, start, end) for every keyword occurrence
+
+        Args:
+            text: Text that has already been lowercased
+
+        Yields:
+            One tuple per occurrence, including overlapping ones
+        """
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            if output[node]:
+                end = index + 1
+                for length, keyword, owner in output[node]:
+                    yield owner, keyword, end - length, end
+
+
+class PatternSet:
+    """A group of regex patterns searched against lowercased text"""
+
+    def __init__(self, flags: int = re.IGNORECASE):
+        self.flags = flags
+        self._entries: List[Tuple[str, Any, re.Pattern]] = []
+        self._searchers: List[re.Pattern] = []
+        self._compiled = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, pattern: str, owner: Any):
+        """Register a regex pattern; invalid patterns raise re.error here"""
+        self._entries.append((pattern, owner, re.compile(pattern, self.flags)))
+        self._compiled = False
+
+    def compile(self):
+        """Pick the form of each pattern used to search lowercased text"""
+        self._searchers = []
+        for pattern, _, compiled in self._entries:
+            # Without IGNORECASE re can skip ahead on a pattern's literal prefix;
+            # that is only equivalent when the pattern has no uppercase literals
+            if self.flags & re.IGNORECASE and _is_lowercase(pattern):
+                compiled = re.compile(pattern, self.flags & ~re.IGNORECASE)
+            self._searchers.append(compiled)
+        self._compiled = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[Any, str, int, int]]:
+        """
+        Yield (owner, pattern, start, end) for the first hit of each matching pattern
+
+        Each pattern is searched on its own: re has no multi-pattern scan,
+        and one alternation of every pattern tries each branch at every
+        position, which measures far slower than separate searches that
+        skip ahead on their literal prefixes.
+
+        Args:
+            text: Text that has already been lowercased
+        """
+        if not self._compiled:
+            self.compile()
+
+        for (pattern, owner, _), searcher in zip(self._entries, self._searchers):
+            match = searcher.search(text)
+            if match:
+                yield owner, pattern, match.start(), match.end()
+
+    def time_patterns(self, text: str, clock: Callable[[], float]) -> Dict[Any, float]:
+        """
+        Search each pattern again and total the time per owner
+
+        A scan only reports hits; profiling uses this on sampled text to
+        attribute regex cost to its owner.
+        """
+        if not self._compiled:
+            self.compile()
+
+        seconds: Dict[Any, float] = {}
+        for (_, owner, _), searcher in zip(self._entries, self._searchers):
+            started = clock()
+            searcher.search(text)
+            seconds[owner] = seconds.get(owner, 0.0) + clock() - started
+        return seconds
+
+
+class KeywordMatcher:
+    """Keyword automaton plus compiled patterns, scanned in one call"""
+
+    def __init__(self):
+        self.automaton = KeywordAutomaton()
+        self.patterns = PatternSet()
+
+    def add_keywords(self, keywords: Iterable[str], owner: Any):
+        """Register keywords for an owner"""
+        for keyword in keywords:
+            self.automaton.add(keyword, owner)
+
+    def add_patterns(self, patterns: Iterable[str], owner: Any):
+        """Register regex patterns for an owner"""
+        for pattern in patterns:
+            self.patterns.add(pattern, owner)
+
+    def compile(self):
+        """Finalize the automaton and patterns"""
+        self.automaton.build()
+        self.patterns.compile()
+
+    def scan(self, text: str, lowered: bool = False) -> List[KeywordMatch]:
+        """
+        Scan text once and return every keyword/pattern hit
+
+        Args:
+            text: Text to scan
+            lowered: Set when the caller already lowercased the text
+
+        Returns:
+            Matches with spans into the lowercased text
+        """
+        if not text:
+            return []
+        if not lowered:
+            text = text.lower()
+
+        matches = [
+            KeywordMatch(owner, keyword, start, end)
+            for owner, keyword, start, end in self.automaton.iter_matches(text)
+        ]
+        matches.extend(
+            KeywordMatch(owner, pattern, start, end, is_pattern=True)
+            for owner, pattern, start, end in self.patterns.iter_matches(text)
+        )
+        return matches
@@ -2,9 +2,36 @@
 Keyword-based triggers for sales automation
 """
 
-import re
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional
 from .base_trigger import BaseTrigger, TriggerResult, TriggerCondition
+from .keyword_matcher import KeywordMatch, KeywordMatcher
+from .normalized_event import normalize
+
+
+class KeywordHits(NamedTuple):
+    """Matches of one keyword trigger in an event's text and subject"""
+    text: List[KeywordMatch]
+    subject: List[KeywordMatch]
+
+
+_NO_HITS = KeywordHits([], [])
+
+
+def _scan_event(matcher: KeywordMatcher, data: Dict[str, Any]) -> Dict[Any, KeywordHits]:
+    """Scan an event's text and subject once each and group the hits by owner"""
+    event = normalize(data)
+    hits: Dict[Any, KeywordHits] = {}
+    for match in matcher.scan(event.lower_text, lowered=True):
+        owner_hits = hits.get(match.owner)
+        if owner_hits is None:
+            owner_hits = hits[match.owner] = KeywordHits([], [])
+        owner_hits.text.append(match)
+    for match in matcher.scan(event.lower_subject, lowered=True):
+        owner_hits = hits.get(match.owner)
+        if owner_hits is None:
+            owner_hits = hits[match.owner] = KeywordHits([], [])
+        owner_hits.subject.append(match)
+    return hits
 
 
 class KeywordTrigger(BaseTrigger):
@@ -23,34 +50,67 @@ class KeywordTrigger(BaseTrigger):
         self.keywords = [k.lower() for k in keywords]
         self.patterns = patterns or []
         self.context_window = context_window
+        self._matcher: Optional[KeywordMatcher] = None
+        self._matcher_key = None
     
-    def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
-        """Evaluate keyword trigger conditions"""
+    def compile_matcher(self, matcher: KeywordMatcher):
+        """Register this trigger's keywords and patterns, owned by the trigger"""
+        matcher.add_keywords(self.keywords, self)
+        matcher.add_patterns(self.patterns, self)
+    
+    def scan(self, data: Dict[str, Any]) -> KeywordHits:
+        """Find this trigger's keywords and patterns in an event on its own"""
+        # Rebuilt if keywords or patterns were changed after construction
+        key = (tuple(self.keywords), tuple(self.patterns))
+        if self._matcher is None or self._matcher_key != key:
+            matcher = KeywordMatcher()
+            self.compile_matcher(matcher)
+            matcher.compile()
+            self._matcher, self._matcher_key = matcher, key
+        return _scan_event(self._matcher, data).get(self, _NO_HITS)
+    
+    def evaluate(self, data: Dict[str, Any], hits: Optional[KeywordHits] = None) -> TriggerResult:
+        """
+        Evaluate keyword trigger conditions
+        
+        Args:
+            data: Event to evaluate
+            hits: Matches already found by a KeywordTriggerSet; scanned here when omitted
+        """
         matched_conditions = []
         suggested_actions = []
         context = {}
         
-        text = data.get("text", "").lower()
-        subject = data.get("subject", "").lower()
+        event = normalize(data)
+        if hits is None:
+            hits = self.scan(event)
+        found_keywords = set()
+        found_patterns = set()
+        for match in hits.text + hits.subject:
+            (found_patterns if match.is_pattern else found_keywords).add(match.matched)
         
-        # Check keywords in text
+        # Reported in the trigger's own keyword/pattern order
         matched_keywords = []
         for keyword in self.keywords:
-            if keyword in text or keyword in subject:
+            if keyword in found_keywords:
                 matched_keywords.append(keyword)
                 matched_conditions.append(f"keyword_match_{keyword}")
         
-        # Check regex patterns
         matched_patterns = []
         for pattern in self.patterns:
-            if re.search(pattern, text, re.IGNORECASE) or re.search(pattern, subject, re.IGNORECASE):
+            if pattern in found_patterns:
                 matched_patterns.append(pattern)
                 matched_conditions.append(f"pattern_match")
         
         if matched_keywords or matched_patterns:
             context["matched_keywords"] = matched_keywords
             context["matched_patterns"] = matched_patterns
-            context["text_snippet"] = self._extract_context(text, matched_keywords + matched_patterns)
+            context["match_spans"] = [
+                {"matched": match.matched, "field": field, "start": match.start, "end": match.end}
+                for field, matches in (("text", hits.text), ("subject", hits.subject))
+                for match in matches
+            ]
+            context["text_snippet"] = self._extract_context(event.lower_text, hits.text)
         
         triggered = len(matched_conditions) > 0
         confidence = self.calculate_confidence(matched_conditions, len(self.keywords) + len(self.patterns))
@@ -63,17 +123,13 @@ class KeywordTrigger(BaseTrigger):
             context=context
         )
     
-    def _extract_context(self, text: str, matches: List[str]) -> str:
-        """Extract context around matched keywords/patterns"""
+    def _extract_context(self, text: str, matches: List[KeywordMatch]) -> str:
+        """Extract context around the first match in the text"""
         if not matches:
             return ""
         
-        # Find the first match
-        first_match_pos = len(text)
-        for match in matches:
-            pos = text.lower().find(match.lower())
-            if pos != -1 and pos < first_match_pos:
-                first_match_pos = pos
+        # Spans index into the lowercased text
+        first_match_pos = min(match.start for match in matches)
         
         # Extract context window
         start = max(0, first_match_pos - self.context_window)
@@ -140,9 +196,9 @@ class BuyingSignalTrigger(KeywordTrigger):
             enabled=enabled
         )
     
-    def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
+    def evaluate(self, data: Dict[str, Any], hits: Optional[KeywordHits] = None) -> TriggerResult:
         """Evaluate buying signal trigger conditions"""
-        result = super().evaluate(data)
+        result = super().evaluate(data, hits)
         
         if result.triggered:
             # Add buying signal specific actions
@@ -216,9 +272,9 @@ class ChurnRiskTrigger(KeywordTrigger):
             enabled=enabled
         )
     
-    def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
+    def evaluate(self, data: Dict[str, Any], hits: Optional[KeywordHits] = None) -> TriggerResult:
         """Evaluate churn risk trigger conditions"""
-        result = super().evaluate(data)
+        result = super().evaluate(data, hits)
         
         if result.triggered:
             # Add churn risk specific actions
@@ -280,9 +336,9 @@ class CompetitiveTrigger(KeywordTrigger):
             enabled=enabled
         )
     
-    def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
+    def evaluate(self, data: Dict[str, Any], hits: Optional[KeywordHits] = None) -> TriggerResult:
         """Evaluate competitive trigger conditions"""
-        result = super().evaluate(data)
+        result = super().evaluate(data, hits)
         
         if result.triggered:
             # Add competitive specific actions
@@ -354,9 +410,9 @@ class SecurityComplianceTrigger(KeywordTrigger):
             enabled=enabled
         )
     
-    def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
+    def evaluate(self, data: Dict[str, Any], hits: Optional[KeywordHits] = None) -> TriggerResult:
         """Evaluate security/compliance trigger conditions"""
-        result = super().evaluate(data)
+        result = super().evaluate(data, hits)
         
         if result.triggered:
             # Add security/compliance specific actions
@@ -374,4 +430,54 @@ class SecurityComplianceTrigger(KeywordTrigger):
                     result.suggested_actions.append("prepare_hipaa_materials")
                     result.context["compliance_type"] = "healthcare"
         
-        return result
\ No newline at end of file
+        return result
+
+
+class KeywordTriggerSet:
+    """Keyword triggers compiled into one matcher and scanned together"""
+    
+    def __init__(self, triggers: Iterable[KeywordTrigger] = ()):
+        self.triggers: List[KeywordTrigger] = []
+        self._matcher: Optional[KeywordMatcher] = None
+        for trigger in triggers:
+            self.add(trigger)
+    
+    def __len__(self) -> int:
+        return len(self.triggers)
+    
+    def add(self, trigger: KeywordTrigger):
+        """Register a trigger; the matcher is rebuilt on the next scan"""
+        self.triggers.append(trigger)
+        self._matcher = None
+    
+    def compile(self):
+        """Build one matcher over every registered vocabulary and pattern"""
+        matcher = KeywordMatcher()
+        for trigger in self.triggers:
+            trigger.compile_matcher(matcher)
+        matcher.compile()
+        self._matcher = matcher
+    
+    def scan(self, data: Dict[str, Any]) -> Dict[KeywordTrigger, KeywordHits]:
+        """Scan an event once and return each trigger's matches"""
+        if self._matcher is None:
+            self.compile()
+        return _scan_event(self._matcher, data)
+    
+    def evaluate(self, data: Dict[str, Any]) -> Dict[str, TriggerResult]:
+        """
+        Evaluate every enabled trigger against an event in one pass
+        
+        Args:
+            data: Event to evaluate
+            
+        Returns:
+            TriggerResult per trigger id
+        """
+        event = normalize(data)
+        hits = self.scan(event)
+        return {
+            trigger.trigger_id: trigger.evaluate(event, hits.get(trigger, _NO_HITS))
+            for trigger in self.triggers
+            if trigger.enabled
+        }
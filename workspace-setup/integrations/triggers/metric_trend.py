@@ -0,0 +1,154 @@
+"""
+Streaming trend state for metric triggers
+
+Each (customer, metric) pair keeps a fixed-size summary instead of a value
+history: an EWMA, a baseline EWMA of the values that have left the recent
+window, running means and co-moments for a least-squares slope, and a small
+ring of the most recent values. Adding a datapoint is O(1) and analysing
+the trend costs the same whatever the length of the history.
+"""
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TREND_STATE_VERSION = 2
+
+
+class TrendState:
+    """Running summary of one metric series"""
+
+    __slots__ = ("count", "ewma", "baseline", "first", "mean_x", "mean_y",
+                 "c_xy", "m2_x", "recent", "last_timestamp")
+
+    def __init__(self):
+        self.count = 0
+        self.ewma: Optional[float] = None
+        self.baseline: Optional[float] = None  # EWMA of values older than the recent ring
+        self.first: Optional[float] = None
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.c_xy = 0.0  # Sum of (x - mean_x) * (y - mean_y), updated Welford-style
+        self.m2_x = 0.0  # Sum of (x - mean_x) ** 2
+        self.recent: List[float] = []
+        self.last_timestamp: Optional[float] = None  # Unix time of the latest datapoint
+
+    def add(self, value: float, alpha: float, recent_size: int):
+        """Fold a datapoint into the state"""
+        value = float(value)
+        if self.count == 0:
+            self.first = value
+            self.ewma = value
+        else:
+            self.ewma += alpha * (value - self.ewma)
+
+        # Least-squares slope against the datapoint index
+        x = float(self.count)
+        self.count += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.count
+        self.mean_y += (value - self.mean_y) / self.count
+        self.c_xy += dx * (value - self.mean_y)
+        self.m2_x += dx * (x - self.mean_x)
+
+        self.recent.append(value)
+        if len(self.recent) > recent_size:
+            evicted = self.recent.pop(0)
+            if self.baseline is None:
+                self.baseline = evicted
+            else:
+                self.baseline += alpha * (evicted - self.baseline)
+
+    @property
+    def slope(self) -> float:
+        """Change per datapoint of the least-squares line, 0 until there are two points"""
+        return self.c_xy / self.m2_x if self.m2_x else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrendState":
+        """Create from dictionary"""
+        state = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(state, name, data[name])
+        state.recent = list(state.recent)
+        return state
+
+
+class TrendStore:
+    """Trend states keyed by (customer_id, metric), persisted as one JSON file"""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 100000):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self._states: "OrderedDict[Tuple[str, str], TrendState]" = OrderedDict()
+        self._dirty = False
+        if self.path and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, customer_id: str, metric: str) -> Optional[TrendState]:
+        """State of a series, or None if it has no datapoints yet"""
+        return self._states.get((customer_id, metric))
+
+    def state(self, customer_id: str, metric: str) -> TrendState:
+        """Get or create the state of a series"""
+        key = (customer_id, metric)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = TrendState()
+            if len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(key)
+        return state
+
+    def mark_dirty(self):
+        """Note that a state changed since the last save"""
+        self._dirty = True
+
+    def items(self) -> Iterable[Tuple[Tuple[str, str], TrendState]]:
+        """((customer_id, metric), state) pairs, least recently updated first"""
+        return self._states.items()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != TREND_STATE_VERSION:
+                logger.info(f"Ignoring trend state in {self.path}: version {data.get('version')}")
+                return
+            for customer_id, metric, state in data.get("states", []):
+                self._states[(customer_id, metric)] = TrendState.from_dict(state)
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Could not load trend state from {self.path}: {e}")
+
+    def save(self):
+        """Write the states atomically if any changed since the last save"""
+        if not self.path or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({
+                "version": TREND_STATE_VERSION,
+                "states": [
+                    [customer_id, metric, state.to_dict()]
+                    for (customer_id, metric), state in self._states.items()
+                ]
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._dirty = False
@@ -5,6 +5,12 @@ Metric-based triggers for sales automation
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from .base_trigger import BaseTrigger, TriggerResult, TriggerCondition
+from .conditions import compile_condition
+from .health_snapshots import event_time
+from .metric_trend import TrendState, TrendStore
+
+# Datapoints averaged as "recent" when judging a trend
+RECENT_DATAPOINTS = 3
 
 
 class MetricTrigger(BaseTrigger):
@@ -19,12 +25,19 @@ class MetricTrigger(BaseTrigger):
                  threshold: float,
                  condition: TriggerCondition,
                  time_window_hours: int = 24,
-                 enabled: bool = True):
+                 enabled: bool = True,
+                 trend_store: Optional[TrendStore] = None,
+                 trend_alpha: float = 0.3):
         super().__init__(trigger_id, name, description, priority, enabled)
         self.metric_name = metric_name
         self.threshold = threshold
         self.condition = condition
         self.time_window_hours = time_window_hours
+        # Pass a TrendStore with a path to keep trends across runs; triggers may share one
+        self.trend_store = trend_store if trend_store is not None else TrendStore()
+        self.trend_alpha = trend_alpha
+        self._threshold_check = compile_condition(condition, threshold)
+        self._threshold_key = (condition, threshold)
     
     def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
         """Evaluate metric trigger conditions"""
@@ -46,7 +59,7 @@ class MetricTrigger(BaseTrigger):
             )
         
         # Check threshold condition
-        threshold_met = self.check_condition(current_value, self.condition, self.threshold)
+        threshold_met = self.threshold_met(current_value)
         
         if threshold_met:
             matched_conditions.append(f"threshold_{self.condition.value}")
@@ -54,10 +67,10 @@ class MetricTrigger(BaseTrigger):
             context["threshold"] = self.threshold
             context["condition"] = self.condition.value
         
-        # Add trend analysis if historical data available
-        historical_values = metrics.get(f"{self.metric_name}_history", [])
-        if historical_values:
-            trend = self._analyze_trend(historical_values)
+        # Fold the datapoint into the customer's trend state
+        state = self._update_trend(data, current_value)
+        if state.count >= 2:
+            trend = self._analyze_trend(state)
             context["trend"] = trend
             
             if trend["direction"] == "declining" and trend["severity"] > 0.5:
@@ -75,14 +88,59 @@ class MetricTrigger(BaseTrigger):
             context=context
         )
     
-    def _analyze_trend(self, values: List[float]) -> Dict[str, Any]:
+    def threshold_met(self, value: Any) -> bool:
+        """Check a value against the threshold with the compiled condition"""
+        # Recompiled if condition or threshold were changed after construction
+        key = (self.condition, self.threshold)
+        if key != self._threshold_key:
+            self._threshold_check = compile_condition(self.condition, self.threshold)
+            self._threshold_key = key
+        return self._threshold_check(value)
+    
+    def _update_trend(self, data: Dict[str, Any], value: Any) -> TrendState:
+        """
+        Add an event's value to the trend state of its customer and metric
+        
+        Only events with a customer_id and a parseable timestamp are folded
+        into the store, and only when newer than the series' last datapoint,
+        so re-evaluating an event (or another trigger sharing the store) does
+        not add it twice. Other events are judged on their supplied
+        `<metric>_history` alone, which also seeds a series with no state yet.
+        """
+        history = data.get("metrics", {}).get(f"{self.metric_name}_history", ())
+        customer_id = data.get("customer_id")
+        timestamp = event_time(data.get("timestamp"))
+        if not customer_id or timestamp is None:
+            state = TrendState()
+            for historical in history:
+                state.add(historical, self.trend_alpha, RECENT_DATAPOINTS)
+            return state
+        
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return TrendState()
+        
+        state = self.trend_store.state(customer_id, self.metric_name)
+        if state.last_timestamp is not None and timestamp <= state.last_timestamp:
+            return state
+        
+        if state.count == 0:
+            for historical in history:
+                state.add(historical, self.trend_alpha, RECENT_DATAPOINTS)
+        state.add(value, self.trend_alpha, RECENT_DATAPOINTS)
+        state.last_timestamp = timestamp
+        self.trend_store.mark_dirty()
+        return state
+    
+    def _analyze_trend(self, state: TrendState) -> Dict[str, Any]:
         """Analyze trend in metric values"""
-        if len(values) < 2:
+        if state.count < 2:
             return {"direction": "unknown", "severity": 0.0}
         
-        # Simple trend analysis
-        recent_avg = sum(values[-3:]) / min(3, len(values))
-        older_avg = sum(values[:-3]) / max(1, len(values) - 3) if len(values) > 3 else values[0]
+        # Recent datapoints against the smoothed values before them
+        recent_avg = sum(state.recent) / len(state.recent)
+        older_avg = state.baseline if state.baseline is not None else state.first
         
         change_percent = ((recent_avg - older_avg) / older_avg) * 100 if older_avg != 0 else 0
         
@@ -100,7 +158,10 @@ class MetricTrigger(BaseTrigger):
             "severity": severity,
             "change_percent": change_percent,
             "recent_average": recent_avg,
-            "older_average": older_avg
+            "older_average": older_avg,
+            "ewma": state.ewma,
+            "slope": state.slope,
+            "datapoints": state.count
         }
     
     def get_conditions(self) -> Dict[str, Any]:
@@ -122,7 +183,8 @@ class UsageDropTrigger(MetricTrigger):
                  description: str = "Alerts when customer usage drops significantly",
                  priority: str = "high",
                  drop_threshold: float = -20.0,
-                 enabled: bool = True):
+                 enabled: bool = True,
+                 trend_store: Optional[TrendStore] = None):
         super().__init__(
             trigger_id=trigger_id,
             name=name,
@@ -132,7 +194,8 @@ class UsageDropTrigger(MetricTrigger):
             threshold=drop_threshold,
             condition=TriggerCondition.LESS_THAN,
             time_window_hours=24,
-            enabled=enabled
+            enabled=enabled,
+            trend_store=trend_store
         )
     
     def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
@@ -167,7 +230,8 @@ class EngagementScoreTrigger(MetricTrigger):
                  description: str = "Alerts when customer engagement score drops",
                  priority: str = "medium",
                  score_threshold: float = 0.3,
-                 enabled: bool = True):
+                 enabled: bool = True,
+                 trend_store: Optional[TrendStore] = None):
         super().__init__(
             trigger_id=trigger_id,
             name=name,
@@ -177,7 +241,8 @@ class EngagementScoreTrigger(MetricTrigger):
             threshold=score_threshold,
             condition=TriggerCondition.LESS_THAN,
             time_window_hours=72,
-            enabled=enabled
+            enabled=enabled,
+            trend_store=trend_store
         )
     
     def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
@@ -211,7 +276,8 @@ class SupportTicketVolumeTrigger(MetricTrigger):
                  description: str = "Alerts when support ticket volume is unusually high",
                  priority: str = "medium",
                  ticket_threshold: int = 5,
-                 enabled: bool = True):
+                 enabled: bool = True,
+                 trend_store: Optional[TrendStore] = None):
         super().__init__(
             trigger_id=trigger_id,
             name=name,
@@ -221,7 +287,8 @@ class SupportTicketVolumeTrigger(MetricTrigger):
             threshold=ticket_threshold,
             condition=TriggerCondition.GREATER_THAN,
             time_window_hours=24,
-            enabled=enabled
+            enabled=enabled,
+            trend_store=trend_store
         )
     
     def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
@@ -258,7 +325,8 @@ class RevenueAtRiskTrigger(MetricTrigger):
                  description: str = "Alerts when revenue is at risk",
                  priority: str = "critical",
                  risk_threshold: float = 0.7,
-                 enabled: bool = True):
+                 enabled: bool = True,
+                 trend_store: Optional[TrendStore] = None):
         super().__init__(
             trigger_id=trigger_id,
             name=name,
@@ -268,7 +336,8 @@ class RevenueAtRiskTrigger(MetricTrigger):
             threshold=risk_threshold,
             condition=TriggerCondition.GREATER_THAN,
             time_window_hours=24,
-            enabled=enabled
+            enabled=enabled,
+            trend_store=trend_store
         )
     
     def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
@@ -310,7 +379,8 @@ class PerformanceIssueTrigger(MetricTrigger):
                  description: str = "Alerts when performance metrics indicate issues",
                  priority: str = "high",
                  response_time_threshold: float = 2000,  # milliseconds
-                 enabled: bool = True):
+                 enabled: bool = True,
+                 trend_store: Optional[TrendStore] = None):
         super().__init__(
             trigger_id=trigger_id,
             name=name,
@@ -320,7 +390,8 @@ class PerformanceIssueTrigger(MetricTrigger):
             threshold=response_time_threshold,
             condition=TriggerCondition.GREATER_THAN,
             time_window_hours=1,
-            enabled=enabled
+            enabled=enabled,
+            trend_store=trend_store
         )
     
     def evaluate(self, data: Dict[str, Any]) -> TriggerResult:
@@ -0,0 +1,71 @@
+"""
+Normalized event representation shared by every trigger evaluation
+
+An event is normalized once at ingestion: text is coerced to str in the
+event dict itself, lowercased copies are taken, and the fields rules key on
+are extracted. NormalizedEvent wraps the event dict without copying it and
+reads like one (it is a Mapping over the same dict, and pickles as it), and
+every consumer calls normalize() which returns an already normalized event
+as-is. The original dict is on .data, for storing or serializing.
+
+The lowercased copies are taken at construction; mutate the text through
+a new normalize() call, not in place.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator
+
+
+class NormalizedEvent(Mapping):
+    """Read-only view of an event dict with its text preprocessing done once"""
+
+    __slots__ = ("data", "lower_text", "lower_subject", "customer_key", "metrics")
+
+    def __init__(self, event_data: Dict[str, Any]):
+        self.data = event_data
+        text = event_data.get("text")
+        if text is not None and not isinstance(text, str):
+            text = event_data["text"] = str(text)
+        subject = event_data.get("subject")
+        if subject is not None and not isinstance(subject, str):
+            subject = event_data["subject"] = str(subject)
+
+        self.lower_text = text.lower() if text else ""
+        self.lower_subject = subject.lower() if subject else ""
+        self.customer_key = event_data.get("customer_id") or ""
+        self.metrics = event_data.get("metrics") or {}
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Mapping.get goes through __getitem__ and a KeyError; this is the hot path
+        return self.data.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"NormalizedEvent({self.data!r})"
+
+    def __reduce__(self):
+        # Rebuilt from the plain dict on unpickle, e.g. in shard processes
+        return (NormalizedEvent, (self.data,))
+
+
+def normalize(event_data: Dict[str, Any]) -> NormalizedEvent:
+    """Normalize an event dict, or return it unchanged if it already is"""
+    if isinstance(event_data, NormalizedEvent):
+        return event_data
+    return NormalizedEvent(event_data)
+
+
+def event_dict(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The plain dict behind an event, normalized or not"""
+    return event_data.data if isinstance(event_data, NormalizedEvent) else event_data
@@ -0,0 +1,153 @@
+"""
+Sampled per-rule evaluation profiling
+
+Only one in every N evaluations is timed, so the profiler can stay on in
+production: unsampled evaluations cost a single counter decrement. Sampled
+numbers are scaled by N to estimate totals.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RuleProfile:
+    """Sampled timings of one rule"""
+
+    __slots__ = ("calls", "hits", "total_seconds", "max_seconds", "slow")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow = False
+
+    def add(self, seconds: float, hit: bool, count_call: bool = True):
+        if count_call:
+            self.calls += 1
+        if hit:
+            self.hits += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+
+class RuleProfiler:
+    """Per-rule call count, hit rate, cumulative and worst-case time, sampled"""
+
+    # Samples needed before a rule can be flagged as slow
+    MIN_SAMPLES_FOR_FLAG = 5
+
+    def __init__(self,
+                 sample_rate: float = 0.01,
+                 slow_rule_budget_ms: float = 1.0,
+                 clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            sample_rate: Fraction of evaluations to time; 0 disables profiling
+            slow_rule_budget_ms: Mean time per evaluation above which a rule is flagged
+            clock: High-resolution timer
+        """
+        self.sample_every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.slow_rule_budget_seconds = slow_rule_budget_ms / 1000.0
+        self.clock = clock
+        self.sampled_events = 0
+        self.keyword_scan = RuleProfile()
+        self.rules: Dict[str, RuleProfile] = {}
+        self._keyword_rules = set()
+        self._countdown = self.sample_every
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_every > 0
+
+    def sample(self) -> bool:
+        """Whether to time the current evaluation; call once per event or call"""
+        if not self.sample_every:
+            return False
+        self._countdown -= 1
+        if self._countdown > 0:
+            return False
+        self._countdown = self.sample_every
+        self.sampled_events += 1
+        return True
+
+    def record(self, rule_id: str, seconds: float, hit: bool):
+        """Record one sampled evaluation of a rule"""
+        profile = self.rules.get(rule_id)
+        if profile is None:
+            profile = self.rules[rule_id] = RuleProfile()
+        profile.add(seconds, hit)
+        self._check_budget(rule_id, profile, profile.calls)
+
+    def record_scan(self, seconds: float):
+        """Record one sampled shared keyword scan"""
+        self.keyword_scan.add(seconds, False)
+
+    def record_keyword(self, rule_id: str, seconds: float, hit: bool):
+        """
+        Record a keyword rule's share of a sampled scan
+
+        Keyword rules are evaluated by every scan, so their call count is the
+        scan count; seconds is the time of their own regex patterns.
+        """
+        profile = self.rules.get(rule_id)
+        if profile is None:
+            profile = self.rules[rule_id] = RuleProfile()
+            self._keyword_rules.add(rule_id)
+        profile.add(seconds, hit, count_call=False)
+        self._check_budget(rule_id, profile, self.keyword_scan.calls)
+
+    def _check_budget(self, rule_id: str, profile: RuleProfile, calls: int):
+        if profile.slow or calls < self.MIN_SAMPLES_FOR_FLAG:
+            return
+        if profile.total_seconds / calls > self.slow_rule_budget_seconds:
+            profile.slow = True
+            logger.warning(
+                f"Trigger rule {rule_id} exceeds its evaluation budget: "
+                f"{profile.total_seconds / calls * 1000:.3f}ms mean over {calls} sampled calls "
+                f"(budget {self.slow_rule_budget_seconds * 1000:.3f}ms)"
+            )
+
+    def _profile_dict(self, profile: RuleProfile, calls: int) -> Dict[str, Any]:
+        return {
+            "sampled_calls": calls,
+            "estimated_calls": calls * self.sample_every,
+            "hit_rate": round(profile.hits / calls, 4) if calls else 0.0,
+            "mean_ms": round(profile.total_seconds / calls * 1000, 4) if calls else 0.0,
+            "max_ms": round(profile.max_seconds * 1000, 4),
+            "estimated_total_ms": round(profile.total_seconds * self.sample_every * 1000, 3),
+            "slow": profile.slow
+        }
+
+    def rule_stats(self, rule_id: str) -> Optional[Dict[str, Any]]:
+        """Profile of one rule, or None if it was never sampled"""
+        profile = self.rules.get(rule_id)
+        if profile is None:
+            return None
+        calls = self.keyword_scan.calls if rule_id in self._keyword_rules else profile.calls
+        return self._profile_dict(profile, calls)
+
+    def to_dict(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Convert to dictionary, most expensive rules first
+
+        Args:
+            top: Only include this many rules (slow rules are always listed)
+        """
+        ranked = sorted(self.rules.items(), key=lambda item: -item[1].total_seconds)
+        if top is not None:
+            ranked = ranked[:top] + [item for item in ranked[top:] if item[1].slow]
+        return {
+            "sample_rate": round(1 / self.sample_every, 6) if self.sample_every else 0.0,
+            "sampled_events": self.sampled_events,
+            "slow_rule_budget_ms": self.slow_rule_budget_seconds * 1000,
+            "keyword_scan": self._profile_dict(self.keyword_scan, self.keyword_scan.calls),
+            "rules": {
+                rule_id: self.rule_stats(rule_id) for rule_id, _ in ranked
+            },
+            "slow_rules": sorted(rule_id for rule_id, profile in self.rules.items() if profile.slow)
+        }
@@ -0,0 +1,92 @@
+"""
+Sliding-window counters for aggregate triggers
+
+A window is split into fixed-width buckets kept in a ring, so recording an
+occurrence is O(1) and a key's memory is one list of bucket counts no
+matter how many events it sees. Windows slide a bucket at a time: a 24h
+window with 24 buckets covers the last 23 to 24 hours. Counters are kept
+per key (e.g. rule and customer) in an LRU-bounded store.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+
+class WindowCounter:
+    """Ring of bucket counts; bucket indexes are absolute (time // bucket width)"""
+
+    __slots__ = ("counts", "head", "head_bucket")
+
+    def __init__(self, num_buckets: int):
+        self.counts: List[float] = [0.0] * max(1, num_buckets)
+        self.head = 0  # Ring position of the newest bucket
+        self.head_bucket: Optional[int] = None  # Absolute index of the newest bucket
+
+    def _advance(self, bucket: int):
+        if self.head_bucket is None:
+            self.head_bucket = bucket
+            return
+        gap = bucket - self.head_bucket
+        if gap <= 0:
+            return
+        counts = self.counts
+        size = len(counts)
+        if gap >= size:
+            for position in range(size):
+                counts[position] = 0.0
+        else:
+            for step in range(1, gap + 1):
+                counts[(self.head + step) % size] = 0.0
+        self.head = (self.head + gap) % size
+        self.head_bucket = bucket
+
+    def add(self, bucket: int, amount: float = 1.0):
+        """Count an occurrence; late ones older than the ring are dropped"""
+        self._advance(bucket)
+        age = self.head_bucket - bucket
+        if age < len(self.counts):
+            self.counts[(self.head - age) % len(self.counts)] += amount
+
+    def total(self, bucket: int, first_age: int = 0, num_buckets: Optional[int] = None) -> float:
+        """
+        Sum of a run of buckets as of the given bucket
+
+        Args:
+            bucket: Current absolute bucket index
+            first_age: Age of the newest bucket to include, 0 being the current one
+            num_buckets: How many buckets to include, defaults to the rest of the ring
+        """
+        self._advance(bucket)
+        size = len(self.counts)
+        if num_buckets is None:
+            num_buckets = size - first_age
+        # The ring may not have caught up with `bucket` if it is older than head
+        offset = self.head_bucket - bucket
+        total = 0.0
+        for age in range(first_age + offset, min(size, first_age + offset + num_buckets)):
+            total += self.counts[(self.head - age) % size]
+        return total
+
+
+class WindowStore:
+    """Window counters per key, least recently used evicted past max_entries"""
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._counters: "OrderedDict[Hashable, WindowCounter]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def counter(self, key: Hashable, num_buckets: int) -> WindowCounter:
+        """Get or create the counter of a key"""
+        counter = self._counters.get(key)
+        if counter is not None and len(counter.counts) == num_buckets:
+            self._counters.move_to_end(key)
+            return counter
+        # New key, or the rule's window was reconfigured
+        counter = self._counters[key] = WindowCounter(num_buckets)
+        self._counters.move_to_end(key)
+        if len(self._counters) > self.max_entries:
+            self._counters.popitem(last=False)
+        return counter